@@ -0,0 +1,812 @@
+#!/usr/bin/env python3
+"""
+Orange TrustSkill - 性能基准测试
+对比优化前后的扫描引擎，在真实 skill 目录上报告每个文件的扫描遍数和吞吐量
+
+用法:
+    python scripts/benchmark.py /path/to/corpus [--mode deep] [--repeat 3] [--adversarial]
+"""
+
+import io
+import os
+import re
+import ast
+import sys
+import time
+import argparse
+import signal
+import tarfile
+import zipfile
+import tokenize
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.types import AnalysisMode, SecurityIssue, Severity
+from src.scanner import SkillScanner
+from src.context import decode_content
+from src.analyzers.regex_analyzer import RegexAnalyzer, get_rule_plan
+from src.analyzers.rule_plan import RulePlan
+from src.analyzers.ast_analyzer import ASTAnalyzer
+from src.analyzers.ast_engine import AstRuleEngine, DEFAULT_AST_HANDLERS
+from src.context import FileContext
+from src.regions import python_regions, STRING, COMMENT
+from src.line_index import LineIndex
+from src.rules import AST_DANGEROUS_CALLS, AST_SENSITIVE_OPEN_PATTERNS
+from src.streaming import text_windows
+from src.server import ScanClient
+
+
+def load_corpus(corpus: Path, mode: AnalysisMode, suffix: str = None, with_suffix: bool = False):
+    """使用扫描器的遍历规则加载语料（内容预先读入内存，排除 I/O 影响）"""
+    scanner = SkillScanner(mode)
+    contents = []
+    for entry in scanner._get_files_to_scan(corpus):
+        if suffix and entry.path.suffix != suffix:
+            continue
+        try:
+            content = decode_content(entry.path.read_bytes())
+        except (OSError, IOError):
+            continue
+        contents.append((entry.path.suffix, content) if with_suffix else content)
+    return contents
+
+
+def report(name: str, passes: float, total_bytes: int, elapsed: float):
+    """输出一行结果"""
+    throughput = total_bytes / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+    print(f"  {name:<28} passes/file: {passes:>6.1f}   {throughput:>8.2f} MB/s   ({elapsed:.3f}s)")
+
+
+def bench_regex(contents, mode: AnalysisMode, repeat: int):
+    """正则引擎：逐条规则 finditer（优化前） vs 字面量预过滤 + 合并执行计划（优化后）"""
+    plan = get_rule_plan(mode)
+    total_bytes = sum(len(content.encode('utf-8')) for content in contents)
+    print(f"\n[regex] {len(contents)} files, {total_bytes / 1024 / 1024:.2f} MB, {len(plan.rules)} rules")
+
+    # 优化前：每条规则对整个文件做一遍 finditer
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        before = [[list(rule.finditer(content)) for rule in plan.rules] for content in contents]
+        best = min(best, time.perf_counter() - start)
+    report('per-rule finditer', len(plan.rules), total_bytes, best)
+
+    # 优化后：合并执行计划
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        after = [plan.find_matches(content) for content in contents]
+        best = min(best, time.perf_counter() - start)
+    # 每个文件一遍字面量搜索，有候选规则时再加一遍筛选正则
+    candidates = [plan.candidates(content) for content in contents]
+    passes = sum(2 if indices else 1 for indices in candidates) / len(contents)
+    report('rule plan', passes, total_bytes, best)
+
+    # 不启用预过滤的合并执行计划，用于对比预过滤的收益
+    unfiltered = RulePlan(plan.rules, prefilter=False)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        [unfiltered.find_matches(content) for content in contents]
+        best = min(best, time.perf_counter() - start)
+    report('rule plan (no prefilter)', 1, total_bytes, best)
+
+    literal_rules = sum(1 for literals in plan.literals if literals)
+    skipped = sum(1 for indices in candidates if not indices)
+    average = sum(len(indices) for indices in candidates) / len(contents)
+    print(f"  prefilter: {literal_rules}/{len(plan.rules)} rules with literals, "
+          f"{average:.1f} candidate rules/file, {skipped}/{len(contents)} files skipped")
+
+    # 校验结果一致
+    def spans(results):
+        return [[[m.span() for m in matches] for matches in per_file] for per_file in results]
+    if spans(before) != spans(after):
+        print("  !! rule plan matches differ from per-rule finditer")
+        return False
+    print("  matches identical: yes")
+    return True
+
+
+def tokenize_regions(content: str):
+    """参考实现：标准库 tokenize 得到的字符串/注释区间（无法分词时返回 None）"""
+    starts = LineIndex(content).starts
+    regions = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(content).readline):
+            if token.type in (tokenize.STRING, tokenize.COMMENT):
+                kind = STRING if token.type == tokenize.STRING else COMMENT
+                (start_row, start_col), (end_row, end_col) = token.start, token.end
+                regions.append((starts[start_row - 1] + start_col, starts[end_row - 1] + end_col, kind))
+    except (tokenize.TokenError, SyntaxError):
+        return None
+    return regions
+
+
+def bench_regions(contents, repeat: int):
+    """Python 区域掩码：tokenize（参考） vs 词法正则"""
+    total_bytes = sum(len(content.encode('utf-8')) for content in contents)
+    print(f"\n[regions] {len(contents)} .py files, {total_bytes / 1024 / 1024:.2f} MB")
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        expected = [tokenize_regions(content) for content in contents]
+        best = min(best, time.perf_counter() - start)
+    report('tokenize', 1, total_bytes, best)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        actual = [python_regions(content).regions() for content in contents]
+        best = min(best, time.perf_counter() - start)
+    report('lexer regex', 1, total_bytes, best)
+
+    # 只比较 tokenize 能完整分词的文件
+    differ = sum(
+        1 for want, got in zip(expected, actual)
+        if want is not None and want != got
+    )
+    if differ:
+        print(f"  !! {differ} files differ from tokenize")
+        return False
+    print("  regions identical: yes")
+    return True
+
+
+class ReferenceASTVisitor(ast.NodeVisitor):
+    """参考实现：改用 AstRuleEngine 之前的 NodeVisitor 访问器（规则表与引擎共用 rules.py）"""
+
+    def __init__(self, content: str, filename: str, lines: Optional[LineIndex] = None):
+        self.content = content
+        self.filename = filename
+        self.issues: List[SecurityIssue] = []
+        self.lines = lines or LineIndex(content)
+
+    def _get_line(self, node: ast.AST) -> int:
+        """获取节点所在行号"""
+        return getattr(node, 'lineno', 1)
+
+    def _get_snippet(self, node: ast.AST, context: int = 50) -> str:
+        """获取代码片段"""
+        line = self.lines.line(self._get_line(node))
+        if line is not None:
+            line = line.strip()
+            return line[:100] + '...' if len(line) > 100 else line
+        return ""
+
+    def _is_dangerous_call(self, func_name: str) -> tuple:
+        """检查是否是危险函数调用"""
+        return AST_DANGEROUS_CALLS.get(func_name, None)
+
+    def visit_Call(self, node: ast.Call):
+        """访问函数调用"""
+        func_name = self._get_func_name(node.func)
+
+        if func_name:
+            # 检查危险函数
+            danger = self._is_dangerous_call(func_name)
+            if danger:
+                category, description = danger
+                # 检查是否有变量参数（动态执行）
+                has_variable = any(
+                    not isinstance(arg, ast.Constant)
+                    for arg in node.args
+                )
+
+                if has_variable:
+                    self.issues.append(SecurityIssue(
+                        level=Severity.HIGH,
+                        category=category,
+                        description=f"{description} with variable",
+                        file=self.filename,
+                        line=self._get_line(node),
+                        snippet=self._get_snippet(node),
+                        confidence=0.9
+                    ))
+
+            # 检查 subprocess 调用
+            if func_name in ['system', 'popen'] and self._is_os_call(node.func):
+                self.issues.append(SecurityIssue(
+                    level=Severity.HIGH,
+                    category='command_injection',
+                    description=f'os.{func_name}() call',
+                    file=self.filename,
+                    line=self._get_line(node),
+                    snippet=self._get_snippet(node),
+                    confidence=0.85
+                ))
+
+            # 检查 subprocess 带 shell=True
+            if func_name in ['call', 'run', 'Popen'] and self._is_subprocess_call(node.func):
+                if self._has_shell_true(node):
+                    self.issues.append(SecurityIssue(
+                        level=Severity.HIGH,
+                        category='command_injection',
+                        description='subprocess with shell=True',
+                        file=self.filename,
+                        line=self._get_line(node),
+                        snippet=self._get_snippet(node),
+                        confidence=0.95
+                    ))
+
+            # 检查 open() 调用
+            if func_name == 'open':
+                self._check_open_call(node)
+
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import):
+        """访问导入语句"""
+        for alias in node.names:
+            if alias.name in ['pickle', 'marshal', 'shelve']:
+                self.issues.append(SecurityIssue(
+                    level=Severity.MEDIUM,
+                    category='deserialization',
+                    description=f'{alias.name} import (unsafe deserialization)',
+                    file=self.filename,
+                    line=self._get_line(node),
+                    snippet=self._get_snippet(node),
+                    confidence=0.7
+                ))
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        """访问 from ... import 语句"""
+        if node.module == 'subprocess' and node.names:
+            for alias in node.names:
+                if alias.name in ['call', 'run', 'Popen', 'check_output']:
+                    # 只是导入，不标记为问题，在使用时检查
+                    pass
+
+        if node.module in ['pickle', 'marshal']:
+            self.issues.append(SecurityIssue(
+                level=Severity.MEDIUM,
+                category='deserialization',
+                description=f'{node.module} import (unsafe deserialization)',
+                file=self.filename,
+                line=self._get_line(node),
+                snippet=self._get_snippet(node),
+                confidence=0.7
+            ))
+
+        self.generic_visit(node)
+
+    def _get_func_name(self, node: ast.expr) -> Optional[str]:
+        """获取函数名称"""
+        if isinstance(node, ast.Name):
+            return node.id
+        elif isinstance(node, ast.Attribute):
+            return node.attr
+        return None
+
+    def _is_os_call(self, node: ast.expr) -> bool:
+        """检查是否是 os 模块调用"""
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name):
+                return node.value.id == 'os'
+        return False
+
+    def _is_subprocess_call(self, node: ast.expr) -> bool:
+        """检查是否是 subprocess 模块调用"""
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name):
+                return node.value.id == 'subprocess'
+        return False
+
+    def _has_shell_true(self, node: ast.Call) -> bool:
+        """检查是否有 shell=True 参数"""
+        for keyword in node.keywords:
+            if keyword.arg == 'shell':
+                if isinstance(keyword.value, ast.Constant):
+                    return keyword.value.value is True
+        return False
+
+    def _check_open_call(self, node: ast.Call):
+        """检查 open() 调用"""
+        if not node.args:
+            return
+
+        first_arg = node.args[0]
+
+        # 检查是否打开敏感文件
+        if isinstance(first_arg, ast.Constant) and isinstance(first_arg.value, str):
+            filepath = first_arg.value
+            for pattern, description in AST_SENSITIVE_OPEN_PATTERNS:
+                if re.search(pattern, filepath, re.IGNORECASE):
+                    self.issues.append(SecurityIssue(
+                        level=Severity.HIGH,
+                        category='sensitive_file_access',
+                        description=description,
+                        file=self.filename,
+                        line=self._get_line(node),
+                        snippet=self._get_snippet(node),
+                        confidence=0.85
+                    ))
+                    break
+
+
+def bench_ast(contents, mode: AnalysisMode, repeat: int):
+    """AST 分析：每个文件都解析（优化前） vs 触发标识符预过滤（优化后）"""
+    total_bytes = sum(len(content.encode('utf-8')) for content in contents)
+    print(f"\n[ast] {len(contents)} .py files, {total_bytes / 1024 / 1024:.2f} MB")
+    analyzer = ASTAnalyzer(mode)
+    path = Path('bench.py')
+
+    def analyze_all(content):
+        # 不经过预过滤，直接解析并遍历
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            return []
+        visitor = ReferenceASTVisitor(content, path.name)
+        visitor.visit(tree)
+        return visitor.issues
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        before = [analyze_all(content) for content in contents]
+        best = min(best, time.perf_counter() - start)
+    report('parse every file', 1, total_bytes, best)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        after, skipped_files = [], []
+        for content in contents:
+            # 与扫描器一致，上下文（含语法树）分析完即释放
+            ctx = FileContext(path, text=content)
+            after.append(analyzer.analyze_context(ctx))
+            skipped_files.append(bool(ctx.stats.get('ast_skipped')))
+        best = min(best, time.perf_counter() - start)
+    report('trigger prefilter', 1, total_bytes, best)
+
+    skipped = sum(skipped_files)
+    print(f"  prefilter: {len(contents) - skipped}/{len(contents)} files parsed, {skipped} skipped")
+
+    # 校验：被跳过的文件完整分析也没有发现
+    unsound = sum(1 for was_skipped, issues in zip(skipped_files, before) if was_skipped and issues)
+    if unsound or [len(issues) for issues in before] != [len(issues) for issues in after]:
+        print(f"  !! prefilter skipped {unsound} files with findings")
+        return False
+    print("  findings identical: yes")
+    return True
+
+
+def bench_ast_engine(contents, repeat: int):
+    """AST 遍历：NodeVisitor 访问器（旧） vs 按节点类型分派的规则引擎（新），不含解析时间"""
+    trees = []
+    for content in contents:
+        try:
+            trees.append((content, ast.parse(content)))
+        except SyntaxError:
+            continue
+    total_bytes = sum(len(content.encode('utf-8')) for content, _ in trees)
+    print(f"\n[ast-walk] {len(trees)} parsed .py files, {total_bytes / 1024 / 1024:.2f} MB")
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        before = []
+        for content, tree in trees:
+            visitor = ReferenceASTVisitor(content, 'bench.py')
+            visitor.visit(tree)
+            before.append(visitor.issues)
+        best = min(best, time.perf_counter() - start)
+    report('NodeVisitor', 1, total_bytes, best)
+
+    engine = AstRuleEngine(DEFAULT_AST_HANDLERS)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        after = [engine.run(tree, 'bench.py', LineIndex(content)) for content, tree in trees]
+        best = min(best, time.perf_counter() - start)
+    report('rule engine', 1, total_bytes, best)
+
+    if [[issue.to_dict() for issue in issues] for issues in before] != \
+            [[issue.to_dict() for issue in issues] for issues in after]:
+        print("  !! rule engine findings differ from NodeVisitor")
+        return False
+    print("  findings identical: yes")
+    return True
+
+
+# 病态输入：单行超长文件，旧的 `A.*B` 规则在其上对每个 A 都扫描到行尾（二次复杂度）；
+# 没有结束行的 here-document，旧的词法正则对每个 <<TAG 都扫描到文件末尾
+ADVERSARIAL_INPUTS = {
+    'base64 without sink': 'base64.b64encode(x) ',
+    'curl without url': 'curl -s ',
+    'minified json blob': '{"cmd":"curl","enc":"base64.encode","k":[1,2,3]},',
+    'unclosed heredocs': 'echo <<a\n',
+}
+
+# 每个病态输入都按这些文件类型扫描：规则按扩展名路由（如 curl 的 Near 规则不在 .json 上运行），
+# 区域掩码按扩展名选择词法分析器
+ADVERSARIAL_SUFFIXES = ('.json', '.sh', '.md', '.py')
+
+# 附加在每个病态输入末尾的匹配：区域掩码（词法分析）在第一个需要检查字符串的匹配时才构建
+ADVERSARIAL_TRIGGER = '\neval(x)\n'
+
+# 迁移到 Near 之前的无界规则（仅用于对比）
+LEGACY_UNBOUNDED_PATTERNS = {
+    r'curl\s+.*https?://': 'curl without url',
+    r'base64\.(b64encode|encode).*requests\.(post|put)': 'base64 without sink',
+}
+
+
+def bench_adversarial(mode: AnalysisMode, size_mb: float, time_limit: float):
+    """病态输入：超长单行文件等的扫描时间必须有上界（Near 规则和词法分析线性扫描）"""
+    size = int(size_mb * 1024 * 1024)
+    analyzer = RegexAnalyzer(mode)
+    print(f"\n[adversarial] {size_mb:g} MB each, limit {time_limit:g}s")
+
+    ok = True
+    for name, unit in ADVERSARIAL_INPUTS.items():
+        content = unit * (size // len(unit)) + ADVERSARIAL_TRIGGER
+        for suffix in ADVERSARIAL_SUFFIXES:
+            start = time.perf_counter()
+            issues = analyzer.analyze_context(FileContext(Path('adversarial' + suffix), text=content))
+            elapsed = time.perf_counter() - start
+            report(f"{name} ({suffix})", 1, len(content), elapsed)
+            if elapsed > time_limit:
+                print(f"  !! {name} ({suffix}): {elapsed:.1f}s exceeds limit ({len(issues)} findings)")
+                ok = False
+
+    # 对比：旧的无界规则在 64 KB 的同类输入上已经很慢
+    for pattern, name in LEGACY_UNBOUNDED_PATTERNS.items():
+        unit = ADVERSARIAL_INPUTS[name]
+        sample = unit * (64 * 1024 // len(unit))
+        compiled = re.compile(pattern, re.IGNORECASE)
+        start = time.perf_counter()
+        sum(1 for _ in compiled.finditer(sample))
+        report(f"legacy on {name} (64KB)", 1, len(sample), time.perf_counter() - start)
+    return ok
+
+
+def bench_routing(files, mode: AnalysisMode, repeat: int):
+    """按文件类型路由：所有规则 vs 只运行适用于扩展名的规则子集"""
+    plan = get_rule_plan(mode)
+    total_bytes = sum(len(content.encode('utf-8')) for _, content in files)
+    by_suffix = {}
+    for suffix, content in files:
+        by_suffix.setdefault(suffix.lower(), []).append(content)
+    print(f"\n[routing] {len(files)} files, {total_bytes / 1024 / 1024:.2f} MB, {len(by_suffix)} extensions")
+    for suffix, group in sorted(by_suffix.items(), key=lambda item: -len(item[1])):
+        group_bytes = sum(len(content.encode('utf-8')) for content in group)
+        print(f"  {suffix:<6} {len(group):>5} files {group_bytes / 1024 / 1024:>7.2f} MB   "
+              f"rules: {len(plan.route(suffix))}/{len(plan.rules)}")
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        before = [plan.find_matches(content) for _, content in files]
+        best = min(best, time.perf_counter() - start)
+    report('all rules', len(plan.rules), total_bytes, best)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        after = [plan.find_matches(content, suffix=suffix) for suffix, content in files]
+        best = min(best, time.perf_counter() - start)
+    routed = sum(len(plan.route(suffix)) for suffix, _ in files) / len(files)
+    report('routed by extension', routed, total_bytes, best)
+
+    # 路由后的结果必须等于全部规则的结果中适用规则的部分
+    for (suffix, _), all_matches, routed_matches in zip(files, before, after):
+        applicable = set(plan.route(suffix))
+        for index, (expected, actual) in enumerate(zip(all_matches, routed_matches)):
+            expected = [match.span() for match in expected] if index in applicable else []
+            if expected != [match.span() for match in actual]:
+                print(f"  !! routed matches differ for rule {index} on a {suffix} file")
+                return False
+    dropped = sum(
+        len(matches) for (suffix, _), all_matches in zip(files, before)
+        for index, matches in enumerate(all_matches) if index not in set(plan.route(suffix))
+    )
+    print(f"  routed matches identical: yes ({dropped} raw matches from non-applicable rules skipped)")
+    return True
+
+
+def bench_mapped(files, mode: AnalysisMode, repeat: int):
+    """映射的大文件：解码为 str 扫描 vs 字节版执行计划直接扫描字节（每种扩展名拼接为一个大文件）"""
+    analyzer = RegexAnalyzer(mode)
+    by_suffix = {}
+    for suffix, content in files:
+        # 只有纯 ASCII、不含 \x1c-\x1f 的内容会按字节扫描（解码后已不含 \r）
+        if content.isascii() and not re.search('[\x1c-\x1f]', content):
+            by_suffix.setdefault(suffix, []).append(content)
+    large = [(suffix, '\n'.join(group).encode('ascii')) for suffix, group in sorted(by_suffix.items())]
+    total_bytes = sum(len(data) for _, data in large)
+    print(f"\n[mapped] {len(large)} concatenated files, {total_bytes / 1024 / 1024:.2f} MB")
+
+    def run(binary: bool):
+        return [
+            analyzer.analyze_context(FileContext(Path(f'large{suffix}'), data, binary=binary))
+            for suffix, data in large
+        ]
+
+    results = {}
+    for binary, name in ((False, 'decoded str'), (True, 'bytes (mmap path)')):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[binary] = run(binary)
+            best = min(best, time.perf_counter() - start)
+        report(name, 1, total_bytes, best)
+
+    def key(findings):
+        return [(f.line, f.rule_id, f.category, f.description, f.snippet, f.confidence) for f in findings]
+
+    for (suffix, _), text_findings, binary_findings in zip(large, results[False], results[True]):
+        if key(text_findings) != key(binary_findings):
+            print(f"  !! bytes-mode findings differ on the {suffix} file")
+            return False
+    print(f"  findings identical: yes ({sum(len(findings) for findings in results[True])} findings)")
+    return True
+
+
+def bench_streamed(files, mode: AnalysisMode, chunk_size: int = 64 * 1024):
+    """
+    流式扫描：整个文件扫描 vs 按小块（大量块边界）逐窗口扫描（每种扩展名拼接为一个大文件）
+
+    跨边界的匹配必须只报告一次，行号和字符串字面量的判断必须与整个文件扫描相同
+    （max_lookbehind 取块大小的 1/4，较长的字符串/注释也会经过头部拼接）；
+    超过 MAX_FILE_SIZE 的拼接文件放在目录、zip、tar.gz 和内存中时必须都被流式扫描，发现相同
+    """
+    analyzer = RegexAnalyzer(mode)
+    by_suffix = {}
+    for suffix, content in files:
+        by_suffix.setdefault(suffix, []).append(content)
+    large = [(suffix, '\n'.join(group)) for suffix, group in sorted(by_suffix.items())]
+    # Python 源码按 JavaScript 分析：撇号和反引号形成跨越多个块的字符串区域
+    extra = [('.py as .js', content) for suffix, content in large if suffix == '.py']
+    total_bytes = sum(len(content.encode('utf-8')) for _, content in large + extra)
+    print(f"\n[streamed] {len(large) + len(extra)} concatenated files, {total_bytes / 1024 / 1024:.2f} MB, "
+          f"{chunk_size // 1024} KB chunks")
+
+    def key(findings):
+        return [(f.line, f.rule_id, f.category, f.description, f.snippet, f.confidence) for f in findings]
+
+    results = []
+    elapsed = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        skill = Path(tmp) / 'skill'
+        skill.mkdir()
+        cases = [(skill / f'large{suffix}', suffix, content) for suffix, content in large]
+        cases += [(Path(tmp) / 'large.js', label, content) for label, content in extra]
+        for path, suffix, content in cases:
+            path.write_text(content, encoding='utf-8')
+            expected = analyzer.analyze_context(FileContext(path, text=content))
+
+            start = time.perf_counter()
+            streamed = []
+            next_allowed = [0] * len(analyzer.plan.rules)
+            for window in text_windows(path, chunk_size, overlap=4096, max_lookbehind=chunk_size // 4):
+                streamed.extend(analyzer.analyze_window(FileContext(path, text=window.text), window, next_allowed))
+            elapsed += time.perf_counter() - start
+            results.append((suffix, expected, streamed))
+        report('windows', 1, total_bytes, elapsed)
+        sources = _scan_sources(skill, mode)
+
+    for suffix, expected, streamed in results:
+        if sorted(key(expected)) != sorted(key(streamed)):
+            print(f"  !! streamed findings differ on the {suffix} file")
+            return False
+    print(f"  findings identical: yes ({sum(len(expected) for _, expected, _ in results)} findings)")
+
+    oversized = sorted(f'large{suffix}' for suffix, content in large
+                       if len(content.encode('utf-8')) > SkillScanner.MAX_FILE_SIZE)
+    if not oversized:
+        return True
+
+    def scan_key(result):
+        return sorted((Path(finding.file).name, finding.line, finding.description, finding.snippet)
+                      for finding in result.findings)
+
+    expected = scan_key(sources['directory'])
+    for name, result in sources.items():
+        if sorted(Path(path).name for path in result.streamed_files) != oversized:
+            print(f"  !! {name}: files over MAX_FILE_SIZE were not streamed ({result.streamed_files})")
+            return False
+        if scan_key(result) != expected:
+            print(f"  !! {name}: findings differ from the directory scan")
+            return False
+    print(f"  {', '.join(sources)}: {len(oversized)} oversized files streamed, findings identical")
+    return True
+
+
+def _scan_sources(skill: Path, mode: AnalysisMode):
+    """以目录、zip、tar.gz 和内存中的文件四种方式扫描同一个 skill"""
+    files = {path.name: path.read_bytes() for path in sorted(skill.iterdir())}
+    zip_path = skill.parent / 'skill.zip'
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    tar_path = skill.parent / 'skill.tar.gz'
+    with tarfile.open(tar_path, 'w:gz') as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    scanner = SkillScanner(mode, jobs=1)
+    with scanner:
+        return {
+            'directory': scanner.scan(str(skill)),
+            'zip': scanner.scan(str(zip_path)),
+            'tar.gz': scanner.scan(str(tar_path)),
+            'memory': scanner.scan_files(files),
+        }
+
+
+def _synthetic_rule_pack(path: Path, count: int):
+    """生成包含 count 条规则的 TOML 规则包（模拟大型外部规则集）"""
+    tools = ['curl', 'wget', 'nc', 'scp', 'rsync', 'ssh', 'python', 'node']
+    lines = ['name = "synthetic"', 'version = "1"', '']
+    for index in range(count):
+        tool = tools[index % len(tools)]
+        lines += [
+            '[[rules]]',
+            f'id = "SYN-{index:04d}"',
+            f'severity = "{("high", "medium", "low")[index % 3]}"',
+            'category = "synthetic"',
+            f"pattern = '{tool}\\s+--opt{index}(=|\\s+)\\S+'",
+            '',
+        ]
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+
+def bench_rule_pack(contents, mode: AnalysisMode, repeat: int, count: int = 500):
+    """规则包启动开销：无缓存（校验 + 解析正则） vs 磁盘缓存命中（延迟编译）"""
+    import re
+    import tempfile
+    from src.rule_packs import load_rule_pack
+    from src.analyzers.regex_analyzer import build_rule_plan
+
+    print(f"\n[rule-pack] {count} synthetic rules")
+    with tempfile.TemporaryDirectory() as tmp:
+        pack_path = Path(tmp) / 'synthetic.toml'
+        _synthetic_rule_pack(pack_path, count)
+        cache_dir = Path(tmp) / 'cache'
+
+        def startup(use_cache: bool):
+            best = float('inf')
+            for _ in range(repeat):
+                re.purge()
+                start = time.perf_counter()
+                pack = load_rule_pack(pack_path, cache_dir, use_cache=use_cache)
+                plan = build_rule_plan(mode, [pack])
+                best = min(best, time.perf_counter() - start)
+            return pack, plan, best
+
+        cold_pack, cold_plan, cold = startup(False)
+        print(f"  {'no cache':<28} {cold * 1000:>8.1f} ms")
+        load_rule_pack(pack_path, cache_dir)
+        warm_pack, warm_plan, warm = startup(True)
+        print(f"  {'plan cache hit':<28} {warm * 1000:>8.1f} ms")
+
+        if cold_pack.rules != warm_pack.rules or cold_pack.literals != warm_pack.literals:
+            print("  !! cached rule pack differs from a fresh build")
+            return False
+
+        def spans(plan):
+            return [
+                [[match.span() for match in matches] for matches in plan.find_matches(content)]
+                for content in contents
+            ]
+        if spans(cold_plan) != spans(warm_plan):
+            print("  !! matches differ between cold and cached plans")
+            return False
+        print("  matches identical: yes")
+    return True
+
+
+def bench_server(corpus: Path, mode: AnalysisMode, repeat: int, startup_timeout: float = 30):
+    """
+    常驻服务：通过 CLI 启动 serve（与用户相同的参数解析和 ScanService 构造），
+    每次扫描启动一个新进程 vs 通过 Unix socket 发给服务；服务的结果必须与进程内扫描相同
+    """
+    print(f"\n[server] {corpus}")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cli = [sys.executable, '-m', 'src.cli']
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, 'trustskill.sock')
+        server = subprocess.Popen(
+            cli + ['serve', '--socket', socket_path, '-m', mode.value],
+            cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        try:
+            client = ScanClient(socket_path, timeout=600, retries=0)
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                if server.poll() is not None:
+                    print(f"  !! serve exited with status {server.returncode} at startup:")
+                    print('     ' + server.stderr.read().decode('utf-8', errors='replace').strip().replace('\n', '\n     '))
+                    return False
+                try:
+                    client.health()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        print(f"  !! serve did not answer /health within {startup_timeout:.0f}s")
+                        return False
+                    time.sleep(0.05)
+
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run(
+                    cli + [str(corpus.resolve()), '-m', mode.value, '-f', 'json'], cwd=root, stdout=subprocess.DEVNULL
+                )
+                best = min(best, time.perf_counter() - start)
+            print(f"  {'new process per scan':<28} {best:.3f}s")
+
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                served = client.scan(str(corpus))
+                best = min(best, time.perf_counter() - start)
+            print(f"  {'scan via serve':<28} {best:.3f}s")
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    with SkillScanner(mode) as scanner:
+        expected = scanner.scan(str(corpus.resolve()))
+
+    def key(result):
+        return [(f.file, f.line, f.rule_id, f.category, f.description, f.snippet) for f in result.findings]
+
+    if key(served) != key(expected) or served.files_scanned != expected.files_scanned:
+        print("  !! findings from serve differ from an in-process scan")
+        return False
+    print(f"  findings identical: yes ({len(served.findings)} findings, {served.files_scanned} files)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Orange TrustSkill benchmark')
+    parser.add_argument('corpus', help='Directory to use as benchmark corpus (e.g. a skills mirror)')
+    parser.add_argument('-m', '--mode', choices=['fast', 'standard', 'deep'], default='deep')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions, best time is reported (default: 3)')
+    parser.add_argument('--adversarial', action='store_true',
+                        help='Also time pathological single-line inputs (fails if over --time-limit)')
+    parser.add_argument('--adversarial-size', type=float, default=10, help='Adversarial input size in MB (default: 10)')
+    parser.add_argument('--time-limit', type=float, default=30, help='Per-input time limit in seconds (default: 30)')
+    args = parser.parse_args()
+
+    mode = AnalysisMode(args.mode)
+    contents = load_corpus(Path(args.corpus), mode)
+    if not contents:
+        print(f"No scannable files found in {args.corpus}")
+        sys.exit(1)
+
+    ok = bench_regex(contents, mode, args.repeat)
+    ok = bench_rule_pack(contents, mode, args.repeat) and ok
+    files_with_suffix = load_corpus(Path(args.corpus), mode, with_suffix=True)
+    ok = bench_routing(files_with_suffix, mode, args.repeat) and ok
+    ok = bench_mapped(files_with_suffix, mode, args.repeat) and ok
+    ok = bench_streamed(files_with_suffix, mode) and ok
+    python_files = load_corpus(Path(args.corpus), mode, suffix='.py')
+    if python_files:
+        ok = bench_regions(python_files, args.repeat) and ok
+        if mode != AnalysisMode.FAST:
+            ok = bench_ast(python_files, mode, args.repeat) and ok
+            ok = bench_ast_engine(python_files, args.repeat) and ok
+    ok = bench_server(Path(args.corpus), mode, args.repeat) and ok
+    if args.adversarial:
+        ok = bench_adversarial(mode, args.adversarial_size, args.time_limit) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
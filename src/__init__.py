@@ -11,14 +11,21 @@ from .types import (
     Severity,
     AnalysisMode,
     SecurityIssue,
-    ScanResult
+    ScanResult,
+    FileResult,
+    FleetSummary
 )
-from .scanner import SkillScanner
+from .scanner import SkillScanner, discover_skills
+from .context import FileContext
+from .rule_packs import RulePack, RulePackError, load_rule_pack
+from .archive import ArchiveLimits, ArchiveError, ArchiveLimitError
+from .server import ScanService, ScanClient, ServerBusyError, ScanRequestError
 from .analyzers.regex_analyzer import RegexAnalyzer
 from .analyzers.ast_analyzer import ASTAnalyzer
 from .formatters.text_formatter import TextFormatter, ProgressTracker
 from .formatters.json_formatter import JsonFormatter
 from .formatters.markdown_formatter import MarkdownFormatter
+from .formatters.jsonl_formatter import JsonLinesFormatter
 
 __all__ = [
     '__version__',
@@ -26,11 +33,26 @@ __all__ = [
     'AnalysisMode',
     'SecurityIssue',
     'ScanResult',
+    'FileResult',
+    'FleetSummary',
     'SkillScanner',
+    'discover_skills',
+    'FileContext',
+    'RulePack',
+    'RulePackError',
+    'load_rule_pack',
+    'ArchiveLimits',
+    'ArchiveError',
+    'ArchiveLimitError',
+    'ScanService',
+    'ScanClient',
+    'ServerBusyError',
+    'ScanRequestError',
     'RegexAnalyzer',
     'ASTAnalyzer',
     'TextFormatter',
     'ProgressTracker',
     'JsonFormatter',
     'MarkdownFormatter',
+    'JsonLinesFormatter',
 ]
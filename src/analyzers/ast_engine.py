@@ -0,0 +1,214 @@
+"""
+AST 规则引擎 - 按节点类型分派的单遍遍历
+规则以声明式处理函数注册（节点类型 -> 检查函数），引擎对语法树做一次迭代式先序遍历，
+只在注册过的节点类型上调用处理函数，不再对每个节点做 NodeVisitor 的方法查找和 generic_visit 递归
+"""
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Callable, Iterator, Iterable, Optional, Type
+
+from ..types import SecurityIssue, Severity
+from ..line_index import LineIndex
+from ..rules import (
+    AST_DANGEROUS_CALLS,
+    AST_OS_COMMAND_CALLS,
+    AST_SUBPROCESS_SHELL_CALLS,
+    AST_SENSITIVE_OPEN_PATTERNS,
+    AST_DESERIALIZATION_IMPORTS,
+    AST_DESERIALIZATION_FROM_IMPORTS,
+)
+
+
+class AstReporter:
+    """处理函数报告发现的入口（负责行号和代码片段）"""
+
+    def __init__(self, filename: str, lines: LineIndex):
+        self.filename = filename
+        self.lines = lines
+        self.issues: List[SecurityIssue] = []
+
+    def _get_snippet(self, line_number: int) -> str:
+        """获取节点所在行作为代码片段"""
+        line = self.lines.line(line_number)
+        if line is None:
+            return ""
+        line = line.strip()
+        return line[:100] + '...' if len(line) > 100 else line
+
+    def report(self, node: ast.AST, level: Severity, category: str, description: str, confidence: float):
+        """报告一个发现"""
+        line_number = getattr(node, 'lineno', 1)
+        self.issues.append(SecurityIssue(
+            level=level,
+            category=category,
+            description=description,
+            file=self.filename,
+            line=line_number,
+            snippet=self._get_snippet(line_number),
+            confidence=confidence
+        ))
+
+
+@dataclass
+class AstHandler:
+    """声明式 AST 规则：在 node_type 类型的节点上调用 check(node, reporter)"""
+    node_type: Type[ast.AST]
+    check: Callable[[ast.AST, AstReporter], None]
+
+
+# 没有子节点的常见节点类型：不会包含任何规则关注的节点，遍历时不入栈（除非有规则注册了它们）
+_LEAF_TYPES = frozenset(
+    [ast.Name, ast.Constant, ast.alias]
+    + [cls for base in (ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop)
+       for cls in base.__subclasses__()]
+)
+
+
+def walk_preorder(tree: ast.AST, skip: frozenset = frozenset()) -> Iterator[ast.AST]:
+    """
+    迭代式先序遍历（顺序与 NodeVisitor.generic_visit 的递归遍历一致）
+
+    Args:
+        tree: 语法树
+        skip: 不产出的叶子节点类型
+    """
+    AST = ast.AST
+    stack = [tree]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        yield node
+        # 字段和列表元素都反向入栈，保证按源码字段顺序先访问第一个子节点
+        fields = node._fields
+        for index in range(len(fields) - 1, -1, -1):
+            value = getattr(node, fields[index], None)
+            if value.__class__ is list:
+                for item in reversed(value):
+                    if isinstance(item, AST) and item.__class__ not in skip:
+                        push(item)
+            elif isinstance(value, AST) and value.__class__ not in skip:
+                push(value)
+
+
+class AstRuleEngine:
+    """按节点类型分派的 AST 规则引擎"""
+
+    def __init__(self, handlers: Iterable[AstHandler]):
+        """
+        Args:
+            handlers: 规则处理函数（同一节点上按注册顺序调用）
+        """
+        self.handlers = list(handlers)
+        self._dispatch: Dict[type, List[Callable]] = {}
+        for handler in self.handlers:
+            self._dispatch.setdefault(handler.node_type, []).append(handler.check)
+        self._skip = frozenset(_LEAF_TYPES.difference(self._dispatch))
+
+    def run(self, tree: ast.AST, filename: str, lines: LineIndex) -> List[SecurityIssue]:
+        """遍历语法树，返回所有处理函数报告的发现"""
+        reporter = AstReporter(filename, lines)
+        dispatch = self._dispatch
+        for node in walk_preorder(tree, self._skip):
+            checks = dispatch.get(type(node))
+            if checks:
+                for check in checks:
+                    check(node, reporter)
+        return reporter.issues
+
+
+# ---------------------------------------------------------------------------
+# 内置规则
+# ---------------------------------------------------------------------------
+
+def _get_func_name(node: ast.expr) -> Optional[str]:
+    """获取被调用函数的名称（name 或 obj.name）"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _is_module_call(node: ast.expr, module: str) -> bool:
+    """检查是否是 module.func 形式的调用"""
+    return (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == module
+    )
+
+
+def check_dangerous_call(node: ast.Call, reporter: AstReporter):
+    """eval/exec/compile/__import__ 使用非常量参数（动态执行）"""
+    danger = AST_DANGEROUS_CALLS.get(_get_func_name(node.func))
+    if danger is None:
+        return
+    if any(not isinstance(arg, ast.Constant) for arg in node.args):
+        category, description = danger
+        reporter.report(node, Severity.HIGH, category, f"{description} with variable", 0.9)
+
+
+def check_os_command(node: ast.Call, reporter: AstReporter):
+    """os.system() / os.popen()"""
+    func_name = _get_func_name(node.func)
+    if func_name in AST_OS_COMMAND_CALLS and _is_module_call(node.func, 'os'):
+        reporter.report(node, Severity.HIGH, 'command_injection', f'os.{func_name}() call', 0.85)
+
+
+def check_subprocess_shell(node: ast.Call, reporter: AstReporter):
+    """subprocess 调用带 shell=True"""
+    if _get_func_name(node.func) not in AST_SUBPROCESS_SHELL_CALLS:
+        return
+    if not _is_module_call(node.func, 'subprocess'):
+        return
+    for keyword in node.keywords:
+        if keyword.arg == 'shell':
+            if isinstance(keyword.value, ast.Constant) and keyword.value.value is True:
+                reporter.report(node, Severity.HIGH, 'command_injection', 'subprocess with shell=True', 0.95)
+            return
+
+
+def check_sensitive_open(node: ast.Call, reporter: AstReporter):
+    """open() 打开敏感文件"""
+    if _get_func_name(node.func) != 'open' or not node.args:
+        return
+    first_arg = node.args[0]
+    if not (isinstance(first_arg, ast.Constant) and isinstance(first_arg.value, str)):
+        return
+    for pattern, description in AST_SENSITIVE_OPEN_PATTERNS:
+        if re.search(pattern, first_arg.value, re.IGNORECASE):
+            reporter.report(node, Severity.HIGH, 'sensitive_file_access', description, 0.85)
+            break
+
+
+def check_deserialization_import(node: ast.Import, reporter: AstReporter):
+    """import pickle / marshal / shelve"""
+    for alias in node.names:
+        if alias.name in AST_DESERIALIZATION_IMPORTS:
+            reporter.report(
+                node, Severity.MEDIUM, 'deserialization',
+                f'{alias.name} import (unsafe deserialization)', 0.7
+            )
+
+
+def check_deserialization_from_import(node: ast.ImportFrom, reporter: AstReporter):
+    """from pickle / marshal import ..."""
+    if node.module in AST_DESERIALIZATION_FROM_IMPORTS:
+        reporter.report(
+            node, Severity.MEDIUM, 'deserialization',
+            f'{node.module} import (unsafe deserialization)', 0.7
+        )
+
+
+# 内置规则（同一节点上的报告顺序与注册顺序一致）
+DEFAULT_AST_HANDLERS = [
+    AstHandler(ast.Call, check_dangerous_call),
+    AstHandler(ast.Call, check_os_command),
+    AstHandler(ast.Call, check_subprocess_shell),
+    AstHandler(ast.Call, check_sensitive_open),
+    AstHandler(ast.Import, check_deserialization_import),
+    AstHandler(ast.ImportFrom, check_deserialization_from_import),
+]
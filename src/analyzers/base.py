@@ -7,11 +7,15 @@ from typing import List, Optional
 from pathlib import Path
 
 from ..types import SecurityIssue, AnalysisMode
+from ..context import FileContext
 
 
 class BaseAnalyzer(ABC):
     """分析器基类"""
     
+    # 分析器版本：检测逻辑变化时递增，使结果缓存失效
+    VERSION = 1
+    
     def __init__(self, mode: AnalysisMode = AnalysisMode.STANDARD):
         self.mode = mode
     
@@ -29,6 +33,21 @@ class BaseAnalyzer(ABC):
         """
         pass
     
+    def analyze_context(self, ctx: FileContext) -> List[SecurityIssue]:
+        """
+        分析文件上下文（扫描器调用的入口）
+
+        默认实现调用 analyze(file_path, content)，兼容只实现了 analyze 的第三方分析器；
+        内置分析器覆盖此方法，复用上下文中已计算的行索引、语法树等中间结果
+
+        Args:
+            ctx: 文件上下文
+
+        Returns:
+            发现的安全问题列表
+        """
+        return self.analyze(ctx.path, ctx.text)
+
     @abstractmethod
     def get_name(self) -> str:
         """获取分析器名称"""
@@ -1,20 +1,25 @@
 """
 正则表达式分析器 - 优化版
-改进：预编译正则表达式以提高性能
+改进：预编译正则表达式以提高性能；所有规则合并为单遍扫描的执行计划
 """
 
 import re
-from typing import List, Dict, Tuple, Pattern
+from typing import List, Dict, Tuple, Pattern, Sequence, Optional
 from pathlib import Path
 
 from .base import BaseAnalyzer
+from .rule_plan import RulePlan, PlannedRule, NearMatcher, LazyPattern, binary_rule_plan
+from ..context import FileContext
 from ..types import SecurityIssue, Severity, AnalysisMode
 from ..rules import (
     HIGH_RISK_PATTERNS,
     MEDIUM_RISK_PATTERNS,
     LOW_RISK_PATTERNS,
     SUSPICIOUS_PATTERNS,
-    SAFE_SERVICES
+    SAFE_SERVICES,
+    LANGUAGE_EXTENSIONS,
+    RULE_LANGUAGES,
+    Near
 )
 
 
@@ -37,13 +42,16 @@ class CompiledPatterns:
 
         for patterns in dict_patterns:
             for category, pattern_list in patterns.items():
-                for pattern, description in pattern_list:
-                    if pattern not in self._compiled:
-                        try:
-                            self._compiled[pattern] = re.compile(pattern, re.IGNORECASE)
-                        except re.error:
-                            # 如果编译失败，跳过
-                            pass
+                for rule, description in pattern_list:
+                    # 共现规则的两部分分别编译
+                    parts = (rule.first, rule.second) if isinstance(rule, Near) else (rule,)
+                    for pattern in parts:
+                        if pattern not in self._compiled:
+                            try:
+                                self._compiled[pattern] = re.compile(pattern, re.IGNORECASE)
+                            except re.error:
+                                # 如果编译失败，跳过
+                                pass
 
         # 列表类型的模式 (SUSPICIOUS_PATTERNS)
         for pattern, description in SUSPICIOUS_PATTERNS:
@@ -64,38 +72,138 @@ class CompiledPatterns:
 _compiled_cache = CompiledPatterns()
 
 
-class RegexAnalyzer(BaseAnalyzer):
-    """正则表达式分析器 - 快速模式匹配（优化版）"""
+# 各分析模式启用的严重程度（内置规则和规则包规则相同）
+_MODE_SEVERITIES = {
+    AnalysisMode.FAST: {Severity.HIGH},
+    AnalysisMode.STANDARD: {Severity.HIGH, Severity.MEDIUM},
+    AnalysisMode.DEEP: {Severity.HIGH, Severity.MEDIUM, Severity.LOW},
+}
+
+
+def _pack_rules(mode: AnalysisMode, rule_packs: Sequence) -> List[PlannedRule]:
+    """规则包中本模式启用的规则（相同的正则共享一个延迟编译对象）"""
+    patterns: Dict[str, LazyPattern] = {}
+
+    def lazy(pattern: str) -> LazyPattern:
+        if pattern not in patterns:
+            patterns[pattern] = LazyPattern(pattern, re.IGNORECASE)
+        return patterns[pattern]
+
+    rules: List[PlannedRule] = []
+    for pack in rule_packs:
+        for rule in pack.rules:
+            if rule.severity not in _MODE_SEVERITIES[mode]:
+                continue
+            near = None
+            if rule.near is not None:
+                near = NearMatcher(lazy(rule.near), rule.window, rule.window_chars)
+            rules.append(PlannedRule(
+                rule.severity, rule.category, rule.description, rule.pattern, lazy(rule.pattern),
+                near=near, rule_id=rule.id, confidence=rule.confidence,
+                file_types=rule.file_types, languages=rule.languages
+            ))
+    return rules
+
+
+def build_rule_plan(mode: AnalysisMode, rule_packs: Sequence = ()) -> RulePlan:
+    """
+    按分析模式构建规则执行计划
+
+    规则顺序与逐层检查的顺序一致：HIGH、MEDIUM、LOW、可疑 URL，
+    因此按计划顺序输出的发现与逐条规则扫描完全相同。
+    规则包中的规则排在内置规则之后（按规则包和规则的声明顺序）。
+    规则按 RULE_LANGUAGES 声明的语言路由，每个文件只运行适用于其扩展名的规则。
+    """
+    tiers: List[Tuple[Dict[str, List[Tuple[str, str]]], Severity]] = [
+        (HIGH_RISK_PATTERNS, Severity.HIGH)
+    ]
+    if mode in [AnalysisMode.STANDARD, AnalysisMode.DEEP]:
+        tiers.append((MEDIUM_RISK_PATTERNS, Severity.MEDIUM))
+    if mode == AnalysisMode.DEEP:
+        tiers.append((LOW_RISK_PATTERNS, Severity.LOW))
+
+    rules: List[PlannedRule] = []
+    for patterns, severity in tiers:
+        for category, pattern_list in patterns.items():
+            for pattern, description in pattern_list:
+                near = None
+                languages = RULE_LANGUAGES.get(pattern)
+                try:
+                    if isinstance(pattern, Near):
+                        near = NearMatcher(_compiled_cache.get(pattern.second), pattern.lines, pattern.chars)
+                        pattern = pattern.first
+                    compiled = _compiled_cache.get(pattern)
+                except re.error:
+                    # 正则错误，跳过
+                    continue
+                rules.append(PlannedRule(
+                    severity, category, description, pattern, compiled, near=near,
+                    languages=frozenset(languages) if languages is not None else None
+                ))
+
+    # 检查可疑 URL
+    if mode in [AnalysisMode.STANDARD, AnalysisMode.DEEP]:
+        for pattern, description in SUSPICIOUS_PATTERNS:
+            try:
+                compiled = _compiled_cache.get(pattern)
+            except re.error:
+                continue
+            rules.append(PlannedRule(
+                Severity.MEDIUM, 'suspicious_url', description, pattern, compiled, url_rule=True
+            ))
+
+    rules.extend(_pack_rules(mode, rule_packs))
+    known_literals = {}
+    for pack in rule_packs:
+        known_literals.update(pack.literals)
+    extension_languages = {
+        extension: language
+        for language, extensions in LANGUAGE_EXTENSIONS.items()
+        for extension in extensions
+    }
+    return RulePlan(rules, known_literals=known_literals, extension_languages=extension_languages)
 
-    def get_name(self) -> str:
-        return "RegexAnalyzer"
 
-    def _is_in_string_literal(self, content: str, position: int) -> bool:
-        """检查位置是否在字符串字面量中 - 优化版"""
-        # 只检查当前行，提高效率
-        line_start = content.rfind('\n', 0, position) + 1
-        line_end = content.find('\n', position)
-        if line_end == -1:
-            line_end = len(content)
+# 每种模式（及规则包组合）的执行计划（首次使用时构建）
+_rule_plans: Dict[Tuple[AnalysisMode, Tuple[str, ...], bool], Optional[RulePlan]] = {}
 
-        current_line = content[line_start:line_end]
 
-        # 检查是否在字符串中（简化版，只检查双引号）
-        quote_count = current_line.count('"')
-        single_count = current_line.count("'")
+def get_rule_plan(mode: AnalysisMode, rule_packs: Sequence = (), binary: bool = False) -> Optional[RulePlan]:
+    """
+    获取（必要时构建）分析模式和规则包对应的执行计划
 
-        # 如果到 position 的引号数量是奇数，则在字符串中
-        pos_in_line = position - line_start
-        double_quotes_before = current_line[:pos_in_line].count('"')
-        single_quotes_before = current_line[:pos_in_line].count("'")
+    binary 为 True 时返回扫描映射内容的字节版本（首次扫描映射文件时构建）；
+    有规则无法转换为 bytes 正则时为 None
+    """
+    key = (mode, tuple(pack.sha256 for pack in rule_packs), binary)
+    if key not in _rule_plans:
+        if binary:
+            _rule_plans[key] = binary_rule_plan(get_rule_plan(mode, rule_packs))
+        else:
+            _rule_plans[key] = build_rule_plan(mode, rule_packs)
+    return _rule_plans[key]
+
+
+class RegexAnalyzer(BaseAnalyzer):
+    """正则表达式分析器 - 快速模式匹配（优化版）"""
 
-        # 检查是否在引号对之间
-        if double_quotes_before % 2 == 1:
-            return True
-        if single_quotes_before % 2 == 1:
-            return True
+    # 2: 字符串字面量判断改为基于词法分析的区域掩码
+    # 3: 规则按文件类型路由（RULE_LANGUAGES）
+    # 4: Shell here-document 的结束标记必须是完整的单词（不再回溯到标记的前缀）
+    VERSION = 4
+
+    def __init__(self, mode: AnalysisMode = AnalysisMode.STANDARD, rule_packs: Optional[Sequence] = None):
+        """
+        Args:
+            mode: 分析模式
+            rule_packs: 额外加载的规则包（见 rule_packs.load_rule_pack）
+        """
+        super().__init__(mode)
+        self.rule_packs = list(rule_packs or ())
+        self.plan = get_rule_plan(mode, self.rule_packs)
 
-        return False
+    def get_name(self) -> str:
+        return "RegexAnalyzer"
 
     def _is_pattern_definition(self, content: str, position: int) -> bool:
         """检查是否是正则模式定义"""
@@ -109,11 +217,12 @@ class RegexAnalyzer(BaseAnalyzer):
         ]
         return any(ind in context for ind in indicators)
 
-    def _is_example_code(self, content: str, position: int) -> bool:
+    def _is_example_code(self, ctx: FileContext, position: int) -> bool:
         """检查是否是示例/文档代码"""
         start = max(0, position - 200)
-        end = min(len(content), position + 200)
-        context = content[start:end].lower()
+        end = min(len(ctx.text_view), position + 200)
+        # 小写文本按文件缓存，与原文偏移对齐（映射内容只解码这一小段）
+        context = ctx.lower_view[start:end]
 
         indicators = [
             'example', 'danger:', 'caution:', 'warning:',
@@ -133,101 +242,95 @@ class RegexAnalyzer(BaseAnalyzer):
         snippet = content[start:end].replace('\n', ' ').strip()
         return snippet[:100] + '...' if len(snippet) > 100 else snippet
 
-    def _get_line_number(self, content: str, position: int) -> int:
-        """获取位置对应的行号 - 优化版（使用快速计数）"""
-        # 只计算到 position 的换行符数量
-        return content.count('\n', 0, position) + 1
+    def analyze(self, file_path: Path, content: str) -> List[SecurityIssue]:
+        """使用正则表达式分析文件"""
+        return self.analyze_context(FileContext(file_path, text=content))
+
+    def analyze_context(self, ctx: FileContext) -> List[SecurityIssue]:
+        """
+        使用正则表达式分析文件 - 单遍扫描所有规则
+
+        映射的大文件（ctx.binary）由字节版执行计划直接扫描，不解码整个文件；
+        片段和上下文判断只解码匹配附近的小窗口
+        """
+        plan = get_rule_plan(self.mode, self.rule_packs, binary=True) if ctx.binary else None
+        if plan is not None:
+            matches_by_rule = plan.find_matches(ctx.data, suffix=ctx.path.suffix)
+        else:
+            plan = self.plan
+            matches_by_rule = plan.find_matches(ctx.text, ctx.lower, ctx.path.suffix)
+        return self._report(ctx, plan, matches_by_rule)
+
+    def analyze_window(self, ctx: FileContext, window, next_allowed: List[int]) -> List[SecurityIssue]:
+        """
+        分析流式扫描的一个窗口（见 streaming.text_windows）
+
+        只报告起点在本块内的匹配，行号加上窗口之前的换行数；
+        设置 window.keep_from，使下一个窗口从区域掩码的同步点开始
+
+        Args:
+            ctx: 窗口文本的上下文（路径为原文件）
+            window: TextWindow
+            next_allowed: 每条规则下一个匹配允许的起点（全文偏移），在窗口之间传递并更新
+        """
+        local = [max(0, position - window.offset) for position in next_allowed]
+        matches_by_rule = self.plan.find_matches(
+            ctx.text, ctx.lower, ctx.path.suffix, window.start, window.stop, local
+        )
+        next_allowed[:] = [position + window.offset for position in local]
+        issues = self._report(ctx, self.plan, matches_by_rule, window.line_offset)
+        # 下一个窗口从行首开始（词法正则的后顾断言在行首与文件开头相同），且不从字符串/注释中间开始，
+        # 区域掩码才与整个文件扫描一致
+        line_start = ctx.text.rfind('\n', 0, window.next_start - window.offset) + 1
+        window.keep_from = window.absolute(ctx.regions.resume_point(line_start))
+        return issues
 
-    def _check_patterns(
+    def _report(
         self,
-        content: str,
-        patterns: Dict[str, List[Tuple[str, str]]],
-        severity: Severity,
-        file_path: Path
+        ctx: FileContext,
+        plan: RulePlan,
+        matches_by_rule: List[List],
+        line_offset: int = 0
     ) -> List[SecurityIssue]:
-        """检查模式 - 优化版"""
+        """过滤匹配（字符串字面量、模式定义、示例代码、白名单 URL）并生成发现"""
         issues = []
-        relative_path = file_path.name
-
-        for category, pattern_list in patterns.items():
-            for pattern, description in pattern_list:
-                try:
-                    compiled = _compiled_cache.get(pattern)
-
-                    for match in compiled.finditer(content):
-                        pos = match.start()
-
-                        # 跳过字符串字面量中的匹配
-                        if self._is_in_string_literal(content, pos):
-                            continue
-
-                        # 跳过模式定义
-                        if self._is_pattern_definition(content, pos):
-                            continue
-
-                        # 跳过示例代码
-                        if self._is_example_code(content, pos):
-                            continue
-
-                        issues.append(SecurityIssue(
-                            level=severity,
-                            category=category,
-                            description=description,
-                            file=str(relative_path),
-                            line=self._get_line_number(content, pos),
-                            snippet=self._get_snippet(content, pos),
-                            confidence=0.8
-                        ))
-                except re.error:
-                    # 正则错误，跳过
-                    continue
-
-        return issues
-
-    def analyze(self, file_path: Path, content: str) -> List[SecurityIssue]:
-        """使用正则表达式分析文件 - 优化版"""
-        issues = []
-
-        # 检查高风险模式
-        issues.extend(self._check_patterns(
-            content, HIGH_RISK_PATTERNS, Severity.HIGH, file_path
-        ))
-
-        # 检查中风险模式
-        if self.mode in [AnalysisMode.STANDARD, AnalysisMode.DEEP]:
-            issues.extend(self._check_patterns(
-                content, MEDIUM_RISK_PATTERNS, Severity.MEDIUM, file_path
-            ))
-
-        # 检查低风险模式
-        if self.mode == AnalysisMode.DEEP:
-            issues.extend(self._check_patterns(
-                content, LOW_RISK_PATTERNS, Severity.LOW, file_path
-            ))
-
-        # 检查可疑 URL
-        if self.mode in [AnalysisMode.STANDARD, AnalysisMode.DEEP]:
-            for pattern, description in SUSPICIOUS_PATTERNS:
-                try:
-                    compiled = _compiled_cache.get(pattern)
-
-                    for match in compiled.finditer(content):
-                        url = match.group(0)
-                        if self._is_safe_service(url):
-                            continue
-
-                        pos = match.start()
-
-                        issues.append(SecurityIssue(
-                            level=Severity.MEDIUM,
-                            category='suspicious_url',
-                            description=description,
-                            file=str(file_path.name),
-                            line=self._get_line_number(content, pos),
-                            snippet=self._get_snippet(content, pos),
-                            confidence=0.7
-                        ))
-                except re.error:
-                    continue
+        relative_path = str(ctx.path.name)
+        content = ctx.text_view
+        for rule, matches in zip(plan.rules, matches_by_rule):
+            for match in matches:
+                pos = match.start()
+
+                if rule.url_rule:
+                    # URL 规则：跳过白名单服务
+                    url = match.group(0)
+                    if self._is_safe_service(url if isinstance(url, str) else url.decode('ascii')):
+                        continue
+                    confidence = 0.7
+                else:
+                    # 跳过字符串字面量中的匹配（区域掩码在第一次需要时构建）
+                    if ctx.regions.in_string(pos):
+                        continue
+
+                    # 跳过模式定义
+                    if self._is_pattern_definition(content, pos):
+                        continue
+
+                    # 跳过示例代码
+                    if self._is_example_code(ctx, pos):
+                        continue
+                    confidence = 0.8
+                if rule.confidence is not None:
+                    confidence = rule.confidence
+
+                issues.append(SecurityIssue(
+                    level=rule.severity,
+                    category=rule.category,
+                    description=rule.description,
+                    file=relative_path,
+                    line=ctx.lines.line_number(pos) + line_offset,
+                    snippet=self._get_snippet(content, pos),
+                    confidence=confidence,
+                    rule_id=rule.rule_id
+                ))
 
         return issues
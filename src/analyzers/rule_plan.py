@@ -0,0 +1,769 @@
+"""
+规则执行计划 - 合并正则单遍扫描
+1. 字面量预过滤：编译时从每条规则提取必须出现的字面量，每个文件用一遍多字面量搜索
+   找出实际出现的字面量，只保留可能命中的规则（干净文件直接跳过正则扫描）
+2. 合并筛选：候选规则按首字符分组合并为一个筛选正则，每个文件只需扫描一遍；
+   只在筛选命中的位置对候选规则做锚定匹配
+3. 共现规则（first near second）：first 由筛选正则定位，second 的起点每个文件只搜索一次，
+   窗口判断为二分查找，替代会在长行上反复回溯的 first.*second
+4. 按文件类型路由：每种扩展名首次出现时构建一次适用规则子集及其预过滤器，
+   文件只搜索和匹配适用于其类型的规则
+5. 延迟编译：外部规则包的规则使用 LazyPattern，只有在筛选命中、需要锚定匹配时才编译；
+   已知的字面量（来自规则包的磁盘缓存）直接传入，不再解析正则
+6. 字节模式（binary_rule_plan）：规则和筛选正则编译为 bytes 版本，直接扫描映射的大文件；
+   字面量预过滤按块转换小写，不生成整个文件的小写副本
+结果与逐条 finditer 完全一致
+"""
+
+import re
+import sys
+import dataclasses
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import List, Dict, Tuple, Optional, Pattern, Match, Iterable, Iterator, FrozenSet, Set
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from ..types import Severity
+
+
+class NearMatch:
+    """共现规则的一次匹配：从 first 的起点到窗口内最后一个 second 的终点"""
+
+    __slots__ = ('string', '_start', '_end')
+
+    def __init__(self, string: str, start: int, end: int):
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+    def span(self) -> Tuple[int, int]:
+        return self._start, self._end
+
+    def group(self, index: int = 0) -> str:
+        return self.string[self._start:self._end]
+
+
+class LazyPattern:
+    """
+    首次使用时才编译的正则
+
+    提供 Pattern 的 match / search / finditer；编译后这些方法直接替换为
+    编译结果的绑定方法，之后的调用没有额外开销
+    """
+
+    def __init__(self, pattern: str, flags: int = re.IGNORECASE):
+        self.pattern = pattern
+        self.flags = flags
+
+    def compile(self) -> Pattern:
+        """编译正则（只编译一次）"""
+        compiled = re.compile(self.pattern, self.flags)
+        self.match = compiled.match
+        self.search = compiled.search
+        self.finditer = compiled.finditer
+        return compiled
+
+    def match(self, string: str, pos: int = 0, endpos: int = sys.maxsize) -> Optional[Match]:
+        return self.compile().match(string, pos, endpos)
+
+    def search(self, string: str, pos: int = 0, endpos: int = sys.maxsize) -> Optional[Match]:
+        return self.compile().search(string, pos, endpos)
+
+    def finditer(self, string: str, pos: int = 0, endpos: int = sys.maxsize) -> Iterator[Match]:
+        return self.compile().finditer(string, pos, endpos)
+
+    def __repr__(self) -> str:
+        return f'LazyPattern({self.pattern!r})'
+
+
+class _NearState:
+    """单个文件上共现规则的缓存：second 的所有匹配起点和换行位置（各只计算一次）"""
+
+    __slots__ = ('second_starts', 'newlines')
+
+    def __init__(self):
+        self.second_starts: Optional[List[int]] = None
+        self.newlines: Optional[List[int]] = None
+
+
+class NearMatcher:
+    """
+    有界共现匹配（替代 first.*second）
+
+    first 匹配后，若 second 的某个匹配起点落在窗口 [first 终点, 窗口终点] 内即命中，
+    匹配范围延伸到窗口内最后一个 second 的终点（与贪婪 .* 一致）。
+    窗口由行数和字符数限定；second 的匹配起点每个文件只搜索一次，
+    之后每次判断为二分查找，不会像 .* 那样在长行上反复回溯。
+    """
+
+    def __init__(self, second: Pattern, lines: int = 0, chars: Optional[int] = None):
+        """
+        Args:
+            second: second 的编译结果
+            lines: 窗口跨越的行数（0 表示 first 终点所在行）
+            chars: 窗口的最大字符数（None 表示只受行数限制）
+        """
+        self.second = second
+        self.lines = lines
+        self.chars = chars
+
+    def _second_starts(self, content: str, state: _NearState) -> List[int]:
+        """second 在内容中所有可能的匹配起点"""
+        if state.second_starts is None:
+            starts = []
+            search = self.second.search
+            pos = 0
+            while True:
+                match = search(content, pos)
+                if match is None:
+                    break
+                starts.append(match.start())
+                pos = match.start() + 1
+            state.second_starts = starts
+        return state.second_starts
+
+    def _window_end(self, content: str, position: int, state: _NearState) -> int:
+        """窗口终点（second 起点的最大值，含）"""
+        if state.newlines is None:
+            newline = '\n' if isinstance(content, str) else b'\n'
+            state.newlines = [match.start() for match in re.finditer(newline, content)]
+        newlines = state.newlines
+        index = bisect_left(newlines, position) + self.lines
+        end = newlines[index] if index < len(newlines) else len(content)
+        if self.chars is not None:
+            end = min(end, position + self.chars)
+        return end
+
+    def complete(self, content: str, first: Match, state: _NearState) -> Optional[NearMatch]:
+        """
+        在 first 的匹配之后查找窗口内的 second
+
+        Returns:
+            命中时返回完整匹配，否则返回 None
+        """
+        starts = self._second_starts(content, state)
+        if not starts:
+            return None
+        first_end = first.end()
+        window_end = self._window_end(content, first_end, state)
+        index = bisect_right(starts, window_end) - 1
+        if index < 0 or starts[index] < first_end:
+            return None
+        second = self.second.match(content, starts[index])
+        return NearMatch(content, first.start(), second.end())
+
+    def finditer(self, content: str, first: Pattern) -> Iterator[NearMatch]:
+        """逐个查找所有不重叠的共现匹配（参考实现，语义与执行计划中相同）"""
+        state = _NearState()
+        pos = 0
+        while True:
+            match = first.search(content, pos)
+            if match is None:
+                return
+            near = self.complete(content, match, state)
+            if near is None:
+                pos = match.start() + 1
+            else:
+                yield near
+                pos = max(near.end(), match.start() + 1)
+
+
+@dataclass
+class PlannedRule:
+    """执行计划中的单条规则"""
+    severity: Severity
+    category: str
+    description: str
+    pattern: str            # 正则（共现规则为 first）
+    compiled: Pattern
+    url_rule: bool = False  # SUSPICIOUS_PATTERNS 中的 URL 规则（使用白名单过滤）
+    near: Optional[NearMatcher] = None  # 共现规则的 second 部分
+    rule_id: Optional[str] = None       # 规则包中的规则 ID（内置规则没有）
+    confidence: Optional[float] = None  # 规则包指定的置信度（None 使用分析器默认值）
+    file_types: Optional[FrozenSet[str]] = None  # 适用的扩展名（小写，含点；None 表示所有文件）
+    languages: Optional[FrozenSet[str]] = None   # 适用的语言（见 rules.LANGUAGE_EXTENSIONS；None 表示所有语言）
+
+    def finditer(self, content: str) -> Iterable:
+        """单独扫描这条规则（不经过执行计划）"""
+        if self.near is not None:
+            return self.near.finditer(content, self.compiled)
+        return self.compiled.finditer(content)
+
+
+def split_alternatives(pattern: str) -> List[str]:
+    """按顶层 | 拆分正则（忽略分组和字符类中的 |）"""
+    alternatives = []
+    current = []
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            current.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            alternatives.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    alternatives.append(''.join(current))
+    return alternatives
+
+
+def split_first_char(alternative: str) -> Optional[Tuple[str, str]]:
+    """
+    拆出正则开头的单个字面字符
+
+    Returns:
+        (首字符, 剩余正则)；开头不是可安全拆分的字面字符时返回 None
+    """
+    if alternative.startswith('\\'):
+        # 只接受转义的标点（如 \\. \\(），\\s \\d 等字符类不能拆分
+        if len(alternative) < 2 or alternative[1].isalnum():
+            return None
+        char, rest = alternative[1], alternative[2:]
+    elif alternative[:1].isalnum() or alternative[:1] in '~_-/:@#%&=<>!,;"\'':
+        char, rest = alternative[0], alternative[1:]
+    else:
+        return None
+
+    # 首字符带量词时不能拆分（如 s?）
+    if rest[:1] in ('?', '*', '+', '{'):
+        return None
+    if not char.isascii():
+        return None
+    return char, rest
+
+
+# 预过滤字面量的最小长度，过短的字面量几乎每个文件都会出现，过滤没有意义
+MIN_LITERAL_LENGTH = 3
+
+# 忽略大小写时会匹配 ASCII 字母、但 str.lower() 不会转换为该字母的字符
+_CASE_FOLD_FIXES = str.maketrans({
+    '\u0130': 'i',  # İ
+    '\u0131': 'i',  # ı
+    '\u017f': 's',  # ſ
+})
+
+_REPEAT_OPS = tuple(
+    op for op in (
+        getattr(sre_parse, 'MAX_REPEAT', None),
+        getattr(sre_parse, 'MIN_REPEAT', None),
+        getattr(sre_parse, 'POSSESSIVE_REPEAT', None),
+    ) if op is not None
+)
+
+
+def fold_case(content: str) -> str:
+    """
+    将内容转换为小写，用于忽略大小写的字面量预过滤
+
+    保证：忽略大小写匹配到 ASCII 字面量的文本，转换后一定包含该字面量的小写形式；
+    结果与原文逐字符对齐（唯一小写后变长的字符 İ 已先替换为 i）
+    """
+    if not content.isascii():
+        content = content.translate(_CASE_FOLD_FIXES)
+    return content.lower()
+
+
+def _literal_requirements(items, ignore_case: bool) -> List[FrozenSet[str]]:
+    """
+    收集解析后正则中的必需字面量
+
+    Returns:
+        要求列表，每个要求是一个字面量集合，匹配文本中至少包含其中之一
+    """
+    requirements: List[FrozenSet[str]] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            requirements.append(frozenset([''.join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL and av < 128:
+            char = chr(av)
+            run.append(char.lower() if ignore_case else char)
+            continue
+        flush()
+
+        if op is sre_parse.SUBPATTERN:
+            group, add_flags, del_flags, pattern = av
+            # 组内修改了匹配标志时不提取，保证预过滤的正确性
+            if not add_flags and not del_flags:
+                requirements.extend(_literal_requirements(pattern, ignore_case))
+        elif op is sre_parse.BRANCH:
+            # 每个分支都有必需字面量时，整个分支的要求为各分支要求的并集
+            alternatives = []
+            for branch in av[1]:
+                best = _best_requirement(_literal_requirements(branch, ignore_case))
+                if best is None:
+                    alternatives = None
+                    break
+                alternatives.append(best)
+            if alternatives:
+                requirements.append(frozenset().union(*alternatives))
+        elif op in _REPEAT_OPS and av[0] >= 1:
+            # 至少重复一次的部分同样是必需的
+            requirements.extend(_literal_requirements(av[2], ignore_case))
+
+    flush()
+    return requirements
+
+
+def _best_requirement(requirements: List[FrozenSet[str]]) -> Optional[FrozenSet[str]]:
+    """选择选择性最好的要求：最短字面量尽量长，备选尽量少"""
+    if not requirements:
+        return None
+    return max(
+        requirements,
+        key=lambda requirement: (min(len(literal) for literal in requirement), -len(requirement))
+    )
+
+
+def extract_literals(pattern: str, flags: int = re.IGNORECASE) -> Optional[FrozenSet[str]]:
+    """
+    提取正则的必需字面量
+
+    Returns:
+        字面量集合（任一匹配都至少包含其中之一）；无法提取足够长的字面量时返回 None，
+        表示该规则不能被预过滤，必须始终执行
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return None
+    # 包含模式内联的全局标志（如 (?i)）
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+    best = _best_requirement(_literal_requirements(parsed, ignore_case))
+    if best is None or min(len(literal) for literal in best) < MIN_LITERAL_LENGTH:
+        return None
+    return best
+
+
+class LiteralPrefilter:
+    """多字面量预过滤器"""
+
+    # 字节内容（映射的大文件）每次转换小写并搜索的块大小
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, requirements: List[Optional[FrozenSet[str]]], ignore_case: bool = True):
+        """
+        Args:
+            requirements: 每条规则的必需字面量（None 表示始终执行）
+            ignore_case: 规则是否忽略大小写
+        """
+        self._ignore_case = ignore_case
+        self._always = [index for index, literals in enumerate(requirements) if literals is None]
+        self._rules_by_literal: Dict[str, List[int]] = {}
+        for index, literals in enumerate(requirements):
+            for literal in literals or ():
+                self._rules_by_literal.setdefault(literal, []).append(index)
+
+        # 被其他字面量包含的字面量先检查：它不出现时，包含它的字面量也不可能出现
+        self.literals = sorted(self._rules_by_literal, key=len)
+        self._containing = self._find_containing(self.literals)
+
+    @staticmethod
+    def _find_containing(literals: List[str]) -> Dict[str, List[str]]:
+        """
+        每个字面量 -> 包含它的其他字面量
+
+        所有字面量拼接后对每个字面量做子串查找，而不是两两比较（规则包有数百条规则时
+        两两比较是启动开销的主要部分）；跨分隔符的命中再用 in 确认
+        """
+        joined = '\0'.join(literals)
+        offsets = [0]
+        offsets.extend(accumulate(len(literal) + 1 for literal in literals[:-1]))
+        containing: Dict[str, List[str]] = {}
+        for literal in literals:
+            found: Set[int] = set()
+            pos = joined.find(literal)
+            while pos != -1:
+                found.add(bisect_right(offsets, pos) - 1)
+                pos = joined.find(literal, pos + 1)
+            containing[literal] = [
+                literals[index] for index in sorted(found)
+                if literals[index] != literal and literal in literals[index]
+            ]
+        return containing
+
+    def found_literals(self, content: str, folded: Optional[str] = None) -> Set[str]:
+        """
+        找出内容中出现的字面量
+
+        逐个字面量做子串查找（str 的子串搜索为 C 实现的快速搜索），
+        比 sre 的多分支正则快数倍：sre 没有多模式自动机，分支越多逐位置尝试越慢
+
+        Args:
+            content: 文件内容
+            folded: 已计算的 fold_case(content)（可选）
+        """
+        if not isinstance(content, str):
+            return self._found_in_chunks(content)
+        found: Set[str] = set()
+        absent: Set[str] = set()
+        if not self._ignore_case:
+            text = content
+        else:
+            text = folded if folded is not None else fold_case(content)
+        for literal in self.literals:
+            if literal in absent:
+                continue
+            if literal in text:
+                found.add(literal)
+            else:
+                absent.update(self._containing[literal])
+        return found
+
+    def _found_in_chunks(self, content) -> Set[str]:
+        """
+        找出字节内容（纯 ASCII）中出现的字面量
+
+        按块转换小写后搜索，相邻块重叠最长字面量的长度减一，跨块边界的字面量不会遗漏；
+        所有字面量都已找到时提前结束
+        """
+        encoded = {literal: literal.encode('ascii') for literal in self.literals}
+        overlap = max((len(literal) for literal in self.literals), default=1) - 1
+        found: Set[str] = set()
+        for offset in range(0, len(content), self.CHUNK_SIZE):
+            chunk = content[offset:offset + self.CHUNK_SIZE + overlap]
+            if self._ignore_case:
+                chunk = chunk.lower()
+            absent: Set[str] = set()
+            for literal in self.literals:
+                if literal in found or literal in absent:
+                    continue
+                if encoded[literal] in chunk:
+                    found.add(literal)
+                else:
+                    absent.update(self._containing[literal])
+            if len(found) == len(self.literals):
+                break
+        return found
+
+    def candidates(self, content: str, folded: Optional[str] = None) -> Tuple[int, ...]:
+        """返回内容中可能命中的规则下标（升序）"""
+        indices = set(self._always)
+        for literal in self.found_literals(content, folded):
+            indices.update(self._rules_by_literal[literal])
+        return tuple(sorted(indices))
+
+
+class _Screen:
+    """一组规则的合并筛选正则"""
+
+    def __init__(self, rules: List[PlannedRule], indices: Tuple[int, ...], flags: int, binary: bool = False):
+        self.indices = indices
+        self._flags = flags
+        self._binary = binary
+        self._ignore_case = bool(flags & re.IGNORECASE)
+        # 首字符 -> 该字符开头的候选规则下标
+        self._rules_by_char: Dict[str, List[int]] = {}
+        # 无法确定首字符、在每个命中位置都要尝试的规则
+        self._always: List[int] = []
+        self.regex = self._build(rules)
+
+    def _build(self, rules: List[PlannedRule]) -> Optional[Pattern]:
+        """所有规则的顶层分支按首字符分组合并为一个正则"""
+        groups: Dict[str, List[str]] = {}
+        others: List[str] = []
+        for index in self.indices:
+            first_chars = set()
+            for alternative in split_alternatives(rules[index].pattern):
+                split = split_first_char(alternative)
+                if split is None:
+                    others.append(alternative)
+                    first_chars = None
+                    continue
+                char, rest = split
+                if self._ignore_case:
+                    char = char.lower()
+                groups.setdefault(char, []).append(rest)
+                if first_chars is not None:
+                    first_chars.add(char)
+            if first_chars is None:
+                self._always.append(index)
+            else:
+                for char in first_chars:
+                    self._rules_by_char.setdefault(char, []).append(index)
+
+        # 相同的分支（如多条规则共用同一前缀）只保留一份
+        branches = [
+            f'{re.escape(char)}(?:{"|".join(dict.fromkeys(rests))})' for char, rests in groups.items()
+        ] + [f'(?:{alternative})' for alternative in dict.fromkeys(others)]
+        combined = '|'.join(branches)
+        if not others:
+            # 所有分支都以已知字符开头：先用单个字符类快速跳过不可能命中的位置
+            char_class = ''.join(re.escape(char) for char in groups)
+            combined = f'(?=[{char_class}])(?:{combined})'
+
+        try:
+            return self._compile(combined)
+        except re.error:
+            pass
+        # 拆分后的分支无法编译（例如含反向引用），退回到整条规则的合并
+        try:
+            self._rules_by_char = {}
+            self._always = list(self.indices)
+            return self._compile('|'.join(f'(?:{rules[index].pattern})' for index in self.indices))
+        except re.error:
+            return None
+
+    def _compile(self, pattern: str) -> Pattern:
+        """编译筛选正则（字节模式编译为 bytes 正则）"""
+        return re.compile(pattern.encode('ascii') if self._binary else pattern, self._flags)
+
+    def candidates(self, char: str) -> Iterable[int]:
+        """命中位置字符对应的候选规则（按规则顺序）"""
+        if not char.isascii():
+            # 非 ASCII 字符在忽略大小写时可能匹配 ASCII 字母（如 K 与 K），全部尝试
+            return self.indices
+        if self._ignore_case:
+            char = char.lower()
+        by_char = self._rules_by_char.get(char, [])
+        if not self._always:
+            return by_char
+        return sorted(set(by_char).union(self._always))
+
+
+class RulePlan:
+    """
+    正则规则执行计划
+
+    find_matches() 返回每条规则的匹配列表，与对每条规则单独调用
+    rule.finditer(content) 的结果相同（规则均不匹配空串）。
+    """
+
+    # 缓存的候选规则子集筛选正则数量上限
+    MAX_SCREENS = 256
+
+    def __init__(
+        self,
+        rules: List[PlannedRule],
+        flags: int = re.IGNORECASE,
+        prefilter: bool = True,
+        known_literals: Optional[Dict[str, Optional[FrozenSet[str]]]] = None,
+        extension_languages: Optional[Dict[str, str]] = None,
+        binary: bool = False
+    ):
+        """
+        Args:
+            rules: 规则列表（顺序即输出顺序）
+            flags: 规则的编译标志
+            prefilter: 是否启用字面量预过滤
+            known_literals: 已提取的字面量（正则 -> 字面量），命中时不再解析正则
+            extension_languages: 扩展名 -> 语言（按 rule.languages 路由；不在表中的扩展名运行所有规则）
+            binary: 规则已编译为 bytes 正则，扫描字节内容（见 binary_rule_plan）
+        """
+        self.rules = rules
+        self.binary = binary
+        self._flags = flags
+        self._known_literals = known_literals or {}
+        self._extension_languages = extension_languages or {}
+        self.literals: List[Optional[FrozenSet[str]]] = [
+            self._rule_literals(rule) for rule in rules
+        ]
+        self._use_prefilter = prefilter
+        self._screens: Dict[Tuple[int, ...], _Screen] = {}
+        # 扩展名 -> 适用的规则子集及其预过滤器（每种扩展名首次出现时构建一次）
+        self._routed = any(rule.file_types is not None or rule.languages is not None for rule in rules)
+        self._routes: Dict[Optional[str], Tuple[Tuple[int, ...], Optional[LiteralPrefilter]]] = {}
+
+    def _literals(self, pattern: str) -> Optional[FrozenSet[str]]:
+        """正则的必需字面量（优先使用已知结果）"""
+        if pattern in self._known_literals:
+            return self._known_literals[pattern]
+        return extract_literals(pattern, self._flags)
+
+    def _rule_literals(self, rule: PlannedRule) -> Optional[FrozenSet[str]]:
+        """规则的必需字面量（共现规则的两部分都必需，取选择性更好的一方）"""
+        literals = self._literals(rule.pattern)
+        if rule.near is None:
+            return literals
+        second = self._literals(rule.near.second.pattern)
+        candidates = [item for item in (literals, second) if item is not None]
+        return _best_requirement(candidates)
+
+    def _get_screen(self, indices: Tuple[int, ...]) -> _Screen:
+        """获取（必要时构建）候选规则子集的筛选正则"""
+        screen = self._screens.get(indices)
+        if screen is None:
+            if len(self._screens) >= self.MAX_SCREENS:
+                self._screens.clear()
+            screen = self._screens[indices] = _Screen(self.rules, indices, self._flags, self.binary)
+        return screen
+
+    def applies(self, rule: PlannedRule, suffix: Optional[str]) -> bool:
+        """规则是否适用于该扩展名的文件（suffix 为 None 表示不按文件类型路由）"""
+        if suffix is None:
+            return True
+        if rule.file_types is not None and suffix not in rule.file_types:
+            return False
+        language = self._extension_languages.get(suffix)
+        if rule.languages is not None and language is not None and language not in rule.languages:
+            return False
+        return True
+
+    def route(self, suffix: Optional[str] = None) -> Tuple[int, ...]:
+        """适用于该扩展名的规则下标（升序）"""
+        return self._route(suffix)[0]
+
+    def _route(self, suffix: Optional[str]) -> Tuple[Tuple[int, ...], Optional[LiteralPrefilter]]:
+        """获取（必要时构建）扩展名对应的规则子集和预过滤器"""
+        key = suffix.lower() if suffix is not None and self._routed else None
+        route = self._routes.get(key)
+        if route is None:
+            indices = tuple(index for index, rule in enumerate(self.rules) if self.applies(rule, key))
+            prefilter = None
+            if self._use_prefilter:
+                prefilter = LiteralPrefilter(
+                    [self.literals[index] for index in indices], bool(self._flags & re.IGNORECASE)
+                )
+            route = self._routes[key] = (indices, prefilter)
+        return route
+
+    def candidates(
+        self, content: str, folded: Optional[str] = None, suffix: Optional[str] = None
+    ) -> Tuple[int, ...]:
+        """
+        预过滤后可能命中的规则下标
+
+        只考虑适用于该扩展名的规则，字面量搜索也只针对这些规则的字面量
+        """
+        indices, prefilter = self._route(suffix)
+        if prefilter is None:
+            return indices
+        return tuple(indices[local] for local in prefilter.candidates(content, folded))
+
+    def find_matches(
+        self,
+        content: str,
+        folded: Optional[str] = None,
+        suffix: Optional[str] = None,
+        start: int = 0,
+        stop: Optional[int] = None,
+        next_allowed: Optional[List[int]] = None
+    ) -> List[List[Match]]:
+        """
+        扫描内容，返回每条规则的匹配
+
+        Args:
+            content: 文件内容（字节模式的计划为纯 ASCII 的字节内容，如 mmap）
+            folded: 已计算的 fold_case(content)（可选，用于字面量预过滤）
+            suffix: 文件扩展名（只运行适用于该类型的规则；None 表示运行所有规则）
+            start: 只报告起点不小于 start 的匹配（之前的内容仍用于后顾断言）
+            stop: 只报告起点小于 stop 的匹配（之后的内容仍可被匹配覆盖）
+            next_allowed: 每条规则下一个匹配允许的起点，扫描后更新（流式扫描在窗口之间传递）
+
+        Returns:
+            与 self.rules 一一对应的匹配列表
+        """
+        matches: List[List[Match]] = [[] for _ in self.rules]
+        indices = self.candidates(content, folded, suffix)
+        if not indices:
+            return matches
+        if stop is None:
+            stop = len(content)
+        # 每条规则下一个匹配允许的起点（模拟 finditer 的不重叠语义）
+        if next_allowed is None:
+            next_allowed = [0] * len(self.rules)
+
+        screen = self._get_screen(indices)
+        if screen.regex is None:
+            for index in indices:
+                for match in self.rules[index].finditer(content):
+                    if start <= match.start() < stop and match.start() >= next_allowed[index]:
+                        matches[index].append(match)
+                        next_allowed[index] = max(match.end(), match.start() + 1)
+            return matches
+
+        # 共现规则在本文件上的缓存
+        near_states: Dict[int, _NearState] = {}
+        search = screen.regex.search
+        binary = self.binary
+        pos = start
+        while True:
+            hit = search(content, pos)
+            if hit is None:
+                break
+            start = hit.start()
+            if start >= stop:
+                break
+            for index in screen.candidates(chr(content[start]) if binary else content[start]):
+                if start < next_allowed[index]:
+                    continue
+                rule = self.rules[index]
+                match = rule.compiled.match(content, start)
+                if match is not None and rule.near is not None:
+                    state = near_states.get(index)
+                    if state is None:
+                        state = near_states[index] = _NearState()
+                    match = rule.near.complete(content, match, state)
+                if match is not None:
+                    matches[index].append(match)
+                    next_allowed[index] = max(match.end(), start + 1)
+            pos = start + 1
+        return matches
+
+
+def binary_rule_plan(plan: RulePlan) -> Optional[RulePlan]:
+    """
+    执行计划的字节版本：规则编译为 bytes 正则，用于扫描纯 ASCII 的映射内容
+
+    纯 ASCII 内容上 bytes 正则与 str 正则（忽略大小写、\\w、\\s 等）的匹配相同，
+    因此结果与在解码文本上运行原计划一致
+
+    Returns:
+        字节版执行计划；有规则无法编译为 bytes 正则（含非 ASCII 字符等）时返回 None
+    """
+    compiled: Dict[str, Pattern] = {}
+
+    def compile_binary(pattern: str) -> Pattern:
+        if pattern not in compiled:
+            compiled[pattern] = re.compile(pattern.encode('ascii'), plan._flags)
+        return compiled[pattern]
+
+    rules: List[PlannedRule] = []
+    try:
+        for rule in plan.rules:
+            near = None
+            if rule.near is not None:
+                near = NearMatcher(compile_binary(rule.near.second.pattern), rule.near.lines, rule.near.chars)
+            rules.append(dataclasses.replace(rule, compiled=compile_binary(rule.pattern), near=near))
+        # 字节内容上的字面量搜索同样要求字面量为 ASCII
+        for literals in plan.literals:
+            for literal in literals or ():
+                literal.encode('ascii')
+    except (UnicodeEncodeError, re.error):
+        return None
+    return RulePlan(
+        rules, plan._flags, plan._use_prefilter,
+        known_literals=plan._known_literals,
+        extension_languages=plan._extension_languages, binary=True
+    )
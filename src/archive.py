@@ -0,0 +1,265 @@
+"""
+压缩包扫描 - 不解压到磁盘，直接流式读取 zip / wheel / tar(.gz/.bz2/.xz) 中的文件
+成员经过与目录遍历相同的忽略规则、扩展名和大小过滤，路径为压缩包内的相对路径；
+超过 max_file_size 的成员以流的形式产出（由扫描器按块分析）；总解压大小、成员数量和压缩率都有上限，防止压缩炸弹
+"""
+
+import io
+import zlib
+import tarfile
+import zipfile
+import posixpath
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple, Union
+
+from .walker import FileEntry, FileWalker
+
+try:
+    import lzma
+    _LZMA_ERRORS: Tuple[type, ...] = (lzma.LZMAError,)
+except ImportError:  # Python 未编译 lzma 支持
+    _LZMA_ERRORS = ()
+
+
+# 按文件名识别的压缩包格式
+ZIP_SUFFIXES = ('.zip', '.whl')
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+class ArchiveError(ValueError):
+    """压缩包无法读取（格式错误或数据损坏）"""
+
+
+class ArchiveLimitError(ArchiveError):
+    """压缩包超出安全限制（可能是压缩炸弹）"""
+
+
+@dataclass
+class ArchiveLimits:
+    """压缩包安全限制"""
+    max_total_size: int = 512 * 1024 * 1024  # 解压数据总量上限（字节）
+    max_members: int = 10000                 # 成员（含目录）数量上限
+    max_ratio: float = 100.0                 # 解压大小 / 压缩大小 的上限
+    # 压缩率只在解压数据超过该大小后检查（小文本的压缩率波动很大）
+    ratio_min_size: int = 1024 * 1024
+
+
+def is_archive(path: Path) -> bool:
+    """按文件名判断是否是支持的压缩包"""
+    name = path.name.lower()
+    return name.endswith(ZIP_SUFFIXES) or name.endswith(TAR_SUFFIXES)
+
+
+def _member_path(name: str) -> Optional[str]:
+    """
+    规范化成员路径（压缩包内的相对路径）
+
+    Returns:
+        规范化后的路径；指向压缩包之外（绝对路径或 ..）时返回 None
+    """
+    path = posixpath.normpath(name.replace('\\', '/'))
+    if path.startswith('/') or path == '..' or path.startswith('../') or path == '.':
+        return None
+    return path
+
+
+class _CountingReader(io.RawIOBase):
+    """统计已读取字节数的只读文件包装（用于计算 tar 流的压缩率）"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._raw.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+
+class _MemberStream(io.RawIOBase):
+    """压缩包成员的只读流：读取时的解压错误转换为 ArchiveError（流在 entries() 之外读取）"""
+
+    def __init__(self, member: BinaryIO, archive_path: Path, check: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            member: zipfile.open / tarfile.extractfile 返回的成员流
+            archive_path: 压缩包路径（用于错误信息）
+            check: 每次读取后以已读取的字节数调用的限制检查
+        """
+        self._member = member
+        self._archive_path = archive_path
+        self._check = check
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            count = self._member.readinto(buffer)
+        except (zipfile.BadZipFile, tarfile.TarError, zlib.error, OSError, EOFError) + _LZMA_ERRORS as e:
+            raise ArchiveError(f"{self._archive_path}: {e}")
+        self.bytes_read += count or 0
+        if self._check is not None:
+            self._check(self.bytes_read)
+        return count
+
+
+# 成员内容：不超过 max_file_size 时为 bytes，否则为只能在产出后、读取下一个成员前读取的流
+MemberData = Union[bytes, BinaryIO]
+
+
+class ArchiveReader:
+    """
+    流式读取压缩包中的待扫描文件
+
+    zip 按中央目录读取：成员数、声明的解压大小和压缩率在解压前检查，
+    只有通过过滤的成员才会被解压；tar 为顺序流，所有成员都要解压才能跳过，
+    因此计入总解压大小的是整个流
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        walker: FileWalker,
+        limits: Optional[ArchiveLimits] = None,
+        data: Optional[bytes] = None
+    ):
+        """
+        Args:
+            path: 压缩包路径（提供 data 时只用于识别格式和错误信息）
+            walker: 提供忽略规则、扩展名和大小过滤的遍历器
+            limits: 安全限制（默认 ArchiveLimits()）
+            data: 已在内存中的压缩包内容（如上传的文件），None 表示从 path 读取
+        """
+        self.path = Path(path)
+        self.walker = walker
+        self.limits = limits or ArchiveLimits()
+        self.data = data
+
+    def _open(self) -> BinaryIO:
+        """打开压缩包的原始字节流"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.path, 'rb')
+
+    def _check_ratio(self, uncompressed: int, compressed: int, what: str):
+        """检查压缩率"""
+        if uncompressed > self.limits.ratio_min_size and \
+                uncompressed > compressed * self.limits.max_ratio:
+            raise ArchiveLimitError(
+                f"{self.path}: {what} compression ratio exceeds {self.limits.max_ratio:g}:1"
+            )
+
+    def _check_total(self, total: int):
+        """检查解压数据总量"""
+        if total > self.limits.max_total_size:
+            raise ArchiveLimitError(
+                f"{self.path}: uncompressed size exceeds {self.limits.max_total_size} bytes"
+            )
+
+    def count(self) -> Optional[int]:
+        """待扫描文件数（zip 可从中央目录得出；tar 为流式读取，返回 None）"""
+        if not self.path.name.lower().endswith(ZIP_SUFFIXES):
+            return None
+        try:
+            with self._open() as raw_file, zipfile.ZipFile(raw_file) as archive:
+                return sum(1 for _, _ in self._zip_members(archive))
+        except (zipfile.BadZipFile, OSError, EOFError):
+            return None
+
+    def entries(self) -> Iterator[Tuple[FileEntry, MemberData]]:
+        """
+        逐个产出待扫描文件及其内容（按压缩包中的顺序）
+
+        超过 walker.max_file_size 的成员产出流而不是 bytes，
+        流只在迭代下一个成员之前有效，读取错误时抛出 ArchiveError
+
+        Raises:
+            ArchiveLimitError: 超出安全限制
+            ArchiveError: 压缩包无法读取
+        """
+        if self.path.name.lower().endswith(ZIP_SUFFIXES):
+            yield from self._zip_entries()
+        else:
+            yield from self._tar_entries()
+
+    def _zip_members(self, archive: zipfile.ZipFile) -> Iterator[Tuple[zipfile.ZipInfo, str]]:
+        """检查限制并产出需要扫描的 zip 成员"""
+        infos = archive.infolist()
+        if len(infos) > self.limits.max_members:
+            raise ArchiveLimitError(f"{self.path}: more than {self.limits.max_members} members")
+        total = 0
+        for info in infos:
+            if info.is_dir():
+                continue
+            name = _member_path(info.filename)
+            if name is None or not self.walker.accepts(name, info.file_size):
+                continue
+            # 解压大小以中央目录的声明为准：zipfile 读取时不会产出超过 file_size 的数据
+            self._check_ratio(info.file_size, info.compress_size, f"member {name!r}")
+            total += info.file_size
+            self._check_total(total)
+            yield info, name
+
+    def _zip_entries(self) -> Iterator[Tuple[FileEntry, MemberData]]:
+        try:
+            with self._open() as raw_file, zipfile.ZipFile(raw_file) as archive:
+                for info, name in list(self._zip_members(archive)):
+                    with archive.open(info) as member:
+                        if info.file_size > self.walker.max_file_size:
+                            yield FileEntry(Path(name), info.file_size), _MemberStream(member, self.path)
+                            continue
+                        data = member.read()
+                    yield FileEntry(Path(name), len(data)), data
+        except ArchiveError:
+            raise
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError,
+                RuntimeError, OSError, EOFError) as e:
+            # RuntimeError: 加密成员；NotImplementedError: 不支持的压缩方法
+            raise ArchiveError(f"{self.path}: {e}")
+
+    def _tar_entries(self) -> Iterator[Tuple[FileEntry, MemberData]]:
+        try:
+            with self._open() as raw_file:
+                raw = _CountingReader(raw_file)
+                # 'r|*'：顺序流模式，自动识别压缩格式，不在内存中保留成员列表以外的数据
+                with tarfile.open(fileobj=io.BufferedReader(raw), mode='r|*') as archive:
+                    members = 0
+                    for member in archive:
+                        members += 1
+                        if members > self.limits.max_members:
+                            raise ArchiveLimitError(
+                                f"{self.path}: more than {self.limits.max_members} members"
+                            )
+                        # 流中的偏移（已越过当前成员的数据）即需要解压的数据量，包含被跳过的成员
+                        self._check_total(archive.offset)
+                        # 压缩率只用已解压的部分（到当前成员数据之前）计算：当前成员的数据还没有读取
+                        self._check_ratio(member.offset_data, raw.bytes_read, 'archive')
+
+                        # 只读取普通文件；符号链接和硬链接无法在压缩包内安全解析，跳过
+                        if not member.isfile():
+                            continue
+                        name = _member_path(member.name)
+                        if name is None or not self.walker.accepts(name, member.size):
+                            continue
+                        extracted = archive.extractfile(member)
+                        if extracted is None:
+                            continue
+                        if member.size > self.walker.max_file_size:
+                            # 边读取边检查压缩率（不必等到下一个成员）
+                            def check(count: int, offset: int = member.offset_data):
+                                self._check_ratio(offset + count, raw.bytes_read, 'archive')
+                            yield FileEntry(Path(name), member.size), _MemberStream(extracted, self.path, check)
+                            continue
+                        data = extracted.read()
+                        yield FileEntry(Path(name), len(data)), data
+        except ArchiveError:
+            raise
+        except (tarfile.TarError, zlib.error, OSError, EOFError) + _LZMA_ERRORS as e:
+            # OSError 包括 gzip / bz2 的格式错误
+            raise ArchiveError(f"{self.path}: {e}")
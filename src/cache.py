@@ -0,0 +1,226 @@
+"""
+扫描结果缓存 - 基于 SQLite 的持久化增量缓存
+按 (文件内容哈希, 分析模式, 规则集指纹) 存储每个文件的发现，
+未变化的文件直接复用结果，跳过分析
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Sequence, Any
+
+from . import rules
+from .types import SecurityIssue, Severity, AnalysisMode
+
+
+def default_cache_dir() -> Path:
+    """默认缓存目录：$XDG_CACHE_HOME/orange-trustskill"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return Path(base) / 'orange-trustskill'
+
+
+def rules_fingerprint(analyzers: Sequence[Any], rule_packs: Sequence[Any] = ()) -> str:
+    """
+    计算规则集指纹
+
+    包含 rules.py 中的所有规则表、各分析器的名称和版本以及加载的规则包内容哈希，
+    任一变化都会使旧缓存失效。
+    """
+    hasher = hashlib.sha256()
+    for name in sorted(vars(rules)):
+        if name.isupper():
+            value = getattr(rules, name)
+            # 集合的 repr 顺序随哈希种子变化，排序后再参与计算
+            if isinstance(value, (set, frozenset)):
+                value = sorted(value)
+            hasher.update(f'{name}={value!r}\n'.encode('utf-8'))
+    for analyzer in analyzers:
+        hasher.update(f'{analyzer.get_name()}@{analyzer.VERSION}\n'.encode('utf-8'))
+    for pack in rule_packs:
+        hasher.update(f'pack:{pack.sha256}\n'.encode('ascii'))
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    文件级扫描结果缓存
+
+    - 多进程安全：SQLite WAL 模式，每个进程使用独立连接（fork 后自动重连）
+    - 容量限制：超过 max_bytes 时按最近访问时间淘汰
+    - 缓存读写出错时视为未命中，不影响扫描
+    """
+
+    # 访问时间更新粒度（秒），避免每次命中都写数据库
+    ACCESS_GRANULARITY = 3600
+
+    # 淘汰后保留的容量比例
+    EVICT_TARGET_RATIO = 0.9
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            path: 缓存数据库路径，默认位于 default_cache_dir()
+            max_bytes: 缓存结果的最大总字节数
+        """
+        self.path = Path(path) if path else default_cache_dir() / 'results.sqlite3'
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def __getstate__(self):
+        # 连接不能跨进程传递，传给工作进程时只保留配置
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return state
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前进程的数据库连接"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                findings TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (name, value) VALUES ('total_size', 0);
+            CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN
+                UPDATE meta SET value = value + NEW.size WHERE name = 'total_size';
+            END;
+            CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN
+                UPDATE meta SET value = value - OLD.size WHERE name = 'total_size';
+            END;
+        ''')
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def close(self):
+        """关闭当前进程的连接"""
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+    @staticmethod
+    def make_key(content_hash: str, suffix: str, mode: AnalysisMode, fingerprint: str) -> str:
+        """
+        由内容哈希、扩展名、分析模式和规则集指纹生成缓存键
+        （扩展名决定分析器的路由和区域划分，内容相同、扩展名不同的文件结果可能不同）
+        """
+        key = f'{fingerprint}:{mode.value}:{suffix}:{content_hash}'
+        return hashlib.sha256(key.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+    def get(self, key: str, filename: str) -> Optional[List[SecurityIssue]]:
+        """
+        读取缓存结果
+
+        Args:
+            key: 缓存键
+            filename: 写入发现的文件名（缓存中不保存文件名）
+
+        Returns:
+            发现列表；未命中时返回 None
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT findings, accessed FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            findings, accessed = row
+            now = time.time()
+            if now - accessed > self.ACCESS_GRANULARITY:
+                conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+
+            return [
+                SecurityIssue(
+                    level=Severity(item['level']),
+                    category=item['category'],
+                    description=item['description'],
+                    file=filename,
+                    line=item['line'],
+                    snippet=item['snippet'],
+                    confidence=item['confidence'],
+                    rule_id=item.get('rule_id')
+                )
+                for item in json.loads(findings)
+            ]
+        except (sqlite3.Error, OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, findings: List[SecurityIssue]):
+        """写入缓存结果（文件名不写入，读取时重新填充）"""
+        payload = json.dumps([
+            {
+                'level': f.level.value,
+                'category': f.category,
+                'description': f.description,
+                'line': f.line,
+                'snippet': f.snippet,
+                'confidence': f.confidence,
+                'rule_id': f.rule_id,
+            }
+            for f in findings
+        ], ensure_ascii=False)
+
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR IGNORE INTO results (key, findings, size, accessed) VALUES (?, ?, ?, ?)',
+                (key, payload, len(key) + len(payload), time.time())
+            )
+            self._evict_if_needed(conn)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def _evict_if_needed(self, conn: sqlite3.Connection):
+        """超过容量时淘汰最久未访问的条目"""
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * self.EVICT_TARGET_RATIO)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 在写事务内重新读取，避免多个进程重复淘汰
+            total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+            while total > target:
+                deleted = conn.execute(
+                    'DELETE FROM results WHERE key IN '
+                    '(SELECT key FROM results ORDER BY accessed LIMIT 256)'
+                ).rowcount
+                if deleted <= 0:
+                    break
+                total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        """清空缓存"""
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM results')
+        except (sqlite3.Error, OSError):
+            pass
@@ -5,8 +5,12 @@ Advanced Security Scanner for OpenClaw Skills
 """
 
 import sys
+import json
+import time
+import signal
 import argparse
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 # 添加 src 到路径
 script_dir = Path(__file__).parent
@@ -14,21 +18,588 @@ sys.path.insert(0, str(script_dir))
 sys.path.insert(0, str(script_dir.parent))
 
 try:
-    from src.types import AnalysisMode
-    from src.scanner import SkillScanner
+    from src.types import AnalysisMode, ScanResult, FleetSummary
+    from src.scanner import SkillScanner, discover_skills
+    from src.cache import ResultCache, default_cache_dir
+    from src.rule_packs import load_rule_pack, RulePackError
+    from src.archive import ArchiveLimits, ArchiveError
+    from src.watcher import SkillWatcher, InotifySource, open_change_source
+    from src.git_diff import scan_diff, resolve_range, GitError, DiffScanResult
+    from src.server import (
+        ScanService, ScanClient, ServerBusyError, ScanRequestError,
+        parse_address, format_address, serve, DEFAULT_HOST, DEFAULT_PORT
+    )
     from src.formatters.text_formatter import TextFormatter, ProgressTracker
     from src.formatters.json_formatter import JsonFormatter
     from src.formatters.markdown_formatter import MarkdownFormatter
+    from src.formatters.jsonl_formatter import JsonLinesFormatter
 except ImportError:
     # 如果 src 导入失败，尝试直接导入
-    from types import AnalysisMode
-    from scanner import SkillScanner
+    from types import AnalysisMode, ScanResult, FleetSummary
+    from scanner import SkillScanner, discover_skills
+    from cache import ResultCache, default_cache_dir
+    from rule_packs import load_rule_pack, RulePackError
+    from archive import ArchiveLimits, ArchiveError
+    from watcher import SkillWatcher, InotifySource, open_change_source
+    from git_diff import scan_diff, resolve_range, GitError, DiffScanResult
+    from server import (
+        ScanService, ScanClient, ServerBusyError, ScanRequestError,
+        parse_address, format_address, serve, DEFAULT_HOST, DEFAULT_PORT
+    )
     from formatters.text_formatter import TextFormatter, ProgressTracker
     from formatters.json_formatter import JsonFormatter
     from formatters.markdown_formatter import MarkdownFormatter
+    from formatters.jsonl_formatter import JsonLinesFormatter
+
+
+def parse_jobs(value: str) -> int:
+    """解析 --jobs 参数：正整数或 auto（返回 0 表示自动）"""
+    if value == 'auto':
+        return 0
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid jobs value: {value!r} (expected a positive integer or 'auto')")
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(f"jobs must be >= 1 or 'auto', got {jobs}")
+    return jobs
+
+
+def parse_positive_int(value: str) -> int:
+    """解析大小、数量等参数：正整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid value: {value!r} (expected a positive integer)")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"value must be >= 1, got {number}")
+    return number
+
+
+def parse_positive_float(value: str) -> float:
+    """解析比例等参数：正数"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid value: {value!r} (expected a positive number)")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"value must be > 0, got {value}")
+    return number
+
+
+def stream_jsonl(scanner: 'SkillScanner', skill_path: str, fail_fast: bool = False) -> int:
+    """
+    流式扫描并逐行输出 JSON Lines
+
+    每个文件完成后立即输出一行，最后输出摘要记录。
+    发现不在内存中累积，只保留计数。
+
+    Returns:
+        HIGH 级别发现数量
+    """
+    formatter = JsonLinesFormatter()
+    start_time = time.time()
+    risk_summary = {"HIGH": 0, "MEDIUM": 0, "LOW": 0, "INFO": 0}
+    files_scanned = 0
+    cache_hits = 0
+    cache_misses = 0
+    stats: Dict[str, int] = {}
+    
+    for event in scanner.scan_iter(skill_path, fail_fast=fail_fast):
+        print(formatter.format_event(event), flush=True)
+        files_scanned += 1
+        for name, value in event.stats.items():
+            stats[name] = stats.get(name, 0) + value
+        for finding in event.findings:
+            risk_summary[finding.level.value] += 1
+        if scanner.cache is not None and event.duplicate_of is None and not event.streamed:
+            if event.cached:
+                cache_hits += 1
+            else:
+                cache_misses += 1
+    
+    print(formatter.format_summary(
+        str(Path(skill_path)),
+        files_scanned,
+        risk_summary,
+        time.time() - start_time,
+        cache_hits,
+        cache_misses,
+        stopped_early=fail_fast and risk_summary['HIGH'] > 0,
+        stats=stats
+    ), flush=True)
+    return risk_summary['HIGH']
+
+
+def add_scanner_arguments(parser: argparse.ArgumentParser):
+    """扫描器参数（扫描命令和 serve 共用）"""
+    parser.add_argument(
+        '-m', '--mode',
+        choices=['fast', 'standard', 'deep'],
+        # 未指定时为 None：--server 请求不带模式，由服务的 --mode 决定
+        default=None,
+        help='Analysis mode (default: standard; with --server, the server\'s --mode)'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=parse_jobs,
+        default=1,
+        metavar='N',
+        help='Number of worker processes for file analysis, or "auto" for one per CPU (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Reuse results for unchanged files from an on-disk cache'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help=f'Cache directory, implies --cache (default: {default_cache_dir()})'
+    )
+    
+    parser.add_argument(
+        '--cache-max-size',
+        type=int,
+        default=256,
+        metavar='MB',
+        help='Maximum cache size in megabytes (default: 256)'
+    )
+    
+    parser.add_argument(
+        '--rules',
+        action='append',
+        default=[],
+        metavar='FILE',
+        help='Load an extra rule pack (.toml or .json); can be repeated'
+    )
+    
+    parser.add_argument(
+        '--follow-symlinks',
+        action='store_true',
+        help='Descend into symlinked directories (each directory is visited once, so link cycles are skipped)'
+    )
+    
+    parser.add_argument(
+        '--max-stream-size',
+        type=parse_positive_int,
+        default=SkillScanner.MAX_STREAM_SIZE // (1024 * 1024),
+        metavar='MB',
+        help=f'Scan files over {SkillScanner.MAX_FILE_SIZE // (1024 * 1024)} MB in streaming mode (regex rules only) '
+             f'up to this size; {SkillScanner.MAX_FILE_SIZE // (1024 * 1024)} or less skips them '
+             f'(default: {SkillScanner.MAX_STREAM_SIZE // (1024 * 1024)})'
+    )
+    
+    parser.add_argument(
+        '--no-dedup',
+        action='store_true',
+        help='Analyze every file even if another file in the run has identical content'
+    )
+    
+    parser.add_argument(
+        '--archive-max-size',
+        type=parse_positive_int,
+        default=512,
+        metavar='MB',
+        help='Archives: maximum total uncompressed size in megabytes (default: 512)'
+    )
+    
+    parser.add_argument(
+        '--archive-max-members',
+        type=parse_positive_int,
+        default=10000,
+        metavar='N',
+        help='Archives: maximum number of members (default: 10000)'
+    )
+    
+    parser.add_argument(
+        '--archive-max-ratio',
+        type=parse_positive_float,
+        default=100,
+        metavar='RATIO',
+        help='Archives: maximum compression ratio (default: 100)'
+    )
+
+
+def scanner_options(parser: argparse.ArgumentParser, args: argparse.Namespace) -> Dict[str, Any]:
+    """由 add_scanner_arguments 的参数构造 SkillScanner 的关键字参数"""
+    # 结果缓存
+    cache = None
+    if args.cache or args.cache_dir:
+        cache_path = Path(args.cache_dir) / 'results.sqlite3' if args.cache_dir else None
+        cache = ResultCache(cache_path, max_bytes=args.cache_max_size * 1024 * 1024)
+    
+    # 外部规则包（预处理结果缓存在缓存目录下，与 --cache 无关）
+    rule_packs = []
+    for rules_path in args.rules:
+        try:
+            rule_packs.append(load_rule_pack(
+                Path(rules_path),
+                cache_dir=Path(args.cache_dir) / 'rule-packs' if args.cache_dir else None
+            ))
+        except RulePackError as e:
+            parser.error(f"invalid rule pack: {e}")
+    
+    archive_limits = ArchiveLimits(
+        max_total_size=args.archive_max_size * 1024 * 1024,
+        max_members=args.archive_max_members,
+        max_ratio=args.archive_max_ratio
+    )
+    return {
+        'mode': AnalysisMode(args.mode or AnalysisMode.STANDARD.value),
+        'jobs': args.jobs,
+        'cache': cache,
+        'rule_packs': rule_packs,
+        'archive_limits': archive_limits,
+        'dedup': not args.no_dedup,
+        'follow_symlinks': args.follow_symlinks,
+        'max_stream_size': args.max_stream_size * 1024 * 1024,
+    }
+
+
+def scan_locally(parser: argparse.ArgumentParser, args: argparse.Namespace) -> ScanResult:
+    """在当前进程中扫描（--format jsonl 时流式输出后直接退出）"""
+    scanner = SkillScanner(**scanner_options(parser, args))
+    
+    # JSON Lines 流式输出
+    if args.format == 'jsonl':
+        try:
+            with scanner:
+                high_count = stream_jsonl(scanner, args.skill_path, args.fail_fast)
+        except ArchiveError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+        sys.exit(1 if high_count > 0 else 0)
+    
+    # 创建进度跟踪器（文件总数由扫描器在遍历后通过回调提供，避免重复遍历目录）
+    show_progress = not args.no_progress and args.format == 'text' and not args.quiet
+    progress = None
+    
+    # 扫描
+    def progress_callback(filename: str, current: int, total: int, findings: int):
+        nonlocal progress
+        if progress is None:
+            progress = ProgressTracker(total, use_color=not args.no_color)
+        progress.update(filename, 0)
+    
+    try:
+        with scanner:
+            result = scanner.scan(
+                args.skill_path,
+                progress_callback if show_progress else None,
+                fail_fast=args.fail_fast
+            )
+    except ArchiveError as e:
+        # 压缩包损坏或超出安全限制（可能是压缩炸弹）：不输出部分结果
+        if progress:
+            progress.finish()
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    
+    if progress:
+        progress.finish()
+    return result
+
+
+def scan_on_server(parser: argparse.ArgumentParser, args: argparse.Namespace) -> ScanResult:
+    """把扫描请求发送给常驻服务（trustskill serve）"""
+    try:
+        address = parse_address(args.server)
+    except ValueError as e:
+        parser.error(str(e))
+    client = ScanClient(address)
+    try:
+        mode = AnalysisMode(args.mode) if args.mode else None
+        return client.scan(args.skill_path, mode, fail_fast=args.fail_fast)
+    except (ServerBusyError, ScanRequestError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+    except OSError as e:
+        print(f"Error: cannot reach scan server at {format_address(address)}: {e}", file=sys.stderr)
+    sys.exit(2)
+
+
+def serve_main(argv: List[str]):
+    """trustskill serve：启动常驻扫描服务"""
+    parser = argparse.ArgumentParser(
+        prog=f'{Path(sys.argv[0]).name} serve',
+        description='Run a long-lived scan daemon that keeps compiled rules, worker pools '
+                    'and the result cache warm between scans',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Examples:
+  %(prog)s --socket /tmp/trustskill.sock
+  %(prog)s --port {DEFAULT_PORT} --max-concurrent 4 --cache
+  {Path(sys.argv[0]).name} /path/to/skill --server unix:/tmp/trustskill.sock
+        """
+    )
+    
+    parser.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='Listen on a Unix socket instead of TCP'
+    )
+    
+    parser.add_argument(
+        '--host',
+        default=DEFAULT_HOST,
+        help=f'TCP listen address (default: {DEFAULT_HOST})'
+    )
+    
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=DEFAULT_PORT,
+        help=f'TCP listen port (default: {DEFAULT_PORT})'
+    )
+    
+    parser.add_argument(
+        '--max-concurrent',
+        type=int,
+        default=2,
+        metavar='N',
+        help='Number of scans that run at the same time (default: 2)'
+    )
+    
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=16,
+        metavar='N',
+        help='Number of requests that may wait for a free scan slot; '
+             'further requests get HTTP 503 (default: 16)'
+    )
+    
+    parser.add_argument(
+        '--max-upload',
+        type=int,
+        default=64,
+        metavar='MB',
+        help='Maximum size of an uploaded archive in megabytes (default: 64)'
+    )
+    
+    parser.add_argument(
+        '--allow-root',
+        action='append',
+        default=[],
+        metavar='DIR',
+        help='Only scan paths under DIR; can be repeated (default: no restriction)'
+    )
+    
+    add_scanner_arguments(parser)
+    
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Log every request to stderr'
+    )
+    
+    args = parser.parse_args(argv)
+    if args.max_concurrent < 1:
+        parser.error("--max-concurrent must be >= 1")
+    if args.queue_size < 0:
+        parser.error("--queue-size must be >= 0")
+    
+    service = ScanService(
+        max_concurrent=args.max_concurrent,
+        queue_size=args.queue_size,
+        max_upload=args.max_upload * 1024 * 1024,
+        allowed_roots=[Path(root) for root in args.allow_root],
+        **scanner_options(parser, args)
+    )
+    address = args.socket if args.socket else (args.host, args.port)
+    
+    # SIGTERM 与 Ctrl+C 一样正常退出（等待运行中的扫描结束、删除 socket 文件）
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"TrustSkill scan server listening on {format_address(address)}", file=sys.stderr, flush=True)
+    try:
+        serve(service, address, verbose=args.verbose)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: cannot listen on {format_address(address)}: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+def make_formatter(args: argparse.Namespace):
+    """按 --format 创建格式化器（jsonl 除外，由流式输出处理）"""
+    if args.format == 'json':
+        return JsonFormatter()
+    if args.format == 'markdown':
+        return MarkdownFormatter()
+    return TextFormatter(use_color=not args.no_color)
+
+
+def watch_skill(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    --watch：首次完整扫描后监视 skill 目录，每次变化只重新分析新建和修改的文件，
+    移除已删除文件的结果，然后重新输出报告（jsonl 只输出变化的文件和新的摘要）
+    """
+    skill_path = Path(args.skill_path)
+    if not skill_path.is_dir():
+        parser.error("--watch requires a skill directory")
+    scanner = SkillScanner(**scanner_options(parser, args))
+    watcher = SkillWatcher(scanner, str(skill_path))
+    jsonl = JsonLinesFormatter() if args.format == 'jsonl' else None
+    formatter = None if jsonl else make_formatter(args)
+    
+    def emit(result: ScanResult, updated, removed):
+        if jsonl is None:
+            print(formatter.format(result), flush=True)
+            return
+        for event in updated:
+            print(jsonl.format_event(event))
+        for path in removed:
+            print(jsonl.format_removed(str(path)))
+        print(jsonl.format_summary(
+            result.skill_path, result.files_scanned, result.risk_summary, result.scan_time,
+            result.cache_hits, result.cache_misses, stats=result.stats
+        ), flush=True)
+    
+    with scanner:
+        result = watcher.initial_scan()
+        emit(result, list(watcher.results.values()), [])
+        source = open_change_source(skill_path, scanner.walker)
+        method = 'inotify' if isinstance(source, InotifySource) else 'polling'
+        print(f"Watching {skill_path} for changes ({method}), press Ctrl+C to stop", file=sys.stderr, flush=True)
+        try:
+            while True:
+                changed = source.wait()
+                if changed is not None and not changed:
+                    continue
+                start_time = time.time()
+                updated, removed = watcher.apply(changed)
+                if not updated and not removed:
+                    continue
+                result = watcher.result(time.time() - start_time)
+                if jsonl is None:
+                    print(
+                        f"\n[{time.strftime('%H:%M:%S')}] {len(updated)} file(s) rescanned, "
+                        f"{len(removed)} removed in {result.scan_time:.3f}s",
+                        file=sys.stderr, flush=True
+                    )
+                emit(result, updated, removed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            source.close()
+    sys.exit(1 if result.risk_summary['HIGH'] > 0 else 0)
+
+
+def scan_git_diff(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """--diff / --staged：只扫描 git 中变化的文件，报告新增和消失的发现"""
+    scanner = SkillScanner(**scanner_options(parser, args))
+    try:
+        with scanner:
+            if args.staged:
+                diff = scan_diff(scanner, args.skill_path, staged=True)
+            else:
+                base, head = resolve_range(Path(args.skill_path), args.diff)
+                diff = scan_diff(scanner, args.skill_path, base, head)
+    except GitError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    
+    result = diff.result
+    if args.format == 'json':
+        print(json.dumps(diff.to_dict(), indent=2, ensure_ascii=False))
+    elif args.format == 'jsonl':
+        print(JsonLinesFormatter().format(result))
+    else:
+        print(make_formatter(args).format(result))
+    if args.format in ('text', 'markdown') and not args.quiet:
+        print(f"\n{len(diff.changes)} changed file(s) between {diff.base} and {diff.head}; "
+              f"{len(result.findings)} finding(s) introduced, {len(diff.removed)} removed")
+        for finding in diff.removed:
+            print(f"  - removed [{finding.level.value}] {finding.file}: {finding.description}")
+    
+    # 退出码只取决于新增的 HIGH
+    sys.exit(1 if result.risk_summary['HIGH'] > 0 else 0)
+
+
+def batch_skill_paths(parser: argparse.ArgumentParser, path: str) -> List[Path]:
+    """--batch 的 skill 列表：注册表目录下的 skill，或列表文件中的路径（每行一个，# 开头为注释）"""
+    source = Path(path)
+    if source.is_dir():
+        return discover_skills(str(source))
+    if not source.is_file():
+        parser.error(f"--batch: no such directory or list file: {path}")
+    skills = []
+    for line in source.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            # 相对路径相对于列表文件所在目录
+            skills.append(source.parent / line)
+    return skills
+
+
+def scan_batch(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """--batch：批量扫描多个 skill，每个 skill 完成后立即输出，最后输出汇总统计"""
+    skills = batch_skill_paths(parser, args.skill_path)
+    scanner = SkillScanner(**scanner_options(parser, args))
+    fleet = FleetSummary()
+    results: List[ScanResult] = []
+    
+    # 无法扫描的 skill（损坏的压缩包等）作为带 error 的结果输出，不中断其余 skill
+    with scanner:
+        for result in scanner.scan_many(skills):
+            fleet.add(result)
+            if args.format == 'jsonl':
+                record = {"type": "skill"}
+                record.update(result.to_dict())
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+            elif args.format == 'text':
+                if result.error is not None:
+                    print(f"{'ERROR':>30}  {result.skill_path}: {result.error}", flush=True)
+                elif not args.quiet:
+                    summary = result.risk_summary
+                    print(
+                        f"{summary['HIGH']:>4} HIGH {summary['MEDIUM']:>4} MEDIUM {summary['LOW']:>4} LOW  "
+                        f"{result.skill_path} ({result.files_scanned} files)", flush=True
+                    )
+            else:
+                results.append(result)
+    
+    if args.format == 'jsonl':
+        record = {"type": "fleet"}
+        record.update(fleet.to_dict())
+        print(json.dumps(record, ensure_ascii=False))
+    elif args.format == 'json':
+        print(json.dumps({
+            "skills": [result.to_dict() for result in results],
+            "fleet": fleet.to_dict()
+        }, indent=2, ensure_ascii=False))
+    elif args.format == 'markdown':
+        print('\n\n'.join(MarkdownFormatter().format(result) for result in results))
+        print(f"\n## Fleet Summary\n\n```json\n{json.dumps(fleet.to_dict(), indent=2)}\n```")
+    else:
+        levels = fleet.skills_by_level
+        print(
+            f"\n{fleet.skills_scanned} skills, {fleet.files_scanned} files in {fleet.scan_time:.2f}s: "
+            f"{levels['HIGH']} with HIGH, {levels['MEDIUM']} with MEDIUM, {levels['LOW']} with LOW, "
+            f"{levels['CLEAN'] + levels['INFO']} clean "
+            f"({fleet.risk_summary['HIGH']} HIGH / {fleet.risk_summary['MEDIUM']} MEDIUM / "
+            f"{fleet.risk_summary['LOW']} LOW findings)"
+        )
+        if fleet.stats.get('dedup_hits'):
+            print(f"{fleet.stats['dedup_hits']} files ({fleet.dedup_ratio:.1%}) shared results with identical content")
+        if fleet.skills_failed:
+            print(f"{fleet.skills_failed} skills could not be scanned")
+    
+    # HIGH 优先于扫描失败：1 = 发现 HIGH，2 = 有 skill 无法扫描
+    if fleet.risk_summary['HIGH'] > 0:
+        sys.exit(1)
+    sys.exit(2 if fleet.skills_failed else 0)
 
 
 def main():
+    # 子命令：trustskill serve ...（其余参数为扫描路径，保持原有用法不变）
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description='🍊 Orange TrustSkill v2.0 - Security Scanner for OpenClaw Skills',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -37,7 +608,19 @@ Examples:
   %(prog)s /path/to/skill
   %(prog)s /path/to/skill --mode deep
   %(prog)s /path/to/skill --format json
+  %(prog)s /path/to/skill --format jsonl
   %(prog)s /path/to/skill --export-for-llm
+  %(prog)s /path/to/skill --jobs auto
+  %(prog)s /path/to/skill --cache
+  %(prog)s /path/to/skill --fail-fast
+  %(prog)s /path/to/skill --watch
+  %(prog)s /path/to/registry --batch --jobs auto
+  %(prog)s /path/to/skill --diff origin/main..HEAD
+  %(prog)s /path/to/skill --staged
+  %(prog)s /path/to/skill --rules my-rules.toml
+  %(prog)s /path/to/skill-bundle.zip
+  %(prog)s serve --socket /tmp/trustskill.sock
+  %(prog)s /path/to/skill --server unix:/tmp/trustskill.sock
         """
     )
     
@@ -46,18 +629,54 @@ Examples:
         help='Path to skill directory to scan'
     )
     
-    parser.add_argument(
-        '-m', '--mode',
-        choices=['fast', 'standard', 'deep'],
-        default='standard',
-        help='Analysis mode (default: standard)'
-    )
+    add_scanner_arguments(parser)
     
     parser.add_argument(
         '-f', '--format',
-        choices=['text', 'json', 'markdown'],
+        choices=['text', 'json', 'jsonl', 'markdown'],
         default='text',
-        help='Output format (default: text)'
+        help='Output format (default: text); jsonl streams one record per file as it completes'
+    )
+    
+    parser.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help='Stop at the first HIGH finding (likeliest offenders are scanned first)'
+    )
+    
+    parser.add_argument(
+        '--server',
+        metavar='ADDR',
+        help='Send the scan to a running "serve" daemon (HOST:PORT or unix:PATH) '
+             'instead of scanning in this process; the daemon\'s jobs, cache, rules '
+             'and archive limits apply'
+    )
+    
+    parser.add_argument(
+        '--diff',
+        metavar='RANGE',
+        help='Only scan files changed in git between BASE..HEAD (or BASE...HEAD, or BASE for BASE..HEAD), '
+             'reading blobs from the repository; reports findings introduced and removed relative to BASE'
+    )
+    
+    parser.add_argument(
+        '--staged',
+        action='store_true',
+        help='Only scan files staged in the git index, compared with HEAD (for pre-commit hooks)'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Scan many skills at once: skill_path is a registry directory whose subdirectories '
+             '(and archives) are skills, or a text file listing one skill path per line. '
+             'All files share one worker pool; each skill is reported as it completes'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and rescan only the files that change, re-emitting the report after each change'
     )
     
     parser.add_argument(
@@ -96,56 +715,38 @@ Examples:
     if args.export_for_llm:
         args.format = 'markdown'
     
-    # 转换 mode
-    mode_map = {
-        'fast': AnalysisMode.FAST,
-        'standard': AnalysisMode.STANDARD,
-        'deep': AnalysisMode.DEEP
-    }
-    mode = mode_map[args.mode]
-    
-    # 创建扫描器
-    scanner = SkillScanner(mode=mode)
-    
-    # 创建进度跟踪器
-    progress = None
-    if not args.no_progress and args.format == 'text' and not args.quiet:
-        # 先获取文件总数
-        from src.rules import SCAN_EXTENSIONS, IGNORE_PATTERNS
-        import re
-        
-        skill_path = Path(args.skill_path)
-        total_files = 0
-        if skill_path.exists():
-            for item in skill_path.rglob('*'):
-                if item.is_file():
-                    path_str = str(item)
-                    should_ignore = any(re.search(p, path_str) for p in IGNORE_PATTERNS)
-                    if not should_ignore and item.suffix in SCAN_EXTENSIONS:
-                        total_files += 1
-        
-        if total_files > 0:
-            progress = ProgressTracker(total_files, use_color=not args.no_color)
+    # 多 skill 批量扫描
+    if args.batch:
+        if args.fail_fast or args.watch or args.server or args.diff or args.staged:
+            parser.error("--batch cannot be combined with --fail-fast, --watch, --server, --diff or --staged")
+        scan_batch(parser, args)
     
-    # 扫描
-    def progress_callback(filename: str, current: int, total: int, findings: int):
-        if progress:
-            progress.update(filename, 0)
+    # git 差异扫描
+    if args.diff or args.staged:
+        if args.diff and args.staged:
+            parser.error("--diff and --staged cannot be combined")
+        if args.watch or args.server or args.fail_fast:
+            parser.error("--diff/--staged cannot be combined with --watch, --server or --fail-fast")
+        scan_git_diff(parser, args)
     
-    result = scanner.scan(args.skill_path, progress_callback if progress else None)
+    # 监视模式：持续运行直到 Ctrl+C
+    if args.watch:
+        if args.server:
+            parser.error("--watch cannot be combined with --server")
+        if args.fail_fast:
+            parser.error("--watch cannot be combined with --fail-fast")
+        watch_skill(parser, args)
     
-    if progress:
-        progress.finish()
-    
-    # 格式化输出
-    if args.format == 'json':
-        formatter = JsonFormatter()
-    elif args.format == 'markdown':
-        formatter = MarkdownFormatter()
+    # 由常驻服务扫描（并行、缓存、规则包等扫描器参数由服务决定）
+    if args.server:
+        if args.format == 'jsonl':
+            parser.error("--format jsonl is not supported with --server")
+        result = scan_on_server(parser, args)
     else:
-        formatter = TextFormatter(use_color=not args.no_color)
+        result = scan_locally(parser, args)
     
-    output = formatter.format(result)
+    # 格式化输出
+    output = make_formatter(args).format(result)
     print(output)
     
     # 退出码
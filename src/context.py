@@ -0,0 +1,110 @@
+"""
+文件上下文 - 同一文件的中间结果只计算一次
+字节、解码文本、小写文本、行索引、区域掩码和语法树都按需计算并缓存，
+由第一个需要它的分析器触发，之后所有分析器共享。
+映射的大文件（见 mapped）行索引和区域掩码直接基于字节内容构建，只有语法树需要完整解码
+"""
+
+import ast
+import hashlib
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Optional
+
+from .line_index import LineIndex
+from .mapped import AsciiView, MappedLineIndex
+from .regions import build_region_mask
+from .analyzers.rule_plan import fold_case
+
+
+def decode_content(data: bytes) -> str:
+    """按 UTF-8 解码文件内容，与 Path.read_text(errors='ignore') 结果一致（含换行符转换）"""
+    content = data.decode('utf-8', errors='ignore')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+
+class FileContext:
+    """单个文件的分析上下文"""
+
+    def __init__(
+        self,
+        path: Path,
+        data: Optional[bytes] = None,
+        text: Optional[str] = None,
+        binary: bool = False
+    ):
+        """
+        Args:
+            path: 文件路径
+            data: 文件字节（未提供时按需读取；binary 时为 mapped.map_file 的映射）
+            text: 已解码的文本（未提供时由 data 解码）
+            binary: data 为纯 ASCII、不含 \r 的映射内容，分析器直接按字节扫描
+        """
+        self.path = path
+        self.binary = binary
+        # 分析过程中的统计计数（如 AST 预过滤跳过的文件数），随扫描结果汇总
+        self.stats: Dict[str, int] = {}
+        if data is not None:
+            self.__dict__['data'] = data
+        if text is not None:
+            self.__dict__['text'] = text
+
+    def count(self, name: str, amount: int = 1):
+        """累加统计计数"""
+        self.stats[name] = self.stats.get(name, 0) + amount
+
+    @cached_property
+    def data(self) -> bytes:
+        """文件字节"""
+        if 'text' in self.__dict__:
+            return self.text.encode('utf-8')
+        return self.path.read_bytes()
+
+    @cached_property
+    def sha256(self) -> str:
+        """文件内容的 SHA-256（十六进制）"""
+        return hashlib.sha256(self.data).hexdigest()
+
+    @cached_property
+    def text(self) -> str:
+        """解码后的文本（换行符统一为 \\n）"""
+        if self.binary:
+            return self.data[:].decode('ascii')
+        return decode_content(self.data)
+
+    @cached_property
+    def lower(self) -> str:
+        """小写文本，与 text 逐字符对齐（偏移可直接互换）"""
+        return fold_case(self.text)
+
+    @cached_property
+    def text_view(self):
+        """可按字符偏移切片的文本：映射内容切片时才解码，否则为 text"""
+        return AsciiView(self.data) if self.binary else self.text
+
+    @cached_property
+    def lower_view(self):
+        """可按字符偏移切片的小写文本：映射内容切片时才解码，否则为 lower"""
+        return AsciiView(self.data, lower=True) if self.binary else self.lower
+
+    @cached_property
+    def lines(self) -> LineIndex:
+        """行索引"""
+        if self.binary:
+            return MappedLineIndex(self.data)
+        return LineIndex(self.text)
+
+    @cached_property
+    def regions(self):
+        """字符串/注释区域掩码"""
+        return build_region_mask(self.path, self.data if self.binary else self.text, self.lines)
+
+    @cached_property
+    def tree(self) -> Optional[ast.AST]:
+        """Python 语法树；无法解析时为 None"""
+        try:
+            return ast.parse(self.text)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            return None
@@ -0,0 +1,70 @@
+"""
+内容去重 - 同一次扫描中内容相同的文件只分析一次
+硬链接（同一 inode）的多个路径不读取内容直接合并；
+其余文件先按 (大小, 扩展名) 分组，只有同组内有多个文件时才读取并计算 SHA-256；
+内容和扩展名都相同的文件共用第一个文件（代表文件）的分析结果，发现中的文件名改写为各自的文件名
+（扩展名决定了分析器的路由和区域划分，内容相同但扩展名不同的文件结果可能不同）
+"""
+
+import hashlib
+import dataclasses
+from typing import Dict, List, Sequence, Tuple
+
+from .types import FileResult
+from .walker import FileEntry
+
+
+# 计算文件哈希时每次读取的字节数（流式扫描的大文件不整个读入内存）
+_HASH_BLOCK = 1024 * 1024
+
+
+def _file_digest(path) -> bytes:
+    """文件内容的 SHA-256（分块读取）"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            hasher.update(block)
+    return hasher.digest()
+
+
+def plan_dedup(entries: Sequence[FileEntry]) -> List[int]:
+    """
+    为每个文件找到代表文件
+
+    Returns:
+        与 entries 等长的列表，第 i 项为文件 i 的代表文件序号（文件自身是代表时等于 i）；
+        代表文件总是同组中序号最小的文件，无法读取的文件自己作为代表
+    """
+    representatives = list(range(len(entries)))
+    # 同一 inode（硬链接、指向同一文件的符号链接）：无需读取内容
+    linked: Dict[Tuple[Tuple[int, int], str], int] = {}
+    for index, entry in enumerate(entries):
+        if entry.inode is not None:
+            representatives[index] = linked.setdefault((entry.inode, entry.path.suffix), index)
+
+    groups: Dict[Tuple[int, str], List[int]] = {}
+    for index, entry in enumerate(entries):
+        if representatives[index] == index:
+            groups.setdefault((entry.size, entry.path.suffix), []).append(index)
+
+    for indices in groups.values():
+        if len(indices) < 2:
+            continue
+        first: Dict[bytes, int] = {}
+        for index in indices:
+            try:
+                digest = _file_digest(entries[index].path)
+            except OSError:
+                continue
+            representatives[index] = first.setdefault(digest, index)
+    # 硬链接指向的代表文件可能又与更早的文件内容相同
+    return [representatives[rep] for rep in representatives]
+
+
+def duplicate_result(result: FileResult, entry: FileEntry) -> FileResult:
+    """由代表文件的结果生成重复文件的结果（复制发现并改写文件名，不计入分析统计）"""
+    findings = [dataclasses.replace(finding, file=entry.path.name) for finding in result.findings]
+    return FileResult(
+        str(entry.path), findings, cached=result.cached,
+        stats={'dedup_hits': 1}, duplicate_of=result.file, streamed=result.streamed
+    )
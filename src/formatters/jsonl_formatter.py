@@ -0,0 +1,80 @@
+"""
+JSON Lines 格式化器 - 流式输出
+每个文件一行 {"type": "file", ...}，最后一行为 {"type": "summary", ...}；
+监视模式下被删除的文件输出 {"type": "removed", ...}
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from .base import BaseFormatter
+from ..types import ScanResult, FileResult, assess_risk
+
+
+class JsonLinesFormatter(BaseFormatter):
+    """JSON Lines 格式化器"""
+    
+    def get_name(self) -> str:
+        return "JsonLinesFormatter"
+    
+    def _dumps(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False)
+    
+    def format_event(self, event: FileResult) -> str:
+        """格式化单个文件结果为一行 JSON"""
+        return self._dumps(event.to_dict())
+    
+    def format_removed(self, file: str) -> str:
+        """格式化文件删除记录（监视模式：该文件之前的结果已失效）"""
+        return self._dumps({"type": "removed", "file": file})
+    
+    def format_summary(
+        self,
+        skill_path: str,
+        files_scanned: int,
+        risk_summary: Dict[str, int],
+        scan_time: float,
+        cache_hits: int = 0,
+        cache_misses: int = 0,
+        stopped_early: bool = False,
+        stats: Optional[Dict[str, int]] = None
+    ) -> str:
+        """格式化摘要记录（不含发现明细）"""
+        return self._dumps({
+            "type": "summary",
+            "skill_path": skill_path,
+            "files_scanned": files_scanned,
+            "risk_summary": risk_summary,
+            "security_assessment": assess_risk(risk_summary),
+            "scan_time": scan_time,
+            "timestamp": datetime.now().isoformat(),
+            "cache_hits": cache_hits,
+            "cache_misses": cache_misses,
+            "stopped_early": stopped_early,
+            "stats": stats or {}
+        })
+    
+    def format(self, result: ScanResult) -> str:
+        """格式化完整扫描结果：按文件分组输出发现，最后输出摘要"""
+        lines: List[str] = []
+        group: List = []
+        for finding in result.findings:
+            if group and group[-1].file != finding.file:
+                lines.append(self.format_event(FileResult(group[0].file, group)))
+                group = []
+            group.append(finding)
+        if group:
+            lines.append(self.format_event(FileResult(group[0].file, group)))
+        
+        lines.append(self.format_summary(
+            result.skill_path,
+            result.files_scanned,
+            result.risk_summary,
+            result.scan_time,
+            result.cache_hits,
+            result.cache_misses,
+            result.stopped_early,
+            result.stats
+        ))
+        return '\n'.join(lines)
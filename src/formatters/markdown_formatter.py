@@ -25,6 +25,27 @@ class MarkdownFormatter(BaseFormatter):
             f"- **Files Scanned**: {result.files_scanned}",
             f"- **Scan Time**: {result.scan_time:.2f}s",
             f"- **Timestamp**: {result.timestamp}",
+        ]
+        if result.cache_hits or result.cache_misses:
+            lines.append(f"- **Cache**: {result.cache_hits} hits, {result.cache_misses} misses")
+        if 'ast_parsed' in result.stats or 'ast_skipped' in result.stats:
+            lines.append(
+                f"- **AST**: {result.stats.get('ast_parsed', 0)} parsed, "
+                f"{result.stats.get('ast_skipped', 0)} skipped by prefilter"
+            )
+        if result.stats.get('dedup_hits') and result.files_scanned:
+            lines.append(
+                f"- **Dedup**: {result.stats['dedup_hits']} of {result.files_scanned} files shared results "
+                f"with identical content ({result.stats['dedup_hits'] / result.files_scanned:.1%})"
+            )
+        if result.streamed_files:
+            lines.append(
+                f"- **Streaming mode**: {len(result.streamed_files)} file(s) over the size limit scanned in chunks "
+                f"(regex rules only): " + ', '.join(f"`{file}`" for file in result.streamed_files)
+            )
+        if result.stopped_early:
+            lines.append("- **Fail-fast**: stopped at the first HIGH finding, remaining files not scanned")
+        lines.extend([
             "",
             "---",
             "",
@@ -38,7 +59,7 @@ class MarkdownFormatter(BaseFormatter):
             "",
             "---",
             "",
-        ]
+        ])
         
         if result.findings:
             lines.extend([
@@ -58,6 +58,27 @@ class TextFormatter(BaseFormatter):
         lines.append(f"📄 Files Scanned: {result.files_scanned}")
         lines.append(f"⏱️  Scan Time: {result.scan_time:.2f}s")
         lines.append(f"🕐 Timestamp: {result.timestamp}")
+        if result.cache_hits or result.cache_misses:
+            lines.append(f"💾 Cache: {result.cache_hits} hits, {result.cache_misses} misses")
+        if 'ast_parsed' in result.stats or 'ast_skipped' in result.stats:
+            lines.append(
+                f"🌳 AST: {result.stats.get('ast_parsed', 0)} parsed, "
+                f"{result.stats.get('ast_skipped', 0)} skipped by prefilter"
+            )
+        if result.stats.get('dedup_hits') and result.files_scanned:
+            lines.append(
+                f"♻️  Dedup: {result.stats['dedup_hits']} of {result.files_scanned} files shared results "
+                f"with identical content ({result.stats['dedup_hits'] / result.files_scanned:.1%})"
+            )
+        if result.streamed_files:
+            lines.append(
+                f"📼 Streaming mode: {len(result.streamed_files)} file(s) over the size limit scanned in chunks "
+                f"(regex rules only)"
+            )
+            for file in result.streamed_files:
+                lines.append(f"   - {file}")
+        if result.stopped_early:
+            lines.append(self._color("⏹️  Fail-fast: stopped at the first HIGH finding, remaining files not scanned", 'YELLOW'))
         
         # 风险摘要
         summary = result.risk_summary
@@ -124,14 +145,20 @@ class ProgressTracker:
         self.current += 1
         self.findings += new_findings
         
+        color_start = '\033[92m' if self.use_color else ''
+        color_end = '\033[0m' if self.use_color else ''
+        
+        if self.total <= 0:
+            # 总数未知（流式读取的 tar 压缩包）：只显示已扫描的文件数
+            status = f"\r{color_start}Scanning: {self.current} files | Issues: {self.findings}{color_end}"
+            print(status, end='', flush=True)
+            return
+        
         progress = (self.current / self.total) * 100
         bar_length = 30
         filled = int(bar_length * self.current / self.total)
         bar = '█' * filled + '░' * (bar_length - filled)
         
-        color_start = '\033[92m' if self.use_color else ''
-        color_end = '\033[0m' if self.use_color else ''
-        
         status = f"\r{color_start}Scanning: [{bar}] {progress:.1f}% ({self.current}/{self.total}) | Issues: {self.findings}{color_end}"
         print(status, end='', flush=True)
     
@@ -0,0 +1,324 @@
+"""
+差异扫描 - 只分析两个 git 版本之间变化的文件
+变化的路径由一次 `git diff --raw -z` 取得，文件内容由一次 `git cat-file --batch` 批量读取，
+不检出工作区；基准版本和目标版本中的同一文件分别分析，比较后报告新增和消失的发现
+"""
+
+import time
+import subprocess
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .types import ScanResult, SecurityIssue
+from .context import decode_content
+
+
+# 空树对象 ID（还没有任何提交时，暂存区与空树比较）
+_EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+# 普通文件的 git 模式（跳过符号链接 120000 和子模块 160000）
+_BLOB_MODES = ('100644', '100755')
+
+
+class GitError(RuntimeError):
+    """git 命令执行失败（不是 git 仓库、版本不存在等）"""
+
+
+@dataclass
+class GitChange:
+    """git diff --raw 中的一条变化"""
+    status: str                       # A / M / D / R / C / T
+    old_path: Optional[str]           # 基准版本中的路径（新增时为 None）
+    new_path: Optional[str]           # 目标版本中的路径（删除时为 None）
+    old_oid: Optional[str]
+    new_oid: Optional[str]
+
+
+@dataclass
+class DiffScanResult:
+    """差异扫描结果"""
+    result: ScanResult                       # findings 为新增的发现
+    removed: List[SecurityIssue]             # 基准版本中有、目标版本中消失的发现
+    base: str
+    head: str
+    changes: List[GitChange] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.result.to_dict()
+        data["diff"] = {
+            "base": self.base,
+            "head": self.head,
+            "files_changed": len(self.changes),
+            "removed_findings": [f.to_dict() for f in self.removed],
+        }
+        return data
+
+
+def _git(repo: Path, args: List[str], input: Optional[bytes] = None) -> bytes:
+    """在 repo 目录中执行 git 命令，返回标准输出"""
+    try:
+        proc = subprocess.run(
+            ['git', *args], cwd=str(repo), input=input,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        raise GitError(f"cannot run git: {e}")
+    if proc.returncode != 0:
+        message = proc.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        message = message[0] if message else f"exit status {proc.returncode}"
+        raise GitError(f"git {args[0]} failed: {message}")
+    return proc.stdout
+
+
+def resolve_range(repo: Path, spec: str) -> Tuple[str, str]:
+    """
+    解析版本范围
+
+    BASE..HEAD 比较两个版本；BASE...HEAD 以两者的 merge-base 为基准（与 git diff 相同）；
+    只给出 BASE 时目标版本为 HEAD
+
+    Returns:
+        (基准版本, 目标版本)
+    """
+    if '...' in spec:
+        base, head = spec.split('...', 1)
+        head = head or 'HEAD'
+        merge_base = _git(repo, ['merge-base', '--end-of-options', base or 'HEAD', head]).decode().strip()
+        return merge_base, head
+    if '..' in spec:
+        base, head = spec.split('..', 1)
+        return base or 'HEAD', head or 'HEAD'
+    return spec, 'HEAD'
+
+
+def parse_raw_diff(output: bytes) -> List[GitChange]:
+    """解析 `git diff --raw -z --no-abbrev` 的输出"""
+    fields = output.split(b'\0')
+    changes: List[GitChange] = []
+    index = 0
+    while index < len(fields) and fields[index]:
+        meta = fields[index].decode('ascii')
+        old_mode, new_mode, old_oid, new_oid, status = meta.lstrip(':').split(' ')
+        status = status[0]
+        first = fields[index + 1].decode('utf-8', errors='surrogateescape')
+        index += 2
+        second = None
+        if status in ('R', 'C'):
+            second = fields[index].decode('utf-8', errors='surrogateescape')
+            index += 1
+
+        old_path, new_path = (first, second) if second is not None else (first, first)
+        # 全零对象 ID：文件在该侧不存在（新增 / 删除）
+        if not old_oid.strip('0') or old_mode not in _BLOB_MODES:
+            old_path, old_oid = None, None
+        if not new_oid.strip('0') or new_mode not in _BLOB_MODES:
+            new_path, new_oid = None, None
+        if old_path is None and new_path is None:
+            continue
+        changes.append(GitChange(status, old_path, new_path, old_oid, new_oid))
+    return changes
+
+
+def _read_batch(output: bytes) -> Iterable[Tuple[str, int, bytes]]:
+    """解析 `git cat-file --batch` / `--batch-check` 的输出，产出 (oid, size, content)"""
+    pos = 0
+    while pos < len(output):
+        end = output.index(b'\n', pos)
+        header = output[pos:end].decode('ascii').split(' ')
+        pos = end + 1
+        if len(header) < 3:
+            # "<oid> missing"
+            continue
+        oid, size = header[0], int(header[2])
+        yield oid, size, output[pos:pos + size]
+        pos += size + 1
+
+
+def read_blob_sizes(repo: Path, oids: Iterable[str]) -> Dict[str, int]:
+    """批量读取对象大小（一次 git cat-file --batch-check）"""
+    request = ''.join(f'{oid}\n' for oid in dict.fromkeys(oids)).encode('ascii')
+    if not request:
+        return {}
+    output = _git(repo, ['cat-file', '--batch-check'], request)
+    sizes = {}
+    for line in output.decode('ascii').splitlines():
+        parts = line.split(' ')
+        if len(parts) == 3:
+            sizes[parts[0]] = int(parts[2])
+    return sizes
+
+
+def read_blobs(repo: Path, oids: Iterable[str]) -> Dict[str, bytes]:
+    """批量读取对象内容（一次 git cat-file --batch，不检出文件）"""
+    request = ''.join(f'{oid}\n' for oid in dict.fromkeys(oids)).encode('ascii')
+    if not request:
+        return {}
+    output = _git(repo, ['cat-file', '--batch'], request)
+    return {oid: content for oid, _, content in _read_batch(output)}
+
+
+def staged_base(repo: Path) -> str:
+    """暂存区比较的默认基准：HEAD；仓库还没有提交时为空树"""
+    try:
+        _git(repo, ['rev-parse', '--verify', '--quiet', '--end-of-options', 'HEAD^{commit}'])
+    except GitError:
+        return _EMPTY_TREE
+    return 'HEAD'
+
+
+def git_changes(skill_path: Path, base: str, head: Optional[str] = None, staged: bool = False) -> List[GitChange]:
+    """
+    skill 目录中变化的文件（路径相对于 skill 目录）
+
+    Args:
+        skill_path: skill 目录（位于 git 仓库中，可以是子目录）
+        base: 基准版本
+        head: 目标版本；staged 为 True 时忽略（目标为暂存区）
+        staged: 比较基准版本与暂存区（pre-commit）
+    """
+    # 不在仓库中时 git diff 会退回 --no-index 模式，先明确检查
+    inside = _git(skill_path, ['rev-parse', '--is-inside-work-tree']).strip()
+    if inside != b'true':
+        raise GitError(f"not inside a git work tree: {skill_path}")
+    # 用户给出的版本放在 --end-of-options 之后：以 - 开头的版本不会被当作 git 选项（如 --output=）
+    args = ['diff', '--raw', '-z', '--no-abbrev', '-M', '--relative']
+    if staged:
+        args += ['--cached', '--end-of-options', base]
+    else:
+        args += ['--end-of-options', base, head or 'HEAD']
+    return parse_raw_diff(_git(skill_path, args + ['--', '.']))
+
+
+def _lines(data: Optional[bytes]) -> List[str]:
+    """文件内容按行拆分（与分析器的解码方式一致，行号可以直接对应）"""
+    return decode_content(data).split('\n') if data is not None else []
+
+
+def _finding_key(finding: SecurityIssue, lines: List[str]) -> Tuple:
+    """
+    比较两侧发现的键：使用发现所在行的内容而不是行号和片段
+    （文件其他位置的修改会使行号整体移动，片段也会包含相邻的修改）
+    """
+    text = lines[finding.line - 1].strip() if 0 < finding.line <= len(lines) else ''
+    return (finding.level, finding.category, finding.description, finding.rule_id, text)
+
+
+def _subtract(
+    findings: List[SecurityIssue],
+    lines: List[str],
+    other: List[SecurityIssue],
+    other_lines: List[str]
+) -> List[SecurityIssue]:
+    """findings 中不在 other 中出现的发现（按多重集合相减，相同发现出现多次时逐个抵消）"""
+    remaining = Counter(_finding_key(finding, other_lines) for finding in other)
+    result = []
+    for finding in findings:
+        key = _finding_key(finding, lines)
+        if remaining[key] > 0:
+            remaining[key] -= 1
+        else:
+            result.append(finding)
+    return result
+
+
+def scan_diff(
+    scanner,
+    skill_path: str,
+    base: Optional[str] = None,
+    head: Optional[str] = None,
+    staged: bool = False
+) -> DiffScanResult:
+    """
+    差异扫描：只分析 base 与 head（或暂存区）之间变化的文件
+
+    Args:
+        scanner: SkillScanner（使用其分析器、缓存和过滤规则）
+        skill_path: skill 目录（位于 git 仓库中）
+        base: 基准版本（默认 HEAD；staged 时仓库还没有提交则为空树）
+        head: 目标版本（默认 HEAD）
+        staged: 比较基准版本与暂存区
+
+    Returns:
+        差异扫描结果：result.findings 为新增的发现，removed 为消失的发现
+
+    Raises:
+        GitError: 不是 git 仓库、版本不存在等
+    """
+    start_time = time.time()
+    skill_path = Path(skill_path)
+    if not skill_path.is_dir():
+        raise GitError(f"not a directory: {skill_path}")
+    if base is None:
+        base = staged_base(skill_path) if staged else 'HEAD'
+    changes = git_changes(skill_path, base, head, staged)
+
+    # 先只读取大小，按与目录扫描相同的规则过滤后再读取内容
+    sizes = read_blob_sizes(skill_path, [oid for change in changes for oid in (change.old_oid, change.new_oid) if oid])
+    walker = scanner.walker
+
+    def wanted(path: Optional[str], oid: Optional[str]) -> bool:
+        if path is None or oid not in sizes:
+            return False
+        if path == 'SKILL.md':
+            return sizes[oid] <= walker.size_limit
+        return walker.accepts(path, sizes[oid])
+
+    changes = [
+        change for change in changes
+        if wanted(change.old_path, change.old_oid) or wanted(change.new_path, change.new_oid)
+    ]
+    blobs = read_blobs(skill_path, [
+        oid for change in changes for path, oid in
+        ((change.old_path, change.old_oid), (change.new_path, change.new_oid)) if wanted(path, oid)
+    ])
+
+    head_files = {
+        change.new_path: blobs[change.new_oid] for change in changes
+        if wanted(change.new_path, change.new_oid)
+    }
+    # 基准版本的文件以目标版本中的路径为键（重命名后仍与新文件比较）
+    base_files = {
+        change.new_path or change.old_path: blobs[change.old_oid] for change in changes
+        if wanted(change.old_path, change.old_oid)
+    }
+    head_results = {result.file: result for result in scanner.scan_files_iter(head_files)}
+    base_results = {result.file: result for result in scanner.scan_files_iter(base_files)}
+
+    introduced: List[SecurityIssue] = []
+    removed: List[SecurityIssue] = []
+    stats: Dict[str, int] = {}
+    cache_hits = 0
+    cache_misses = 0
+    for path in sorted(set(head_results) | set(base_results)):
+        new = head_results.get(path)
+        old = base_results.get(path)
+        new_findings = new.findings if new else []
+        old_findings = old.findings if old else []
+        # 只为有发现的文件拆分行（流式扫描的大文件没有发现时不整个解码）
+        if new_findings or old_findings:
+            new_lines = _lines(head_files.get(path))
+            old_lines = _lines(base_files.get(path))
+            introduced.extend(_subtract(new_findings, new_lines, old_findings, old_lines))
+            removed.extend(_subtract(old_findings, old_lines, new_findings, new_lines))
+        if new is not None:
+            for name, value in new.stats.items():
+                stats[name] = stats.get(name, 0) + value
+            if scanner.cache is not None:
+                if new.cached:
+                    cache_hits += 1
+                else:
+                    cache_misses += 1
+
+    head_label = 'staged' if staged else (head or 'HEAD')
+    result = ScanResult(
+        skill_path=f'{skill_path} ({base}..{head_label})',
+        files_scanned=len(head_results),
+        findings=introduced,
+        scan_time=time.time() - start_time,
+        cache_hits=cache_hits,
+        cache_misses=cache_misses,
+        stats=stats
+    )
+    return DiffScanResult(result, removed, base, head_label, changes)
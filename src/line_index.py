@@ -0,0 +1,46 @@
+"""
+行索引 - 每个文件只切分一次行
+预先记录每行的起始偏移，位置到行号的转换使用二分查找（O(log n)），
+所有分析器通过 FileContext 共享同一个文件的行索引
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Tuple, Optional
+
+
+class LineIndex:
+    """文件内容的行索引"""
+
+    def __init__(self, content: str):
+        """
+        构建行索引
+
+        Args:
+            content: 文件内容（换行符已统一为 \\n）
+        """
+        self.content = content
+        self.lines: List[str] = content.split('\n')
+        # 每行起始偏移：第 i 行（从 0 开始）起始于 starts[i]
+        self.starts: List[int] = [0]
+        self.starts.extend(accumulate(len(line) + 1 for line in self.lines[:-1]))
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def line_number(self, position: int) -> int:
+        """获取位置对应的行号（从 1 开始）"""
+        return bisect_right(self.starts, position)
+
+    def line(self, line_number: int) -> Optional[str]:
+        """获取指定行的内容（不含换行符），行号越界时返回 None"""
+        if 1 <= line_number <= len(self.lines):
+            return self.lines[line_number - 1]
+        return None
+
+    def line_span(self, position: int) -> Tuple[int, int]:
+        """获取位置所在行的 [起始, 结束) 偏移（不含换行符）"""
+        index = bisect_right(self.starts, position) - 1
+        start = self.starts[index]
+        return start, start + len(self.lines[index])
+
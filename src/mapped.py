@@ -0,0 +1,100 @@
+"""
+内存映射扫描 - 大文件不解码为 str，正则直接在 mmap 上按字节匹配
+只用于纯 ASCII、不含 \\r 的文件：此时字节偏移即字符偏移，bytes 正则与 str 正则的匹配完全相同，
+解码文本与原始字节相同（无需换行符转换），只有片段、上下文判断等需要的小窗口才解码
+"""
+
+import re
+import mmap
+from array import array
+from bisect import bisect_right
+from typing import Optional, Tuple, Union
+
+
+# 不能按字节扫描的内容：非 ASCII（多字节字符、忽略大小写匹配）、\r（解码时换行符转换）、
+# \x1c-\x1f（str 正则的 \s 匹配这些字符，bytes 正则不匹配）
+_BINARY_UNSAFE = re.compile(rb'[\r\x1c-\x1f\x80-\xff]')
+
+_NEWLINE = re.compile(rb'\n')
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def map_file(path) -> Optional[mmap.mmap]:
+    """
+    只读映射文件
+
+    Returns:
+        映射；文件无法映射（空文件、特殊文件）或内容不能按字节扫描时返回 None
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if _BINARY_UNSAFE.search(mapped) is not None:
+        mapped.close()
+        return None
+    return mapped
+
+
+def binary_pattern(pattern: re.Pattern) -> re.Pattern:
+    """str 正则的 bytes 版本（相同的标志，去掉 bytes 不支持的 re.UNICODE）"""
+    return re.compile(pattern.pattern.encode('ascii'), pattern.flags & ~re.UNICODE)
+
+
+class AsciiView:
+    """按字符偏移切片的映射内容：切片时才解码（偏移与字节偏移相同）"""
+
+    __slots__ = ('data', '_lower')
+
+    def __init__(self, data: Buffer, lower: bool = False):
+        """
+        Args:
+            data: 纯 ASCII 的字节内容
+            lower: 切片结果转换为小写（对应 FileContext.lower）
+        """
+        self.data = data
+        self._lower = lower
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key: slice) -> str:
+        text = self.data[key].decode('ascii')
+        return text.lower() if self._lower else text
+
+
+class MappedLineIndex:
+    """
+    映射内容的行索引（接口与 LineIndex 相同）
+
+    只保存每行的起始偏移（array，每行 8 字节），不切分行；行内容在需要时解码
+    """
+
+    def __init__(self, data: Buffer):
+        self.data = data
+        self.starts = array('q', [0])
+        self.starts.extend(match.end() for match in _NEWLINE.finditer(data))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def line_number(self, position: int) -> int:
+        """获取位置对应的行号（从 1 开始）"""
+        return bisect_right(self.starts, position)
+
+    def _end(self, index: int) -> int:
+        return self.starts[index + 1] - 1 if index + 1 < len(self.starts) else len(self.data)
+
+    def line(self, line_number: int) -> Optional[str]:
+        """获取指定行的内容（不含换行符），行号越界时返回 None"""
+        if 1 <= line_number <= len(self.starts):
+            index = line_number - 1
+            return self.data[self.starts[index]:self._end(index)].decode('ascii')
+        return None
+
+    def line_span(self, position: int) -> Tuple[int, int]:
+        """获取位置所在行的 [起始, 结束) 偏移（不含换行符）"""
+        index = bisect_right(self.starts, position) - 1
+        return self.starts[index], self._end(index)
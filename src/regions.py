@@ -0,0 +1,260 @@
+"""
+区域掩码 - 标记文件中的字符串字面量、注释和代码
+每个文件按需单遍构建，之后每次查询为 O(log n)：
+- Python / Shell / JavaScript 使用单遍词法正则扫描
+  （Python 的结果与标准库 tokenize 一致，速度快一个数量级，见 scripts/benchmark.py）
+- 其他文件退回到按行统计引号的启发式判断
+映射的大文件（见 mapped）使用相同词法正则的 bytes 版本直接扫描字节内容
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional, Pattern
+
+from .line_index import LineIndex
+from .mapped import AsciiView, MappedLineIndex, binary_pattern
+
+
+# 区域类型（不在任何区域中的位置为代码）
+STRING = 'string'
+COMMENT = 'comment'
+
+
+class RegionMask:
+    """有序、不重叠的字符串/注释区间"""
+
+    def __init__(self, regions: List[Tuple[int, int, str]], tokens: Optional[List[Tuple[int, int]]] = None):
+        """
+        Args:
+            regions: 按起始偏移排序的 (起始, 结束, 类型) 区间，结束偏移不含
+            tokens: 按起始偏移排序的其他多字符词法单元 (起始, 结束)，如 Shell 的转义和 here-document；
+                不属于任何区域，但不能从其中间开始重新扫描（见 resume_point）
+        """
+        self._starts = [start for start, _, _ in regions]
+        self._ends = [end for _, end, _ in regions]
+        self._kinds = [kind for _, _, kind in regions]
+        self._token_starts = [start for start, _ in tokens or []]
+        self._token_ends = [end for _, end in tokens or []]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def regions(self) -> List[Tuple[int, int, str]]:
+        """所有区间"""
+        return list(zip(self._starts, self._ends, self._kinds))
+
+    def kind_at(self, position: int) -> Optional[str]:
+        """位置所在区域的类型，代码返回 None"""
+        index = bisect_right(self._starts, position) - 1
+        if index >= 0 and position < self._ends[index]:
+            return self._kinds[index]
+        return None
+
+    def in_string(self, position: int) -> bool:
+        """位置是否在字符串字面量中"""
+        return self.kind_at(position) == STRING
+
+    def in_comment(self, position: int) -> bool:
+        """位置是否在注释中"""
+        return self.kind_at(position) == COMMENT
+
+    def resume_point(self, position: int) -> int:
+        """
+        从该偏移重新扫描，position 之后的区域与从头扫描相同
+        （所在区域或词法单元的开头，代码中为 position 本身）
+        """
+        index = bisect_right(self._starts, position) - 1
+        if index >= 0 and position < self._ends[index]:
+            return self._starts[index]
+        index = bisect_right(self._token_starts, position) - 1
+        if index >= 0 and position < self._token_ends[index]:
+            return self._token_starts[index]
+        return position
+
+
+class LineQuoteMask:
+    """
+    按行引号计数的启发式判断（无词法分析器的文件类型使用）
+
+    当前行中位置之前的双引号或单引号数量为奇数时，认为在字符串中
+    """
+
+    def __init__(self, content: str, lines: Optional[LineIndex] = None):
+        if isinstance(content, str):
+            self._content = content
+            self._lines = lines or LineIndex(content)
+        else:
+            # 映射内容：切片时解码
+            self._content = AsciiView(content)
+            self._lines = lines or MappedLineIndex(content)
+
+    def kind_at(self, position: int) -> Optional[str]:
+        return STRING if self.in_string(position) else None
+
+    def in_string(self, position: int) -> bool:
+        line_start, _ = self._lines.line_span(position)
+        before = self._content[line_start:position]
+        return before.count('"') % 2 == 1 or before.count("'") % 2 == 1
+
+    def in_comment(self, position: int) -> bool:
+        return False
+
+    def resume_point(self, position: int) -> int:
+        """按行判断：从所在行的行首重新扫描"""
+        return self._lines.line_span(position)[0]
+
+
+# 词法正则开头的前瞻字符类让 sre 快速跳过不可能开始字符串/注释的位置
+
+# Python：注释和字符串（含前缀、三引号、转义），与 tokenize 的 STRING / COMMENT 一致
+_PYTHON_TOKENS = re.compile(r'''
+    (?=[#'"rRbBuUfF])
+    (?:
+        (?P<comment>\#[^\n]*)
+      | (?P<string>
+            (?:(?<!\w)[rRbBuUfF]{1,2})?
+            (?: '{3} [^'\\]* (?:(?:\\.|'(?!''))[^'\\]*)* (?:'{3}|\Z)
+              | "{3} [^"\\]* (?:(?:\\.|"(?!""))[^"\\]*)* (?:"{3}|\Z)
+              | ' [^'\\\n]* (?:\\.[^'\\\n]*)* '?
+              | " [^"\\\n]* (?:\\.[^"\\\n]*)* "?
+            )
+        )
+    )
+''', re.VERBOSE | re.DOTALL)
+
+# Shell：转义字符、here-document（正文视为代码，避免其中的撇号被当作引号）、注释和引号字符串；
+# here-document 只匹配首行，结束行由 _HeredocEnds 查找（正则在没有结束行时会扫描到文件末尾）
+_SHELL_TOKENS = re.compile(r'''
+    (?=[\\<\#$'"])
+    (?:
+        (?P<escape>\\.)
+      | (?P<heredoc><<-?[ \t]*(?P<quote>['"]?)(?P<tag>\w+)(?P=quote)[^\n]*\n)
+      | (?P<comment>(?<![^\s;|&()])\#[^\n]*)
+      | (?P<string>\$'(?:[^'\\]|\\.)*'?|'[^']*'?|"(?:[^"\\]|\\.)*"?)
+    )
+''', re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+# JavaScript / TypeScript：注释、引号字符串和模板字符串
+_JS_TOKENS = re.compile(r'''
+    (?=[/'"`])
+    (?:
+        (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+      | (?P<string>'(?:[^'\\\n]|\\.)*'?|"(?:[^"\\\n]|\\.)*"?|`(?:[^`\\]|\\.)*`?)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+
+# here-document 的结束行候选：只有一个单词的行
+_HEREDOC_END = re.compile(r'^[ \t]*(\w+)[ \t]*$', re.MULTILINE)
+
+
+# 词法正则的 bytes 版本（首次扫描映射内容时编译）
+_binary_tokens: Dict[Pattern, Pattern] = {}
+
+
+def _binary(tokens: Pattern, content) -> Pattern:
+    """content 为映射内容时返回正则的 bytes 版本"""
+    if isinstance(content, str):
+        return tokens
+    if tokens not in _binary_tokens:
+        _binary_tokens[tokens] = binary_pattern(tokens)
+    return _binary_tokens[tokens]
+
+
+class _HeredocEnds:
+    """
+    here-document 结束行的索引：单遍扫描所有只有一个单词的行，按单词记录行的位置
+
+    每次查找为 O(log n)，大量没有结束行的 <<TAG 也只需线性时间
+    """
+
+    def __init__(self, content):
+        self._lines: Dict[object, Tuple[List[int], List[int]]] = {}
+        for match in _binary(_HEREDOC_END, content).finditer(content):
+            starts, ends = self._lines.setdefault(match.group(1), ([], []))
+            starts.append(match.start())
+            ends.append(match.end())
+
+    def find(self, tag, position: int) -> Optional[int]:
+        """position 之后第一个内容为 tag 的行的结束偏移（不含换行），没有时返回 None"""
+        lines = self._lines.get(tag)
+        if lines is None:
+            return None
+        starts, ends = lines
+        index = bisect_left(starts, position)
+        return ends[index] if index < len(starts) else None
+
+
+def _lexer_regions(tokens: Pattern, content: str) -> RegionMask:
+    """使用词法正则单遍扫描，收集字符串和注释区间（以及其他词法单元的区间）"""
+    tokens = _binary(tokens, content)
+    regions: List[Tuple[int, int, str]] = []
+    others: List[Tuple[int, int]] = []
+    heredoc_ends: Optional[_HeredocEnds] = None  # 第一次遇到 here-document 时构建
+    position = 0
+    while True:
+        match = tokens.search(content, position)
+        if match is None:
+            break
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == 'heredoc':
+            if heredoc_ends is None:
+                heredoc_ends = _HeredocEnds(content)
+            end = heredoc_ends.find(match.group('tag'), end)
+            if end is None:
+                # 没有结束行：不是 here-document
+                position = start + 1
+                continue
+        if kind == 'string':
+            regions.append((start, end, STRING))
+        elif kind == 'comment':
+            regions.append((start, end, COMMENT))
+        else:
+            others.append((start, end))
+        position = end
+    return RegionMask(regions, others)
+
+
+def python_regions(content: str) -> RegionMask:
+    """构建 Python 文件的区域掩码"""
+    return _lexer_regions(_PYTHON_TOKENS, content)
+
+
+def shell_regions(content: str) -> RegionMask:
+    """构建 Shell 脚本的区域掩码"""
+    return _lexer_regions(_SHELL_TOKENS, content)
+
+
+def js_regions(content: str) -> RegionMask:
+    """构建 JavaScript / TypeScript 文件的区域掩码"""
+    return _lexer_regions(_JS_TOKENS, content)
+
+
+# 文件扩展名 -> 区域掩码构建函数
+REGION_BUILDERS = {
+    '.py': python_regions,
+    '.sh': shell_regions,
+    '.bash': shell_regions,
+    '.zsh': shell_regions,
+    '.fish': shell_regions,
+    '.js': js_regions,
+    '.ts': js_regions,
+}
+
+
+def build_region_mask(file_path: Path, content: str, lines: Optional[LineIndex] = None):
+    """
+    构建文件的区域掩码
+
+    Args:
+        file_path: 文件路径（按扩展名选择词法分析器）
+        content: 文件内容
+        lines: 已构建的行索引（LineQuoteMask 使用）
+
+    Returns:
+        RegionMask；不支持的文件类型返回 LineQuoteMask
+    """
+    builder = REGION_BUILDERS.get(file_path.suffix)
+    return builder(content) if builder else LineQuoteMask(content, lines)
@@ -0,0 +1,387 @@
+"""
+外部规则包 - 以 TOML / JSON 声明的正则规则
+规则包在加载时校验并预处理（正则校验、字面量提取、重复规则合并），
+预处理结果按规则包内容哈希缓存到磁盘，之后的每次启动直接复用，不再解析规则包和正则；
+规则本身在执行计划中延迟编译（见 analyzers/rule_plan.py 的 LazyPattern）
+
+规则包格式（TOML）::
+
+    name = "my-rules"
+    version = "1.0"
+
+    [[rules]]
+    id = "EXFIL-001"
+    severity = "high"              # high / medium / low
+    category = "data_exfiltration"
+    description = "curl upload"    # 可选，默认为 id
+    pattern = 'curl\\s+(-T|--upload-file)'
+    near = 'https?://'             # 可选：共现规则的 second
+    window = 0                     # 可选：共现窗口行数（0 表示同一行）
+    window_chars = 200             # 可选：共现窗口的最大字符数
+    file_types = [".sh", ".md"]    # 可选：只扫描这些扩展名
+    languages = ["shell", "docs"]  # 可选：只扫描这些语言的文件（见 rules.LANGUAGE_EXTENSIONS）
+    confidence = 0.9               # 可选，默认 0.8
+
+JSON 格式的结构相同：{"name": ..., "version": ..., "rules": [{...}, ...]}
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Tuple, Any, Optional, FrozenSet
+
+from .types import Severity
+from .rules import LANGUAGE_EXTENSIONS
+from .cache import default_cache_dir
+from .analyzers.rule_plan import extract_literals
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+# 预处理结果的格式版本（预处理逻辑变化时递增，使磁盘缓存失效）
+PLAN_FORMAT_VERSION = 2
+
+# 规则包正则的编译标志（与内置规则一致）
+PACK_FLAGS = re.IGNORECASE
+
+# 规则的严重程度只允许这三级（决定规则在哪些分析模式中启用，与内置规则表一致）
+_SEVERITIES = {
+    'high': Severity.HIGH,
+    'medium': Severity.MEDIUM,
+    'low': Severity.LOW,
+}
+
+_RULE_KEYS = {
+    'id', 'severity', 'category', 'description', 'pattern', 'near',
+    'window', 'window_chars', 'file_types', 'languages', 'confidence',
+}
+
+
+class RulePackError(ValueError):
+    """规则包格式错误"""
+
+
+@dataclass(frozen=True)
+class PackRule:
+    """规则包中的单条规则"""
+    id: str
+    severity: Severity
+    category: str
+    description: str
+    pattern: str
+    near: Optional[str] = None                 # 共现规则的 second（None 表示普通规则）
+    window: int = 0                            # 共现窗口行数
+    window_chars: Optional[int] = None         # 共现窗口字符数
+    file_types: Optional[FrozenSet[str]] = None  # 适用扩展名（小写，含点）
+    confidence: float = 0.8
+    languages: Optional[FrozenSet[str]] = None   # 适用语言
+
+
+@dataclass
+class RulePack:
+    """加载并预处理后的规则包"""
+    name: str
+    version: str
+    path: str
+    sha256: str                 # 规则包文件内容的 SHA-256
+    rules: List[PackRule]
+    # 正则 -> 必需字面量（None 表示无法预过滤），传给执行计划，避免重复解析
+    literals: Dict[str, Optional[FrozenSet[str]]]
+
+
+def default_plan_cache_dir() -> Path:
+    """规则包预处理结果的默认缓存目录"""
+    return default_cache_dir() / 'rule-packs'
+
+
+def _parse_document(path: Path, data: bytes) -> Dict[str, Any]:
+    """按扩展名解析 TOML / JSON"""
+    suffix = path.suffix.lower()
+    try:
+        if suffix == '.toml':
+            if tomllib is None:
+                raise RulePackError(f"{path}: TOML rule packs require Python 3.11+ or the 'tomli' package")
+            document = tomllib.loads(data.decode('utf-8'))
+        elif suffix == '.json':
+            document = json.loads(data.decode('utf-8'))
+        else:
+            raise RulePackError(f"{path}: unsupported rule pack format (expected .toml or .json)")
+    except RulePackError:
+        raise
+    except (ValueError, UnicodeDecodeError) as e:
+        # tomllib.TOMLDecodeError 和 json.JSONDecodeError 都是 ValueError
+        raise RulePackError(f"{path}: {e}")
+    if not isinstance(document, dict):
+        raise RulePackError(f"{path}: top level must be a table/object")
+    return document
+
+
+def _normalize_file_types(value: Any, where: str) -> Optional[FrozenSet[str]]:
+    """file_types 统一为小写、带点的扩展名集合"""
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise RulePackError(f"{where}: 'file_types' must be a list of extensions")
+    return frozenset(
+        (item if item.startswith('.') else '.' + item).lower() for item in value
+    )
+
+
+def _normalize_languages(value: Any, where: str) -> Optional[FrozenSet[str]]:
+    """languages 必须是 LANGUAGE_EXTENSIONS 中的语言"""
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise RulePackError(f"{where}: 'languages' must be a list of language names")
+    unknown = set(value) - set(LANGUAGE_EXTENSIONS)
+    if unknown:
+        raise RulePackError(
+            f"{where}: unknown languages: {', '.join(sorted(unknown))} "
+            f"(expected: {', '.join(LANGUAGE_EXTENSIONS)})"
+        )
+    return frozenset(value)
+
+
+def _parse_rule(item: Any, where: str) -> PackRule:
+    """校验并转换单条规则（只检查结构，正则在预处理时校验）"""
+    if not isinstance(item, dict):
+        raise RulePackError(f"{where}: rule must be a table/object")
+    unknown = set(item) - _RULE_KEYS
+    if unknown:
+        raise RulePackError(f"{where}: unknown keys: {', '.join(sorted(unknown))}")
+    for key in ('id', 'severity', 'category', 'pattern'):
+        if not isinstance(item.get(key), str) or not item[key]:
+            raise RulePackError(f"{where}: '{key}' is required and must be a non-empty string")
+
+    severity = _SEVERITIES.get(item['severity'].lower())
+    if severity is None:
+        raise RulePackError(f"{where}: severity must be one of {', '.join(_SEVERITIES)}")
+
+    near = item.get('near')
+    if near is not None and (not isinstance(near, str) or not near):
+        raise RulePackError(f"{where}: 'near' must be a non-empty string")
+    window = item.get('window', 0)
+    if not isinstance(window, int) or isinstance(window, bool) or window < 0:
+        raise RulePackError(f"{where}: 'window' must be a non-negative integer")
+    window_chars = item.get('window_chars')
+    if window_chars is not None and (
+            not isinstance(window_chars, int) or isinstance(window_chars, bool) or window_chars < 1):
+        raise RulePackError(f"{where}: 'window_chars' must be a positive integer")
+    if near is None and ('window' in item or window_chars is not None):
+        raise RulePackError(f"{where}: 'window' / 'window_chars' require 'near'")
+
+    confidence = item.get('confidence', 0.8)
+    if not isinstance(confidence, (int, float)) or isinstance(confidence, bool) or not 0 <= confidence <= 1:
+        raise RulePackError(f"{where}: 'confidence' must be a number between 0 and 1")
+
+    description = item.get('description', item['id'])
+    if not isinstance(description, str):
+        raise RulePackError(f"{where}: 'description' must be a string")
+
+    return PackRule(
+        id=item['id'],
+        severity=severity,
+        category=item['category'],
+        description=description,
+        pattern=item['pattern'],
+        near=near,
+        window=window,
+        window_chars=window_chars,
+        file_types=_normalize_file_types(item.get('file_types'), where),
+        confidence=float(confidence),
+        languages=_normalize_languages(item.get('languages'), where),
+    )
+
+
+def parse_rule_pack(path: Path, data: bytes) -> Tuple[str, str, List[PackRule]]:
+    """
+    解析规则包内容
+
+    Returns:
+        (名称, 版本, 规则列表)；完全相同的重复规则只保留第一条
+
+    Raises:
+        RulePackError: 格式错误或规则 ID 重复
+    """
+    document = _parse_document(path, data)
+    name = document.get('name', path.stem)
+    version = document.get('version', '0')
+    if not isinstance(name, str) or not isinstance(version, (str, int, float)):
+        raise RulePackError(f"{path}: 'name' and 'version' must be strings")
+    items = document.get('rules')
+    if not isinstance(items, list):
+        raise RulePackError(f"{path}: 'rules' must be a list")
+
+    rules: List[PackRule] = []
+    seen_ids: Dict[str, PackRule] = {}
+    for number, item in enumerate(items, 1):
+        rule = _parse_rule(item, f"{path}: rule #{number}")
+        previous = seen_ids.get(rule.id)
+        if previous is not None:
+            if previous == rule:
+                continue
+            raise RulePackError(f"{path}: duplicate rule id {rule.id!r}")
+        seen_ids[rule.id] = rule
+        rules.append(rule)
+    return name, str(version), rules
+
+
+def _plan_cache_path(cache_dir: Path, digest: str) -> Path:
+    """预处理结果的缓存文件（键包含格式版本和 Python 版本，正则解析器可能随版本变化）"""
+    key = hashlib.sha256(
+        f'{digest}:{PLAN_FORMAT_VERSION}:{sys.version_info[0]}.{sys.version_info[1]}'.encode('ascii')
+    ).hexdigest()
+    return cache_dir / f'{key}.json'
+
+
+def _rule_to_dict(rule: PackRule) -> Dict[str, Any]:
+    """规则转为可写入缓存的 JSON 对象"""
+    return {
+        'id': rule.id,
+        'severity': rule.severity.value,
+        'category': rule.category,
+        'description': rule.description,
+        'pattern': rule.pattern,
+        'near': rule.near,
+        'window': rule.window,
+        'window_chars': rule.window_chars,
+        'file_types': None if rule.file_types is None else sorted(rule.file_types),
+        'confidence': rule.confidence,
+        'languages': None if rule.languages is None else sorted(rule.languages),
+    }
+
+
+def _rule_from_dict(item: Dict[str, Any]) -> PackRule:
+    """由缓存中的 JSON 对象还原规则"""
+    file_types = item['file_types']
+    languages = item['languages']
+    return PackRule(
+        id=item['id'],
+        severity=Severity(item['severity']),
+        category=item['category'],
+        description=item['description'],
+        pattern=item['pattern'],
+        near=item['near'],
+        window=item['window'],
+        window_chars=item['window_chars'],
+        file_types=None if file_types is None else frozenset(file_types),
+        confidence=item['confidence'],
+        languages=None if languages is None else frozenset(languages),
+    )
+
+
+def _read_plan_cache(path: Path) -> Optional[Tuple[str, str, List[PackRule], Dict[str, Optional[FrozenSet[str]]]]]:
+    """
+    读取预处理缓存（已校验的规则和字面量，命中时不再解析 TOML / JSON 规则包）
+
+    Returns:
+        (名称, 版本, 规则列表, 字面量)；不存在或损坏时返回 None
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload['format'] != PLAN_FORMAT_VERSION:
+            return None
+        rules = [_rule_from_dict(item) for item in payload['rules']]
+        literals = {
+            pattern: None if found is None else frozenset(found)
+            for pattern, found in payload['literals'].items()
+        }
+        return payload['name'], payload['version'], rules, literals
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _write_plan_cache(
+    path: Path, name: str, version: str, rules: List[PackRule],
+    literals: Dict[str, Optional[FrozenSet[str]]]
+):
+    """写入预处理缓存（先写临时文件再替换，并发写入不会产生损坏的文件；出错时忽略）"""
+    payload = {
+        'format': PLAN_FORMAT_VERSION,
+        'name': name,
+        'version': version,
+        'rules': [_rule_to_dict(rule) for rule in rules],
+        'literals': {
+            pattern: None if found is None else sorted(found)
+            for pattern, found in literals.items()
+        },
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _preprocess(path: Path, rules: List[PackRule]) -> Dict[str, Optional[FrozenSet[str]]]:
+    """校验所有正则并提取必需字面量（每个不同的正则只处理一次）"""
+    literals: Dict[str, Optional[FrozenSet[str]]] = {}
+    for rule in rules:
+        for pattern in (rule.pattern, rule.near):
+            if pattern is None or pattern in literals:
+                continue
+            try:
+                compiled = re.compile(pattern, PACK_FLAGS)
+            except re.error as e:
+                raise RulePackError(f"{path}: rule {rule.id!r}: invalid pattern {pattern!r}: {e}")
+            if compiled.match(''):
+                # 能匹配空串的规则会在每个位置命中
+                raise RulePackError(f"{path}: rule {rule.id!r}: pattern {pattern!r} matches the empty string")
+            literals[pattern] = extract_literals(pattern, PACK_FLAGS)
+    return literals
+
+
+def load_rule_pack(path: Path, cache_dir: Optional[Path] = None, use_cache: bool = True) -> RulePack:
+    """
+    加载规则包
+
+    Args:
+        path: 规则包文件（.toml 或 .json）
+        cache_dir: 预处理结果缓存目录（默认 default_plan_cache_dir()）
+        use_cache: 是否读写磁盘缓存
+
+    Raises:
+        RulePackError: 文件无法读取、格式错误或正则无效
+    """
+    path = Path(path)
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        raise RulePackError(f"{path}: {e.strerror or e}")
+    digest = hashlib.sha256(data).hexdigest()
+
+    cache_path = None
+    if use_cache:
+        cache_path = _plan_cache_path(cache_dir or default_plan_cache_dir(), digest)
+        cached = _read_plan_cache(cache_path)
+        if cached is not None:
+            name, version, rules, literals = cached
+            return RulePack(name, version, str(path), digest, rules, literals)
+
+    name, version, rules = parse_rule_pack(path, data)
+    literals = _preprocess(path, rules)
+    if cache_path is not None:
+        _write_plan_cache(cache_path, name, version, rules, literals)
+
+    return RulePack(
+        name=name,
+        version=version,
+        path=str(path),
+        sha256=digest,
+        rules=rules,
+        literals=literals,
+    )
@@ -2,7 +2,21 @@
 扫描规则和配置
 """
 
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, NamedTuple, Optional
+
+
+class Near(NamedTuple):
+    """
+    共现规则：first 匹配之后，在窗口内出现 second 时命中（替代 first.*second）
+
+    窗口从 first 的终点开始：lines=0 表示同一行（与 .* 相同），lines=N 表示之后的 N 行内；
+    chars 进一步限制 second 起点与 first 终点的最大距离（字符数）。
+    按各自的匹配位置判断，不会在长行上回溯。
+    """
+    first: str
+    second: str
+    lines: int = 0
+    chars: Optional[int] = None
 
 # 高风险模式 - 恶意代码检测
 HIGH_RISK_PATTERNS = {
@@ -18,13 +32,13 @@ HIGH_RISK_PATTERNS = {
         (r'urllib\.(request|urlopen)', 'urllib network request'),
         (r'http\.client', 'HTTP client usage'),
         (r'socket\.(socket|connect)', 'Socket network connection'),
-        (r'curl\s+.*https?://', 'curl HTTP request'),
-        (r'curl.*webhook\.site|curl.*requestbin|curl.*pastebin', 'curl to suspicious webhook'),
+        (Near(r'curl\s+', r'https?://'), 'curl HTTP request'),
+        (Near(r'curl', r'webhook\.site|requestbin|pastebin'), 'curl to suspicious webhook'),
     ],
     'obfuscation_exfiltration': [
-        (r'base64\.(b64encode|encode).*requests\.(post|put)', 'Base64 encode + HTTP POST (data exfiltration)'),
-        (r'base64\.(b64encode|encode).*urllib', 'Base64 encode + urllib (data exfiltration)'),
-        (r'base64\.(b64encode|encode).*curl', 'Base64 encode + curl (data exfiltration)'),
+        (Near(r'base64\.(b64encode|encode)', r'requests\.(post|put)'), 'Base64 encode + HTTP POST (data exfiltration)'),
+        (Near(r'base64\.(b64encode|encode)', r'urllib'), 'Base64 encode + urllib (data exfiltration)'),
+        (Near(r'base64\.(b64encode|encode)', r'curl'), 'Base64 encode + curl (data exfiltration)'),
         (r'base64\.(b64decode|decode)', 'Base64 decoding'),
     ],
     'file_deletion': [
@@ -168,6 +182,84 @@ SCAN_EXTENSIONS = {
     '.md', '.txt', '.json', '.yaml', '.yml', '.toml'
 }
 
+# 语言 -> 文件扩展名（规则按语言路由；不在表中的扩展名运行所有规则）
+LANGUAGE_EXTENSIONS = {
+    'python': ('.py',),
+    'shell': ('.sh', '.bash', '.zsh', '.fish'),
+    'javascript': ('.js', '.ts'),
+    'ruby': ('.rb',),
+    'perl': ('.pl',),
+    'php': ('.php',),
+    'go': ('.go',),
+    'rust': ('.rs',),
+    'java': ('.java',),
+    'c': ('.c', '.cpp'),
+    'docs': ('.md', '.txt'),
+    'config': ('.yaml', '.yml', '.toml'),
+    'json': ('.json',),
+}
+
+# 规则适用的语言（未列出的规则适用于所有文件）
+# - 文档中的代码块和命令会被 agent 直接执行，所有规则都适用于 docs
+# - YAML / TOML 配置可以内嵌脚本（如 CI 的 run: 步骤），Python 和 Shell 规则都适用
+# - JSON 中的代码只能出现在字符串里，本来就会被字符串过滤掉，只运行与语言无关的规则
+# Python API 规则也适用于 Shell：here-document 和 python -c 中嵌入的 Python 代码
+PYTHON_RULE_LANGUAGES = ('python', 'shell', 'docs', 'config')
+# Shell 命令规则也适用于用反引号执行命令的脚本语言；
+# 其他语言中的命令只能出现在字符串字面量里，本来就会被过滤
+SHELL_RULE_LANGUAGES = ('shell', 'ruby', 'perl', 'php', 'docs', 'config')
+
+RULE_LANGUAGES = {
+    # HIGH
+    r'os\.system\s*\([^)]*[\+\%\$\{\}]': PYTHON_RULE_LANGUAGES,
+    r'subprocess\.(call|run|Popen)\s*\([^)]*shell\s*=\s*True': PYTHON_RULE_LANGUAGES,
+    r'requests\.(post|put)\s*\([^)]*http': PYTHON_RULE_LANGUAGES,
+    r'urllib\.(request|urlopen)': PYTHON_RULE_LANGUAGES,
+    r'http\.client': PYTHON_RULE_LANGUAGES,
+    Near(r'curl\s+', r'https?://'): SHELL_RULE_LANGUAGES,
+    Near(r'curl', r'webhook\.site|requestbin|pastebin'): SHELL_RULE_LANGUAGES,
+    r'shutil\.rmtree\s*\([^)]*[\/\*]': PYTHON_RULE_LANGUAGES,
+    r'os\.remove\s*\([^)]*\*': PYTHON_RULE_LANGUAGES,
+    r'rm\s+-rf': SHELL_RULE_LANGUAGES,
+    r'os\.unlink\s*\([^)]*\*': PYTHON_RULE_LANGUAGES,
+    r'security\s+find-generic-password': SHELL_RULE_LANGUAGES,
+    r'security\s+find-internet-password': SHELL_RULE_LANGUAGES,
+    r'security\s+find-password': SHELL_RULE_LANGUAGES,
+    # MEDIUM
+    r'requests\.(get|post|put|delete)': PYTHON_RULE_LANGUAGES,
+    r'urllib': PYTHON_RULE_LANGUAGES,
+    r'httpx': PYTHON_RULE_LANGUAGES,
+    r'aiohttp': PYTHON_RULE_LANGUAGES,
+    r'expanduser\s*\(\s*[\'"]~[\'"]': PYTHON_RULE_LANGUAGES,
+    r'Path\.home\(\)': PYTHON_RULE_LANGUAGES,
+    r'codecs\.decode': PYTHON_RULE_LANGUAGES,
+    r'zlib\.(decompress|compress)': PYTHON_RULE_LANGUAGES,
+    r'gzip\.': PYTHON_RULE_LANGUAGES,
+    r'__import__\s*\(': PYTHON_RULE_LANGUAGES,
+    r'importlib\.(import_module|__import__)': PYTHON_RULE_LANGUAGES,
+    r'os\.environ': PYTHON_RULE_LANGUAGES,
+    r'os\.getenv': PYTHON_RULE_LANGUAGES + ('go',),
+    # LOW
+    r'os\.system\s*\(': PYTHON_RULE_LANGUAGES,
+    r'subprocess\.': PYTHON_RULE_LANGUAGES,
+    r'os\.popen': PYTHON_RULE_LANGUAGES,
+    r'os\.path\.': PYTHON_RULE_LANGUAGES,
+    r'pathlib': PYTHON_RULE_LANGUAGES,
+    r'shutil\.': PYTHON_RULE_LANGUAGES,
+    r'json\.loads': PYTHON_RULE_LANGUAGES,
+    r'json\.load': PYTHON_RULE_LANGUAGES + ('ruby',),
+}
+
+# fail-fast 模式下的文件扫描优先级（数值越小越先扫描）
+# 可执行脚本最可能包含高风险代码，其次是其他源码，文档和数据文件最后
+# SKILL.md 中引用的文件优先级为 0，排在所有文件之前
+EXTENSION_PRIORITY = {
+    '.py': 1, '.sh': 1, '.bash': 1, '.zsh': 1, '.fish': 1, '.js': 1, '.ts': 1,
+    '.rb': 2, '.pl': 2, '.php': 2, '.go': 2, '.rs': 2, '.java': 2, '.c': 2, '.cpp': 2,
+    '.md': 3, '.txt': 3,
+    '.json': 4, '.yaml': 4, '.yml': 4, '.toml': 4,
+}
+
 # 忽略的文件/目录
 IGNORE_PATTERNS = [
     r'\.git',
@@ -185,3 +277,39 @@ IGNORE_PATTERNS = [
     r'\.tox',
     r'\.coverage',
 ]
+
+# AST 分析器可能报告的标识符（函数名、模块名）
+# 源码中不包含其中任何一个时，AST 分析不可能有发现，直接跳过解析（按常见程度排序，尽早命中）
+AST_TRIGGER_NAMES = (
+    'open', 'compile', 'system', 'popen', 'subprocess',
+    'eval', 'exec', '__import__', 'pickle', 'marshal', 'shelve',
+)
+
+# AST 规则表（由 analyzers/ast_engine.py 中的处理函数使用）
+# 危险函数调用：函数名 -> (类别, 描述)，有非常量参数时报告
+AST_DANGEROUS_CALLS = {
+    'eval': ('command_injection', 'eval() execution'),
+    'exec': ('command_injection', 'exec() execution'),
+    '__import__': ('dynamic_import', 'Dynamic import'),
+    'compile': ('command_injection', 'compile() execution'),
+}
+
+# os 模块中执行命令的函数
+AST_OS_COMMAND_CALLS = {'system', 'popen'}
+
+# subprocess 模块中带 shell=True 时报告的函数
+AST_SUBPROCESS_SHELL_CALLS = {'call', 'run', 'Popen'}
+
+# open() 打开敏感文件：(路径正则, 描述)，按顺序匹配第一个
+AST_SENSITIVE_OPEN_PATTERNS = [
+    (r'\.ssh[/\\]', 'SSH key access'),
+    (r'password', 'Password file access'),
+    (r'token', 'Token file access'),
+    (r'secret', 'Secret file access'),
+    (r'\.openclaw[/\\]config', 'OpenClaw config access'),
+    (r'MEMORY\.md|SOUL\.md|USER\.md', 'Memory file access'),
+]
+
+# 不安全反序列化模块：import X / from X import ...
+AST_DESERIALIZATION_IMPORTS = {'pickle', 'marshal', 'shelve'}
+AST_DESERIALIZATION_FROM_IMPORTS = {'pickle', 'marshal'}
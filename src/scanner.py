@@ -3,17 +3,113 @@
 优化版本：添加文件大小限制和更好的错误处理
 """
 
+import io
+import os
+import re
 import time
+import itertools
+import multiprocessing
+from contextlib import closing
 from pathlib import Path
-from typing import List, Optional, Type, Callable
+from typing import List, Dict, Tuple, Optional, Callable, Iterator, Iterable, Mapping, Union, BinaryIO
 
-from .types import ScanResult, SecurityIssue, AnalysisMode
+from .types import ScanResult, SecurityIssue, AnalysisMode, FileResult, Severity
 from .analyzers.base import BaseAnalyzer
 from .analyzers.regex_analyzer import RegexAnalyzer
 from .analyzers.ast_analyzer import ASTAnalyzer
-from .rules import SCAN_EXTENSIONS, IGNORE_PATTERNS
-import re
-import fnmatch
+from .walker import FileWalker, FileEntry
+from .context import FileContext
+from .mapped import map_file
+from .streaming import text_windows
+from .cache import ResultCache, rules_fingerprint
+from .rule_packs import RulePack
+from .archive import ArchiveReader, ArchiveLimits, ArchiveError, MemberData, is_archive
+from .dedup import plan_dedup, duplicate_result
+from .rules import EXTENSION_PRIORITY, SCAN_EXTENSIONS
+
+
+# 工作进程内的扫描器实例（由 _init_worker 创建，规则在进程启动时编译一次）
+_worker_scanner: Optional['SkillScanner'] = None
+
+
+def _init_worker(mode: AnalysisMode, cache: Optional[ResultCache], rule_packs: List[RulePack]):
+    """进程池初始化：在工作进程中创建扫描器并预编译规则"""
+    global _worker_scanner
+    _worker_scanner = SkillScanner(mode, cache=cache, rule_packs=rule_packs)
+
+
+def _worker_analyze(entry: FileEntry) -> Optional[FileResult]:
+    """工作进程任务：分析单个文件"""
+    return _worker_scanner._analyze_file(entry)
+
+
+def _worker_analyze_tagged(task: Tuple[Tuple[int, int], FileEntry]) -> Tuple[Tuple[int, int], Optional[FileResult]]:
+    """工作进程任务：分析单个文件并带回 (skill 序号, 文件序号)（多 skill 批量扫描）"""
+    tag, entry = task
+    return tag, _worker_scanner._analyze_file(entry)
+
+
+def _round_robin(files: List[List[FileEntry]]) -> Iterator[Tuple[Tuple[int, int], FileEntry]]:
+    """轮流从每个 skill 取一个文件，大 skill 的文件与其他 skill 交错，不会占满队列"""
+    for file_index, row in enumerate(itertools.zip_longest(*files)):
+        for skill_index, entry in enumerate(row):
+            if entry is not None:
+                yield (skill_index, file_index), entry
+
+
+def discover_skills(parent: str, walker: Optional[FileWalker] = None) -> List[Path]:
+    """
+    注册表目录下的 skill：每个未被忽略的子目录和支持的压缩包（按名称排序）
+
+    Args:
+        parent: 包含多个 skill 的目录
+        walker: 提供忽略规则（默认规则）
+    """
+    walker = walker or FileWalker(SkillScanner.MAX_FILE_SIZE)
+    skills = []
+    with os.scandir(parent) as it:
+        for entry in it:
+            if walker.is_ignored(entry.path):
+                continue
+            if entry.is_dir() or (entry.is_file() and is_archive(Path(entry.path))):
+                skills.append(Path(entry.path))
+    return sorted(skills)
+
+
+def _has_high(result: FileResult) -> bool:
+    """文件结果中是否有 HIGH 级别发现"""
+    return any(f.level == Severity.HIGH for f in result.findings)
+
+
+# SKILL.md 中形如 scripts/run.py 的文件引用
+_FILE_REFERENCE = re.compile(r'[\w\-./]+\.[A-Za-z0-9]+')
+
+# scan_files 的输入：相对路径 -> 内容 的映射，或 (相对路径, 内容) 序列
+InMemoryFiles = Union[
+    Mapping[Union[str, Path], Union[bytes, str]],
+    Iterable[Tuple[Union[str, Path], Union[bytes, str]]]
+]
+
+# 内存扫描结果中的 skill_path
+IN_MEMORY_SKILL_PATH = '<memory>'
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """
+    解析并行任务数
+
+    Args:
+        jobs: 工作进程数，None 或 <= 0 表示自动（CPU 核数）
+
+    Returns:
+        实际使用的工作进程数（至少为 1）
+    """
+    if jobs is None or jobs <= 0:
+        # 优先使用当前进程可用的 CPU 集合（容器/taskset 限制）
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0)) or 1
+        return os.cpu_count() or 1
+    return jobs
 
 
 class SkillScanner:
@@ -22,22 +118,77 @@ class SkillScanner:
     # 最大文件大小：10MB（防止扫描超大文件导致内存问题）
     MAX_FILE_SIZE = 10 * 1024 * 1024
 
-    def __init__(self, mode: AnalysisMode = AnalysisMode.STANDARD):
+    # 并行阈值：每个工作进程至少分到这么多文件和字节才值得启动进程池，
+    # 小 skill 始终在进程内扫描
+    PARALLEL_MIN_FILES_PER_JOB = 8
+    PARALLEL_MIN_BYTES_PER_JOB = 512 * 1024
+
+    # 不小于该大小的纯 ASCII 文件映射到内存按字节扫描，不解码整个文件（见 mapped）
+    MMAP_MIN_SIZE = 1024 * 1024
+
+    # 流式扫描的文件大小上限：超过 MAX_FILE_SIZE 的文件按块扫描（见 streaming），超过该上限才跳过
+    MAX_STREAM_SIZE = 1024 * 1024 * 1024
+
+    def __init__(
+        self,
+        mode: AnalysisMode = AnalysisMode.STANDARD,
+        jobs: Optional[int] = 1,
+        cache: Optional[ResultCache] = None,
+        rule_packs: Optional[List[RulePack]] = None,
+        archive_limits: Optional[ArchiveLimits] = None,
+        dedup: bool = True,
+        follow_symlinks: bool = False,
+        max_stream_size: Optional[int] = None
+    ):
         """
         初始化扫描器
 
         Args:
             mode: 分析模式
+            jobs: 并行工作进程数，1 为串行，None 或 <= 0 为自动（CPU 核数）
+            cache: 结果缓存，None 表示不使用缓存
+            rule_packs: 额外加载的规则包（见 rule_packs.load_rule_pack）
+            archive_limits: 扫描压缩包时的安全限制（默认 ArchiveLimits()）
+            dedup: 同一次扫描中内容相同的文件只分析一次（见 dedup.plan_dedup）
+            follow_symlinks: 遍历时进入指向目录的符号链接（每个目录只进入一次，见 FileWalker）
+            max_stream_size: 超过 MAX_FILE_SIZE 的文件流式扫描的大小上限（默认 MAX_STREAM_SIZE，0 表示跳过这些文件）
         """
         self.mode = mode
+        self.jobs = resolve_jobs(jobs)
+        self.cache = cache
+        self.rule_packs = list(rule_packs or ())
+        self.archive_limits = archive_limits or ArchiveLimits()
+        self.dedup = dedup
         self.analyzers = self._init_analyzers()
+        self.walker = FileWalker(
+            self.MAX_FILE_SIZE,
+            follow_symlinks=follow_symlinks,
+            max_stream_size=self.MAX_STREAM_SIZE if max_stream_size is None else max_stream_size
+        )
+        self.fingerprint = rules_fingerprint(self.analyzers, self.rule_packs) if cache else None
+        self._pool = None
+        self._pool_size = 0
+
+    def __enter__(self) -> 'SkillScanner':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """关闭工作进程池"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._pool_size = 0
 
     def _init_analyzers(self) -> List[BaseAnalyzer]:
         """初始化分析器列表"""
         analyzers = []
 
         # 所有模式都包含正则分析
-        analyzers.append(RegexAnalyzer(self.mode))
+        analyzers.append(RegexAnalyzer(self.mode, self.rule_packs))
 
         # STANDARD 和 DEEP 模式包含 AST 分析
         if self.mode in [AnalysisMode.STANDARD, AnalysisMode.DEEP]:
@@ -45,74 +196,384 @@ class SkillScanner:
 
         return analyzers
 
-    def _should_ignore(self, path: Path) -> bool:
-        """检查是否应该忽略该路径 - 优化版使用 fnmatch"""
-        path_str = str(path)
-        path_parts = path_str.split('/')
-
-        for pattern in IGNORE_PATTERNS:
-            # 检查路径的任何部分是否匹配
-            for part in path_parts:
-                if fnmatch.fnmatch(part, pattern):
-                    return True
-            # 也检查完整路径
-            if re.search(pattern, path_str):
-                return True
-        return False
-
-    def _get_files_to_scan(self, skill_path: Path) -> List[Path]:
-        """获取要扫描的文件列表 - 优化版"""
-        files = []
-
-        # 递归遍历目录
-        try:
-            for item in skill_path.rglob('*'):
-                if not item.is_file():
-                    continue
+    def _get_files_to_scan(self, skill_path: Path) -> List[FileEntry]:
+        """获取要扫描的文件列表（已排序，附带文件大小）"""
+        return self.walker.walk(skill_path)
 
-                # 检查是否在忽略列表
-                if self._should_ignore(item):
-                    continue
+    def _prioritize(
+        self,
+        skill_path: Path,
+        files: List[FileEntry],
+        skill_md: Optional[str] = None
+    ) -> List[FileEntry]:
+        """
+        fail-fast 模式下的文件排序：最可能包含高风险代码的文件排在前面
+
+        SKILL.md 中引用的文件最先，其余按 EXTENSION_PRIORITY 排序，
+        同一优先级内保持原有顺序。
+
+        Args:
+            skill_path: 文件路径的根（内存中的文件为空路径）
+            files: 待扫描文件
+            skill_md: SKILL.md 内容，None 表示从 skill_path 读取
+        """
+        referenced_paths = set()
+        referenced_names = set()
+        if skill_md is None:
+            try:
+                skill_md = (skill_path / 'SKILL.md').read_text(encoding='utf-8', errors='ignore')
+            except (OSError, IOError):
+                skill_md = ''
+        for ref in _FILE_REFERENCE.findall(skill_md):
+            if os.path.splitext(ref)[1] not in SCAN_EXTENSIONS:
+                continue
+            if '/' in ref:
+                referenced_paths.add(os.path.normpath(os.path.join(str(skill_path), ref)))
+            else:
+                referenced_names.add(ref)
+
+        def priority(entry: FileEntry) -> int:
+            if entry.path.name in referenced_names or str(entry.path) in referenced_paths:
+                return 0
+            return EXTENSION_PRIORITY.get(entry.path.suffix, len(EXTENSION_PRIORITY))
+
+        return sorted(files, key=priority)
+
+    def _plan_workers(self, entries: List[FileEntry]) -> int:
+        """根据文件数和总字节数决定工作进程数，返回 1 表示在进程内扫描"""
+        if self.jobs <= 1:
+            return 1
+        total_bytes = sum(entry.size for entry in entries)
+        return max(1, min(
+            self.jobs,
+            len(entries) // self.PARALLEL_MIN_FILES_PER_JOB,
+            total_bytes // self.PARALLEL_MIN_BYTES_PER_JOB
+        ))
+
+    def _get_pool(self, workers: int):
+        """获取（必要时创建）工作进程池，已有进程池会被复用"""
+        if self._pool is not None and self._pool_size < workers:
+            self.close()
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                processes=workers,
+                initializer=_init_worker,
+                initargs=(self.mode, self.cache, self.rule_packs)
+            )
+            self._pool_size = workers
+        return self._pool
 
-                # 检查文件大小
+    def _analyze_file(self, entry: FileEntry, data: Optional[MemberData] = None) -> Optional[FileResult]:
+        """
+        读取并分析单个文件
+
+        Args:
+            entry: 待扫描文件
+            data: 已读取的文件内容（内存中的文件、压缩包成员）或压缩包成员的流，None 表示从磁盘读取
+
+        Returns:
+            文件扫描结果；文件无法读取时返回 None
+        """
+        file_path = entry.path
+        mapped = None
+        if isinstance(data, bytes):
+            if len(data) > self.MAX_FILE_SIZE:
+                return self._analyze_streamed(entry, io.BytesIO(data))
+        elif data is not None:
+            return self._analyze_streamed(entry, data)
+        else:
+            if entry.size > self.MAX_FILE_SIZE:
+                return self._analyze_streamed(entry)
+            if entry.size >= self.MMAP_MIN_SIZE:
+                mapped = map_file(file_path)
+            if mapped is None:
                 try:
-                    if item.stat().st_size > self.MAX_FILE_SIZE:
-                        continue
+                    # 文件大小已在遍历时检查
+                    data = file_path.read_bytes()
                 except (OSError, IOError):
-                    continue
-
-                # 检查扩展名
-                if item.suffix in SCAN_EXTENSIONS:
-                    files.append(item)
-        except (PermissionError, OSError):
-            # 目录无法访问，返回空列表
-            pass
+                    return None
+                except Exception:
+                    return None
 
-        # 确保包含 SKILL.md
-        skill_md = skill_path / 'SKILL.md'
-        if skill_md.exists() and skill_md not in files:
+        if mapped is None:
+            return self._analyze_context(FileContext(file_path, data))
+        try:
+            return self._analyze_context(FileContext(file_path, mapped, binary=True))
+        finally:
             try:
-                if skill_md.stat().st_size <= self.MAX_FILE_SIZE:
-                    files.append(skill_md)
-            except (OSError, IOError):
+                mapped.close()
+            except BufferError:
+                # 仍有对象引用映射的缓冲区：交给垃圾回收关闭
                 pass
 
-        return sorted(set(files))  # 去重并排序
+    def _analyze_streamed(self, entry: FileEntry, source: Optional[BinaryIO] = None) -> Optional[FileResult]:
+        """
+        按块流式分析超过 MAX_FILE_SIZE 的文件（内存占用与文件大小无关）
+
+        source 为文件内容的流（压缩包成员、内存中的文件），None 表示从磁盘读取；
+        流的读取错误（如 ArchiveError）原样抛出
+
+        只运行正则规则（发现与整个文件扫描相同，见 RegexAnalyzer.analyze_window）。
+        结果不写入缓存（缓存键需要整个文件的哈希）
+
+        Returns:
+            文件扫描结果；文件无法读取时返回 None
+        """
+        regex = next((analyzer for analyzer in self.analyzers if isinstance(analyzer, RegexAnalyzer)), None)
+        findings: List[SecurityIssue] = []
+        next_allowed = [0] * len(regex.plan.rules) if regex is not None else []
+        try:
+            for window in text_windows(entry.path if source is None else source):
+                if regex is not None:
+                    ctx = FileContext(entry.path, text=window.text)
+                    findings.extend(regex.analyze_window(ctx, window, next_allowed))
+        except (OSError, IOError):
+            return None
+        return FileResult(str(entry.path), findings, stats={'streamed': 1}, streamed=True)
+
+    def _analyze_context(self, ctx: FileContext) -> FileResult:
+        """运行所有分析器（解码文本、行索引、语法树等由各分析器共享，每个文件只计算一次）"""
+        file_path = ctx.path
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResultCache.make_key(ctx.sha256, file_path.suffix, self.mode, self.fingerprint)
+            cached = self.cache.get(cache_key, file_path.name)
+            if cached is not None:
+                return FileResult(str(file_path), cached, cached=True)
+
+        file_findings = []
+
+        # 使用所有分析器
+        for analyzer in self.analyzers:
+            try:
+                findings = analyzer.analyze_context(ctx)
+                file_findings.extend(findings)
+            except Exception:
+                # 分析器出错，继续下一个
+                continue
+
+        if cache_key is not None:
+            self.cache.put(cache_key, file_findings)
+
+        return FileResult(str(file_path), file_findings, stats=ctx.stats)
+
+    def _analyze_stream(
+        self,
+        files: List[FileEntry],
+        fail_fast: bool = False
+    ) -> Iterator[Optional[FileResult]]:
+        """
+        逐个产出文件的分析结果（无法读取的文件为 None），文件较多时分发到进程池并行分析
+
+        普通模式按 files 的顺序产出；fail-fast 模式按完成顺序产出。
+        调用方提前结束迭代时终止仍在运行的工作进程。
+        """
+        workers = self._plan_workers(files)
+        if workers <= 1:
+            for entry in files:
+                yield self._analyze_file(entry)
+            return
+
+        pool = self._get_pool(workers)
+        if fail_fast:
+            # 逐个分发并按完成顺序返回，尽早发现 HIGH
+            results = pool.imap_unordered(_worker_analyze, files, 1)
+        else:
+            chunksize = max(1, min(64, len(files) // (workers * 4)))
+            # imap 保持输入顺序，输出与串行扫描一致
+            results = pool.imap(_worker_analyze, files, chunksize)
+
+        finished = False
+        try:
+            yield from results
+            finished = True
+        finally:
+            if not finished:
+                # 提前结束（fail-fast 或调用方中止迭代）：终止剩余任务和运行中的工作进程
+                self.close()
+
+    def _scan_entries(
+        self,
+        files: List[FileEntry],
+        fail_fast: bool = False
+    ) -> Iterator[FileResult]:
+        """
+        逐个产出文件结果；内容相同的文件只分析代表文件，其余文件复制其结果（见 dedup）
+
+        普通模式按 files 的顺序产出；fail-fast 模式按完成顺序产出，
+        产出第一个含 HIGH 的结果后停止，并终止仍在运行的工作进程。
+        """
+        representatives = plan_dedup(files) if self.dedup else list(range(len(files)))
+        unique_indices = [index for index, rep in enumerate(representatives) if rep == index]
+        duplicates: Dict[int, List[int]] = {}
+        for index, rep in enumerate(representatives):
+            if rep != index:
+                duplicates.setdefault(rep, []).append(index)
+
+        stream = self._analyze_stream([files[index] for index in unique_indices], fail_fast)
+        with closing(stream):
+            if fail_fast:
+                positions = {str(files[index].path): index for index in unique_indices}
+                for result in stream:
+                    if result is None:
+                        continue
+                    yield result
+                    if _has_high(result):
+                        return
+                    for index in duplicates.get(positions[result.file], ()):
+                        yield duplicate_result(result, files[index])
+                return
+
+            # 代表文件的结果保留到其最后一个重复文件产出为止
+            done: Dict[int, Optional[FileResult]] = {}
+            pending = {rep: len(indices) for rep, indices in duplicates.items()}
+            next_index = 0
+            for rep, result in zip(unique_indices, stream):
+                done[rep] = result
+                while next_index < len(files) and representatives[next_index] in done:
+                    rep = representatives[next_index]
+                    rep_result = done[rep]
+                    if rep == next_index:
+                        if rep_result is not None:
+                            yield rep_result
+                    else:
+                        pending[rep] -= 1
+                        if rep_result is not None:
+                            yield duplicate_result(rep_result, files[next_index])
+                    if not pending.get(rep):
+                        del done[rep]
+                    next_index += 1
+
+    def _scan_data(
+        self,
+        items: Iterable[Tuple[FileEntry, MemberData]],
+        fail_fast: bool = False
+    ) -> Iterator[FileResult]:
+        """
+        逐个产出已读入内存的文件的结果（在进程内分析，不经过磁盘）
+
+        文件按 items 的顺序扫描，产出第一个含 HIGH 的结果后停止（fail-fast）
+        """
+        for entry, data in items:
+            result = self._analyze_file(entry, data)
+            if result is None:
+                continue
+            yield result
+            if fail_fast and _has_high(result):
+                return
+
+    def analyze_entries(self, files: List[FileEntry]) -> Iterator[FileResult]:
+        """
+        分析指定的文件（不做遍历和过滤，按 files 的顺序产出；文件较多时并行）
+
+        用于监视模式等只需要重新分析部分文件的场景，无法读取的文件不产出结果
+        """
+        return self._scan_entries(files)
+
+    def _scan_archive(self, archive_path: Path, fail_fast: bool = False) -> Iterator[FileResult]:
+        """
+        逐个产出压缩包成员的结果（边解压边分析，不写入磁盘）
+
+        成员按压缩包中的顺序扫描，fail-fast 模式不做优先级排序
+        """
+        reader = ArchiveReader(archive_path, self.walker, self.archive_limits)
+        return self._scan_data(reader.entries(), fail_fast)
+
+    def _memory_entries(self, files: InMemoryFiles, fail_fast: bool) -> List[Tuple[FileEntry, bytes]]:
+        """
+        过滤并排序内存中的文件（与目录遍历的过滤规则和顺序相同）
+
+        Raises:
+            ValueError: 路径为绝对路径或指向 skill 之外（..）
+        """
+        items = files.items() if isinstance(files, Mapping) else files
+        selected: Dict[Path, bytes] = {}
+        for name, data in items:
+            raw_name = str(name).replace('\\', '/')
+            path = os.path.normpath(raw_name).replace(os.sep, '/')
+            if raw_name.startswith('/') or path == '.' or path == '..' or path.startswith('../'):
+                raise ValueError(f"In-memory file path must be relative to the skill: {name!r}")
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            # SKILL.md 与目录遍历一样总是扫描（只受大小限制）
+            if path == 'SKILL.md':
+                if len(data) > self.walker.size_limit:
+                    continue
+            elif not self.walker.accepts(path, len(data)):
+                continue
+            # 同一路径出现多次时以最后一次为准
+            selected[Path(path)] = data
+
+        entries = sorted(selected)
+        ordered = [FileEntry(path, len(selected[path])) for path in entries]
+        if fail_fast:
+            skill_md = selected.get(Path('SKILL.md'))
+            ordered = self._prioritize(
+                Path(''), ordered, skill_md.decode('utf-8', errors='ignore') if skill_md else ''
+            )
+        return [(entry, selected[entry.path]) for entry in ordered]
+
+    def _results(self, skill_path: Path, fail_fast: bool) -> Tuple[Iterator[FileResult], Optional[int]]:
+        """
+        skill 目录或压缩包的结果流
+
+        Returns:
+            (结果迭代器, 待扫描文件数)；文件数未知（tar 流）时为 None
+        """
+        if skill_path.is_file() and is_archive(skill_path):
+            reader = ArchiveReader(skill_path, self.walker, self.archive_limits)
+            return self._scan_archive(skill_path, fail_fast), reader.count()
+        files = self._get_files_to_scan(skill_path)
+        total_files = len(files)
+        if fail_fast:
+            files = self._prioritize(skill_path, files)
+        return self._scan_entries(files, fail_fast), total_files
+
+    def scan_iter(self, skill_path: str, fail_fast: bool = False) -> Iterator[FileResult]:
+        """
+        流式扫描 skill：每个文件分析完成后立即产出其结果
+
+        与 scan() 的文件顺序和发现完全一致，但不在内存中累积全部发现，
+        调用方可以在整个目录扫描结束前处理已完成文件的结果。
+
+        Args:
+            skill_path: skill 目录或压缩包（.zip / .whl / .tar.gz 等）路径
+            fail_fast: 发现第一个 HIGH 后停止（文件按风险优先级排序）
+
+        Yields:
+            每个成功读取的文件的扫描结果（压缩包成员的路径为包内相对路径）
+
+        Raises:
+            ArchiveError: 压缩包无法读取或超出安全限制（ArchiveLimitError）
+        """
+        skill_path = Path(skill_path)
+        if not skill_path.exists():
+            return
+        results, _ = self._results(skill_path, fail_fast)
+        yield from results
 
     def scan(
         self,
         skill_path: str,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        fail_fast: bool = False
     ) -> ScanResult:
         """
         扫描 skill - 优化版
 
         Args:
-            skill_path: skill 目录路径
-            progress_callback: 进度回调函数 (filename, current, total, findings)
+            skill_path: skill 目录或压缩包（.zip / .whl / .tar.gz 等）路径
+            progress_callback: 进度回调函数 (filename, current, total, findings)，
+                文件总数未知（tar 流）时 total 为 0
+            fail_fast: 发现第一个 HIGH 后立即停止扫描（用于准入检查，
+                只关心是否存在 HIGH）。文件按风险优先级排序，结果只包含已扫描的文件
 
         Returns:
             扫描结果
+
+        Raises:
+            ArchiveError: 压缩包无法读取或超出安全限制（ArchiveLimitError）
         """
         start_time = time.time()
         skill_path = Path(skill_path)
@@ -126,49 +587,221 @@ class SkillScanner:
                 timestamp=""
             )
 
-        # 获取文件列表
-        files = self._get_files_to_scan(skill_path)
-        total_files = len(files)
+        # 获取文件列表（压缩包为成员流）
+        results, total_files = self._results(skill_path, fail_fast)
+        return self._collect(str(skill_path), results, total_files or 0, start_time, progress_callback, fail_fast)
 
-        all_findings: List[SecurityIssue] = []
-        files_scanned = 0
+    def scan_files_iter(self, files: InMemoryFiles, fail_fast: bool = False) -> Iterator[FileResult]:
+        """
+        流式扫描内存中的文件（scan_files 的流式版本）
 
-        # 扫描每个文件
-        for file_path in files:
-            try:
-                # 读取文件内容（带大小限制检查）
-                try:
-                    file_size = file_path.stat().st_size
-                    if file_size > self.MAX_FILE_SIZE:
-                        continue
-                except (OSError, IOError):
-                    continue
+        Args:
+            files: 相对路径 -> 内容（bytes 或 str）的映射，或 (相对路径, 内容) 序列
+            fail_fast: 发现第一个 HIGH 后停止（文件按风险优先级排序）
 
-                content = file_path.read_text(encoding='utf-8', errors='ignore')
-            except (OSError, IOError, UnicodeDecodeError):
-                continue
-            except Exception:
-                continue
+        Yields:
+            每个通过过滤的文件的扫描结果（路径为传入的相对路径）
 
-            file_findings = []
+        Raises:
+            ValueError: 路径为绝对路径或指向 skill 之外
+        """
+        yield from self._scan_data(self._memory_entries(files, fail_fast), fail_fast)
 
-            # 使用所有分析器
-            for analyzer in self.analyzers:
-                try:
-                    findings = analyzer.analyze(file_path, content)
-                    file_findings.extend(findings)
-                except Exception:
-                    # 分析器出错，继续下一个
-                    continue
+    def scan_files(
+        self,
+        files: InMemoryFiles,
+        progress_callback: Optional[Callable] = None,
+        fail_fast: bool = False,
+        skill_path: str = IN_MEMORY_SKILL_PATH
+    ) -> ScanResult:
+        """
+        扫描内存中的 skill 文件，不读写磁盘（如 Web 服务收到的上传内容）
+
+        过滤规则（扩展名、忽略规则、大小上限）、分析器和结果缓存与 scan 相同，
+        文件在进程内按路径顺序分析。
+
+        Args:
+            files: 相对路径 -> 内容（bytes 或 str）的映射，或 (相对路径, 内容) 序列；
+                同一路径出现多次时以最后一次为准
+            progress_callback: 进度回调函数 (filename, current, total, findings)
+            fail_fast: 发现第一个 HIGH 后立即停止扫描
+            skill_path: 写入 ScanResult.skill_path 的名称
+
+        Returns:
+            扫描结果
+
+        Raises:
+            ValueError: 路径为绝对路径或指向 skill 之外
+        """
+        start_time = time.time()
+        entries = self._memory_entries(files, fail_fast)
+        return self._collect(
+            skill_path, self._scan_data(entries, fail_fast), len(entries),
+            start_time, progress_callback, fail_fast
+        )
+
+    def scan_archive(
+        self,
+        name: str,
+        data: bytes,
+        progress_callback: Optional[Callable] = None,
+        fail_fast: bool = False
+    ) -> ScanResult:
+        """
+        扫描已在内存中的压缩包（如上传的 skill 包），不写入磁盘
+
+        Args:
+            name: 压缩包文件名（按扩展名识别格式，同时作为 ScanResult.skill_path）
+            data: 压缩包内容
+            progress_callback: 进度回调函数 (filename, current, total, findings)
+            fail_fast: 发现第一个 HIGH 后立即停止扫描
+
+        Returns:
+            扫描结果
 
-            all_findings.extend(file_findings)
+        Raises:
+            ArchiveError: 不是支持的压缩包格式、无法读取或超出安全限制
+        """
+        start_time = time.time()
+        if not is_archive(Path(name)):
+            raise ArchiveError(f"{name}: unsupported archive type")
+        reader = ArchiveReader(Path(name), self.walker, self.archive_limits, data)
+        return self._collect(
+            name, self._scan_data(reader.entries(), fail_fast), reader.count() or 0,
+            start_time, progress_callback, fail_fast
+        )
+
+    def scan_many(self, skill_paths: Iterable[str]) -> Iterator[ScanResult]:
+        """
+        批量扫描多个 skill：所有 skill 的文件共用一个进程池，每个 skill 完成后立即产出其结果
+
+        文件按 skill 轮流调度（每轮每个 skill 一个文件），文件很多的 skill 不会让其他 skill 等待；
+        产出顺序为完成顺序，每个结果中的发现仍按该 skill 内的文件顺序排列。
+        不同 skill 中内容相同的文件（复制的辅助库、模板 SKILL.md）只分析一次。
+        压缩包在所有目录扫描完成后在进程内依次扫描。
+
+        Args:
+            skill_paths: skill 目录或压缩包路径（见 discover_skills）
+
+        Yields:
+            每个 skill 的扫描结果（scan_time 为从批量扫描开始到该 skill 完成的时间）；
+            压缩包无法读取或超出安全限制、路径既不是目录也不是支持的压缩包时，
+            产出设置了 error 的结果，其余 skill 继续扫描
+        """
+        start_time = time.time()
+        skills = [Path(path) for path in skill_paths]
+        directories = [path for path in skills if path.is_dir()]
+        archives = [path for path in skills if path.is_file() and is_archive(path)]
+
+        # 不存在的路径与 scan() 一样返回空结果
+        for path in skills:
+            if not path.exists():
+                yield ScanResult(skill_path=str(path), files_scanned=0, findings=[], scan_time=0, timestamp="")
+            elif not path.is_dir() and not (path.is_file() and is_archive(path)):
+                yield ScanResult(
+                    skill_path=str(path), files_scanned=0, findings=[], scan_time=0, timestamp="",
+                    error="not a skill directory or supported archive"
+                )
+
+        files = [self._get_files_to_scan(path) for path in directories]
+        slots: List[List[Optional[FileResult]]] = [[None] * len(entries) for entries in files]
+        remaining = [len(entries) for entries in files]
+
+        def finish(skill_index: int) -> ScanResult:
+            results = (result for result in slots[skill_index] if result is not None)
+            slots[skill_index] = []
+            return self._collect(
+                str(directories[skill_index]), results, len(files[skill_index]), start_time, None, False
+            )
+
+        for skill_index, count in enumerate(remaining):
+            if count == 0:
+                yield finish(skill_index)
+
+        # 跨 skill 去重：只分发代表文件，其结果同时填入所有内容相同的文件
+        tags = [(skill_index, file_index) for skill_index, entries in enumerate(files) for file_index in range(len(entries))]
+        all_entries = [entry for entries in files for entry in entries]
+        representatives = plan_dedup(all_entries) if self.dedup else list(range(len(all_entries)))
+        flat_index = {tag: index for index, tag in enumerate(tags)}
+        duplicates: Dict[Tuple[int, int], List[int]] = {}
+        for index, rep in enumerate(representatives):
+            if rep != index:
+                duplicates.setdefault(tags[rep], []).append(index)
+        tasks = [
+            (tag, entry) for tag, entry in _round_robin(files)
+            if representatives[flat_index[tag]] == flat_index[tag]
+        ]
+
+        workers = self._plan_workers([entry for _, entry in tasks])
+        if workers <= 1:
+            results = ((tag, self._analyze_file(entry)) for tag, entry in tasks)
+        else:
+            # 小块分发：块越大，同一块内的文件越集中在少数 skill 上
+            chunksize = max(1, min(16, len(tasks) // (workers * 8)))
+            results = self._get_pool(workers).imap_unordered(_worker_analyze_tagged, tasks, chunksize)
+
+        for tag, result in results:
+            finished = []
+            for index in [flat_index[tag]] + duplicates.get(tag, []):
+                skill_index, file_index = tags[index]
+                if result is not None:
+                    slots[skill_index][file_index] = (
+                        result if index == flat_index[tag] else duplicate_result(result, all_entries[index])
+                    )
+                remaining[skill_index] -= 1
+                if remaining[skill_index] == 0:
+                    finished.append(skill_index)
+            for skill_index in finished:
+                yield finish(skill_index)
+
+        for path in archives:
+            try:
+                archive_results, total_files = self._results(path, False)
+                yield self._collect(str(path), archive_results, total_files or 0, start_time, None, False)
+            except ArchiveError as e:
+                # 损坏或超出限制的压缩包不中断整个批量扫描
+                yield ScanResult(
+                    skill_path=str(path), files_scanned=0, findings=[],
+                    scan_time=time.time() - start_time, error=str(e)
+                )
+
+    def _collect(
+        self,
+        skill_path: str,
+        results: Iterable[FileResult],
+        total_files: int,
+        start_time: float,
+        progress_callback: Optional[Callable],
+        fail_fast: bool
+    ) -> ScanResult:
+        """汇总文件结果为 ScanResult（同时回调进度）"""
+        all_findings: List[SecurityIssue] = []
+        files_scanned = 0
+        cache_hits = 0
+        cache_misses = 0
+        stopped_early = False
+        stats: Dict[str, int] = {}
+        streamed_files: List[str] = []
+
+        # 扫描每个文件
+        for file_result in results:
+            all_findings.extend(file_result.findings)
             files_scanned += 1
+            if file_result.streamed:
+                streamed_files.append(file_result.file)
+            for name, value in file_result.stats.items():
+                stats[name] = stats.get(name, 0) + value
+            if self.cache is not None and file_result.duplicate_of is None and not file_result.streamed:
+                if file_result.cached:
+                    cache_hits += 1
+                else:
+                    cache_misses += 1
 
             # 回调进度
             if progress_callback:
                 try:
                     progress_callback(
-                        file_path.name,
+                        Path(file_result.file).name,
                         files_scanned,
                         total_files,
                         len(all_findings)
@@ -177,11 +810,19 @@ class SkillScanner:
                     # 回调出错，忽略
                     pass
 
+            if fail_fast and _has_high(file_result):
+                stopped_early = True
+
         scan_time = time.time() - start_time
 
         return ScanResult(
-            skill_path=str(skill_path),
+            skill_path=skill_path,
             files_scanned=files_scanned,
             findings=all_findings,
-            scan_time=scan_time
+            scan_time=scan_time,
+            cache_hits=cache_hits,
+            cache_misses=cache_misses,
+            stopped_early=stopped_early,
+            stats=stats,
+            streamed_files=streamed_files
         )
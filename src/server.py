@@ -0,0 +1,506 @@
+"""
+扫描服务 - 常驻进程，通过本地 HTTP（localhost）或 Unix socket 接受扫描请求
+规则、进程池和结果缓存在服务进程中只初始化一次，每次请求不再支付解释器启动、
+模块导入和规则编译的开销；并发扫描数和排队请求数都有上限，队列满时立即返回 503
+
+接口（JSON）：
+    GET  /health                          服务状态和队列计数
+    POST /scan                            请求体 {"path": ..., "mode": ..., "fail_fast": ...}
+    POST /scan?archive=NAME[&mode=..&fail_fast=1]
+                                          请求体为压缩包内容（zip / wheel / tar.gz 等）
+扫描成功返回 ScanResult.to_dict()，失败返回 {"error": ...}
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import http.client
+import socketserver
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit, parse_qs, quote
+
+from .types import AnalysisMode, ScanResult
+from .scanner import SkillScanner
+from .cache import ResultCache
+from .rule_packs import RulePack
+from .archive import ArchiveLimits, ArchiveError
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 服务地址：Unix socket 路径或 (host, port)
+Address = Union[str, Tuple[str, int]]
+
+
+class ServerBusyError(RuntimeError):
+    """扫描队列已满（HTTP 503），稍后重试"""
+
+
+class ScanRequestError(ValueError):
+    """扫描请求无效或扫描失败（附带 HTTP 状态码）"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_address(value: str) -> Address:
+    """
+    解析服务地址
+
+    unix:/path 或包含 / 的路径为 Unix socket；host:port、:port 或 http://host:port 为 TCP
+
+    Raises:
+        ValueError: 地址格式错误
+    """
+    if value.startswith('unix:'):
+        return value[len('unix:'):]
+    if value.startswith('http://'):
+        value = value[len('http://'):].rstrip('/')
+    if '/' in value:
+        return value
+    host, sep, port = value.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"invalid server address: {value!r} (expected HOST:PORT or unix:PATH)")
+    return (host or DEFAULT_HOST, int(port))
+
+
+def format_address(address: Address) -> str:
+    """服务地址的显示形式（可再次被 parse_address 解析）"""
+    if isinstance(address, str):
+        return f'unix:{address}'
+    return f'{address[0]}:{address[1]}'
+
+
+class ScanService:
+    """
+    常驻扫描服务：预热的扫描器 + 有界并发 + 有界排队
+
+    每个扫描线程为每种分析模式持有自己的 SkillScanner（以及自己的 SQLite 缓存连接），
+    编译好的规则计划在进程内共享。并发扫描数为 max_concurrent，
+    另外最多 queue_size 个请求排队等待，超出时 submit 立即抛出 ServerBusyError。
+    """
+
+    def __init__(
+        self,
+        mode: AnalysisMode = AnalysisMode.STANDARD,
+        jobs: Optional[int] = 1,
+        cache: Optional[ResultCache] = None,
+        rule_packs: Optional[List[RulePack]] = None,
+        archive_limits: Optional[ArchiveLimits] = None,
+        dedup: bool = True,
+        follow_symlinks: bool = False,
+        max_stream_size: Optional[int] = None,
+        max_concurrent: int = 2,
+        queue_size: int = 16,
+        max_upload: int = 64 * 1024 * 1024,
+        allowed_roots: Sequence[Path] = ()
+    ):
+        """
+        Args:
+            mode: 请求未指定模式时使用的分析模式
+            jobs: 每个扫描的工作进程数（同 SkillScanner）
+            cache: 结果缓存（每个扫描线程打开自己的连接）
+            rule_packs: 额外加载的规则包
+            archive_limits: 压缩包安全限制
+            dedup: 同一次扫描中内容相同的文件只分析一次（同 SkillScanner）
+            follow_symlinks: 进入指向目录的符号链接（同 SkillScanner）
+            max_stream_size: 流式扫描的文件大小上限（同 SkillScanner）
+            max_concurrent: 同时执行的扫描数
+            queue_size: 等待执行的最大请求数
+            max_upload: 上传压缩包的最大字节数
+            allowed_roots: 允许扫描的目录（为空时不限制）
+        """
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be >= 1")
+        if queue_size < 0:
+            raise ValueError("queue_size must be >= 0")
+        self.mode = mode
+        self.jobs = jobs
+        self.cache = cache
+        self.rule_packs = list(rule_packs or ())
+        self.archive_limits = archive_limits or ArchiveLimits()
+        self.dedup = dedup
+        self.follow_symlinks = follow_symlinks
+        self.max_stream_size = max_stream_size
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.max_upload = max_upload
+        self.allowed_roots = [Path(root).resolve() for root in allowed_roots]
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='trustskill-scan')
+        # 执行中 + 排队中的请求总数上限
+        self._slots = threading.BoundedSemaphore(max_concurrent + queue_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._scanners: List[SkillScanner] = []
+        self.started = time.time()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+        # 预热：在启动时编译所有模式的规则计划（进程内缓存，扫描线程直接复用）
+        for analysis_mode in AnalysisMode:
+            SkillScanner(analysis_mode, rule_packs=self.rule_packs)
+
+    def _scanner(self, mode: AnalysisMode) -> SkillScanner:
+        """当前扫描线程的扫描器（按模式懒创建，之后一直复用）"""
+        scanners = getattr(self._local, 'scanners', None)
+        if scanners is None:
+            scanners = self._local.scanners = {}
+        scanner = scanners.get(mode)
+        if scanner is None:
+            # SQLite 连接不能跨线程使用，每个线程打开同一个缓存文件
+            cache = ResultCache(self.cache.path, self.cache.max_bytes) if self.cache is not None else None
+            scanner = SkillScanner(
+                mode, jobs=self.jobs, cache=cache,
+                rule_packs=self.rule_packs, archive_limits=self.archive_limits, dedup=self.dedup,
+                follow_symlinks=self.follow_symlinks, max_stream_size=self.max_stream_size
+            )
+            scanners[mode] = scanner
+            with self._lock:
+                self._scanners.append(scanner)
+        return scanner
+
+    @contextmanager
+    def admission(self) -> Iterator[None]:
+        """
+        占用一个执行 / 排队名额，直到退出
+
+        HTTP 处理线程在读取请求体之前先占用名额，队列满时不再读取上传内容；
+        同一线程中嵌套的 admission（如其中调用的 submit）不重复占用
+
+        Raises:
+            ServerBusyError: 执行和排队的请求都已满
+        """
+        if getattr(self._local, 'admitted', False):
+            yield
+            return
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ServerBusyError(
+                f"scan queue is full ({self.max_concurrent} running, {self.queue_size} queued)"
+            )
+        self._local.admitted = True
+        try:
+            yield
+        finally:
+            self._local.admitted = False
+            self._slots.release()
+
+    def submit(self, task: Callable[[], ScanResult]) -> ScanResult:
+        """
+        在扫描线程中执行任务并等待结果
+
+        Raises:
+            ServerBusyError: 执行和排队的请求都已满
+        """
+        with self.admission():
+            with self._lock:
+                self.queued += 1
+            return self._executor.submit(self._run, task).result()
+
+    def _run(self, task: Callable[[], ScanResult]) -> ScanResult:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return task()
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def _check_path(self, path: str) -> Path:
+        """
+        检查请求中的路径：必须是已存在的绝对路径，且位于允许的目录内
+
+        Returns:
+            解析符号链接后的路径（扫描使用检查过的路径，检查之后替换的符号链接不影响扫描）
+        """
+        skill_path = Path(path)
+        if not skill_path.is_absolute():
+            raise ScanRequestError(400, f"path must be absolute: {path!r}")
+        resolved = skill_path.resolve()
+        if self.allowed_roots and not any(
+            resolved == root or root in resolved.parents for root in self.allowed_roots
+        ):
+            raise ScanRequestError(403, f"path is outside the allowed roots: {path!r}")
+        if not resolved.exists():
+            raise ScanRequestError(404, f"path does not exist: {path!r}")
+        return resolved
+
+    def scan_path(self, path: str, mode: Optional[AnalysisMode] = None, fail_fast: bool = False) -> ScanResult:
+        """扫描服务所在机器上的 skill 目录或压缩包"""
+        skill_path = self._check_path(path)
+        mode = mode or self.mode
+        return self.submit(lambda: self._scanner(mode).scan(str(skill_path), fail_fast=fail_fast))
+
+    def scan_upload(
+        self,
+        name: str,
+        data: bytes,
+        mode: Optional[AnalysisMode] = None,
+        fail_fast: bool = False
+    ) -> ScanResult:
+        """扫描上传的压缩包（在内存中读取，不写入磁盘）"""
+        if len(data) > self.max_upload:
+            raise ScanRequestError(413, f"upload exceeds {self.max_upload} bytes")
+        mode = mode or self.mode
+        return self.submit(lambda: self._scanner(mode).scan_archive(name, data, fail_fast=fail_fast))
+
+    def status(self) -> Dict[str, Any]:
+        """服务状态（/health）"""
+        with self._lock:
+            return {
+                "status": "ok",
+                "mode": self.mode.value,
+                "uptime": time.time() - self.started,
+                "max_concurrent": self.max_concurrent,
+                "queue_size": self.queue_size,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def close(self):
+        """停止接受任务，等待运行中的扫描结束并关闭工作进程池"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            scanners, self._scanners = self._scanners, []
+        for scanner in scanners:
+            scanner.close()
+
+
+def _parse_mode(value: Optional[str]) -> Optional[AnalysisMode]:
+    if value is None:
+        return None
+    try:
+        return AnalysisMode(value)
+    except ValueError:
+        raise ScanRequestError(400, f"invalid mode: {value!r}")
+
+
+def _parse_flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+class _ScanRequestHandler(BaseHTTPRequestHandler):
+    """HTTP 请求处理（每个连接一个线程，扫描本身在 ScanService 的线程池中执行）"""
+
+    server_version = 'TrustSkill/2.0'
+
+    def log_message(self, format: str, *args):
+        # Unix socket 的 client_address 不是 (host, port)，不使用默认的 address_string
+        if self.server.verbose:
+            sys.stderr.write(f"[{self.log_date_time_string()}] {format % args}\n")
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/health':
+            self._send(200, self.server.service.status())
+        else:
+            self._send(404, {"error": f"not found: {self.path}"})
+
+    def do_POST(self):
+        service: ScanService = self.server.service
+        url = urlsplit(self.path)
+        if url.path != '/scan':
+            self._send(404, {"error": f"not found: {self.path}"})
+            return
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > service.max_upload:
+                raise ScanRequestError(413, f"request body exceeds {service.max_upload} bytes")
+            # 先占用队列名额再读取请求体：队列满时不读取上传内容直接返回 503，
+            # 等待中的请求体占用的内存不超过 (max_concurrent + queue_size) * max_upload
+            with service.admission():
+                result = self._scan(service, query, self.rfile.read(length))
+        except ScanRequestError as e:
+            self._send(e.status, {"error": str(e)})
+        except ServerBusyError as e:
+            self._send(503, {"error": str(e)}, {'Retry-After': '1', 'Connection': 'close'})
+            self.close_connection = True
+        except ArchiveError as e:
+            self._send(422, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, result.to_dict())
+
+    @staticmethod
+    def _scan(service: 'ScanService', query: Dict[str, str], body: bytes) -> ScanResult:
+        """按请求执行扫描（调用方已占用队列名额）"""
+        if 'archive' in query:
+            return service.scan_upload(
+                query['archive'], body, _parse_mode(query.get('mode')), _parse_flag(query.get('fail_fast'))
+            )
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise ScanRequestError(400, "request body is not valid JSON")
+        if not isinstance(request, dict) or not isinstance(request.get('path'), str):
+            raise ScanRequestError(400, 'request must be a JSON object with a "path" string')
+        return service.scan_path(
+            request['path'], _parse_mode(request.get('mode')), _parse_flag(request.get('fail_fast'))
+        )
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """基于 Unix socket 的 HTTP 服务"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        # 删除上次未正常退出留下的 socket 文件
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        # 只允许当前用户连接
+        os.chmod(self.server_address, 0o600)
+
+
+def make_server(service: ScanService, address: Address, verbose: bool = False) -> socketserver.BaseServer:
+    """创建（已绑定地址的）扫描服务器，调用 serve_forever() 开始处理请求"""
+    if isinstance(address, str):
+        server = _UnixHTTPServer(address, _ScanRequestHandler)
+    else:
+        server = ThreadingHTTPServer(address, _ScanRequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def serve(service: ScanService, address: Address, verbose: bool = False):
+    """运行扫描服务直到被中断（Ctrl+C / SIGTERM 时由调用方抛出 KeyboardInterrupt 或 SystemExit）"""
+    server = make_server(service, address, verbose)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """通过 Unix socket 连接的 HTTP 客户端连接"""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ScanClient:
+    """扫描服务的客户端"""
+
+    def __init__(self, address: Address, timeout: Optional[float] = None, retries: int = 5):
+        """
+        Args:
+            address: 服务地址（见 parse_address）
+            timeout: 单次请求的超时时间（秒），None 表示不限
+            retries: 服务返回 503 时的最大重试次数
+        """
+        self.address = address
+        self.timeout = timeout
+        self.retries = retries
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if isinstance(self.address, str):
+            return _UnixHTTPConnection(self.address, self.timeout)
+        return http.client.HTTPConnection(self.address[0], self.address[1], timeout=self.timeout)
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        content_type: str = 'application/json'
+    ) -> Dict[str, Any]:
+        """
+        发送请求并解析 JSON 响应，503 时按 Retry-After 退避重试
+
+        Raises:
+            ServerBusyError: 重试后服务仍然繁忙
+            ScanRequestError: 服务返回其他错误
+            OSError: 无法连接服务
+        """
+        for attempt in range(self.retries + 1):
+            conn = self._connection()
+            try:
+                headers = {'Content-Type': content_type} if body is not None else {}
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                retry_after = response.getheader('Retry-After')
+            finally:
+                conn.close()
+
+            try:
+                payload = json.loads(data or b'{}')
+            except ValueError:
+                payload = {"error": data.decode('utf-8', errors='replace')}
+
+            if response.status == 503:
+                if attempt < self.retries:
+                    delay = float(retry_after) if retry_after and retry_after.isdigit() else 1.0
+                    time.sleep(delay * (attempt + 1))
+                    continue
+                raise ServerBusyError(payload.get('error', 'server busy'))
+            if response.status != 200:
+                raise ScanRequestError(response.status, payload.get('error', f'HTTP {response.status}'))
+            return payload
+        raise ServerBusyError('server busy')
+
+    def health(self) -> Dict[str, Any]:
+        """服务状态"""
+        return self._request('GET', '/health')
+
+    def scan(self, skill_path: str, mode: Optional[AnalysisMode] = None, fail_fast: bool = False) -> ScanResult:
+        """扫描本机上的 skill 目录或压缩包（路径由服务直接读取）"""
+        request: Dict[str, Any] = {"path": str(Path(skill_path).resolve()), "fail_fast": fail_fast}
+        if mode is not None:
+            request["mode"] = mode.value
+        return ScanResult.from_dict(self._request('POST', '/scan', json.dumps(request).encode('utf-8')))
+
+    def scan_archive(
+        self,
+        name: str,
+        data: bytes,
+        mode: Optional[AnalysisMode] = None,
+        fail_fast: bool = False
+    ) -> ScanResult:
+        """上传并扫描压缩包内容"""
+        path = f'/scan?archive={quote(name)}&fail_fast={int(fail_fast)}'
+        if mode is not None:
+            path += f'&mode={mode.value}'
+        return ScanResult.from_dict(self._request('POST', path, data, 'application/octet-stream'))
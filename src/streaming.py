@@ -0,0 +1,177 @@
+"""
+流式分析 - 超过 MAX_FILE_SIZE 的文件按固定大小的重叠块扫描，内存占用与文件大小无关
+文件按块增量解码（结果与 decode_content 相同，跨块的 \r\n 正确合并为一个换行），
+每个窗口 = 前文（上下文检查和后顾断言需要的字符）+ 本块 + 重叠（跨越块边界的匹配）；
+只报告起点落在本块内的匹配，跨边界的匹配只在起点所在的块报告一次；
+使用方可以通过 keep_from 让下一个窗口从更早的位置开始（例如跨块的多行字符串的开头），
+使窗口内构建的区域掩码与整个文件扫描一致；区域超过 max_lookbehind 时，窗口由区域的第一行（头部）
+和 max_lookbehind 之内、从未转义换行开始的文本拼接而成，词法状态在两者的衔接处相同。
+行号按窗口之前的换行数累计。只运行正则规则（语法树需要完整的源码）。
+已知差异：Shell here-document 的结束标记在窗口之外时，窗口内不会识别为 here-document
+"""
+
+import codecs
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+
+# 每次从文件读取的字节数
+READ_SIZE = 256 * 1024
+
+
+@dataclass
+class TextWindow:
+    """流式扫描的一个窗口"""
+    text: str          # 窗口文本
+    offset: int        # 窗口起点在全文中的字符偏移
+    line_offset: int   # 窗口起点之前的换行数
+    start: int         # 本块在窗口中的 [start, stop) 偏移：只报告起点在其中的匹配
+    stop: int
+    next_start: int    # 下一个窗口默认的起点（全文偏移）
+    # 由使用方设置：下一个窗口改为从该偏移（不晚于 next_start）开始，
+    # 例如 next_start 落在字符串中间时改为从字符串开头开始，使区域掩码与整个文件扫描一致
+    keep_from: Optional[int] = None
+    # 窗口开头拼接的区域头部（见模块说明）：text[:head] 来自全文的 head_start，
+    # 其余部分为全文 offset + head 之后的连续文本
+    head: int = 0
+    head_start: int = 0
+
+    def absolute(self, position: int) -> int:
+        """窗口内偏移对应的全文偏移"""
+        if position < self.head:
+            return self.head_start + position
+        return self.offset + position
+
+
+def _unescaped_newline(text: str, start: int, end: int) -> int:
+    """[start, end) 中第一个前面没有反斜杠转义的换行，没有时返回 -1"""
+    position = text.find('\n', start, end)
+    while position >= 0:
+        backslashes = 0
+        while position - backslashes > 0 and text[position - backslashes - 1] == '\\':
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return position
+        position = text.find('\n', position + 1, end)
+    return -1
+
+
+def _splice(
+    buffer: str,
+    buffer_offset: int,
+    keep: int,
+    limit: int,
+    next_start: int,
+    head: str,
+    head_start: int
+) -> Tuple[int, str, int]:
+    """
+    从 keep 开始的区域超过 max_lookbehind 时，下一个窗口的拼接方式
+
+    头部为区域开头到第一个未转义换行之前的文本（重新打开同一种区域），
+    之后从 limit 之后第一个未转义换行接上：两处都在区域内、都不在转义序列中，词法状态相同
+
+    Returns:
+        (缓冲区保留的起点, 头部, 头部的全文偏移)；无法拼接（区域开头到 limit 没有换行等）时
+        退回到从 limit 开始、不带头部，之后的区域掩码可能与整个文件扫描不一致
+    """
+    if head and keep == head_start:
+        # 仍是上一个窗口头部所在的区域
+        new_head = head
+    elif keep >= buffer_offset:
+        head_end = _unescaped_newline(buffer, keep - buffer_offset, limit - buffer_offset)
+        if head_end < 0:
+            return limit, '', 0
+        new_head = buffer[keep - buffer_offset:head_end]
+    else:
+        return limit, '', 0
+    tail = _unescaped_newline(buffer, max(0, limit - buffer_offset), next_start - buffer_offset)
+    if tail < 0:
+        return limit, '', 0
+    return buffer_offset + tail, new_head, keep
+
+
+def text_windows(
+    source: Union[Path, BinaryIO],
+    chunk_size: int = 1024 * 1024,
+    overlap: int = 64 * 1024,
+    lookbehind: int = 1024,
+    max_lookbehind: int = 1024 * 1024
+) -> Iterator[TextWindow]:
+    """
+    按块产出文件文本的窗口
+
+    Args:
+        source: 文件路径，或可按块读取的二进制流（如压缩包成员，不会被关闭）
+        chunk_size: 每块的字符数（相邻窗口的 [start, stop) 首尾相接，覆盖全文）
+        overlap: 本块之后额外包含的字符数（不超过该长度的匹配不会被块边界截断）
+        lookbehind: 本块之前默认包含的字符数
+        max_lookbehind: keep_from 最多向前保留的字符数（限制内存占用；更早的区域只保留其头部）
+
+    Raises:
+        OSError: 文件无法读取（流的 read 抛出的其他异常原样传出）
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    pieces: List[str] = []
+    buffered = 0           # pieces 中的字符数
+    buffer_offset = 0      # pieces 起点在全文中的偏移
+    line_offset = 0        # buffer_offset 之前的换行数
+    chunk_start = 0
+    head = ''              # 拼接在窗口开头的区域头部
+    head_start = 0
+    pending_cr = False     # 上一段以 \r 结尾，等下一段确认是否为 \r\n
+    eof = False
+
+    with open(source, 'rb') if isinstance(source, (str, Path)) else nullcontext(source) as f:
+        while True:
+            needed = chunk_start + chunk_size + overlap - buffer_offset
+            while not eof and buffered < needed:
+                raw = f.read(READ_SIZE)
+                eof = not raw
+                piece = decoder.decode(raw, final=eof)
+                if pending_cr:
+                    piece = '\r' + piece
+                    pending_cr = False
+                if not eof and piece.endswith('\r'):
+                    piece = piece[:-1]
+                    pending_cr = True
+                if '\r' in piece:
+                    piece = piece.replace('\r\n', '\n').replace('\r', '\n')
+                pieces.append(piece)
+                buffered += len(piece)
+
+            buffer = ''.join(pieces)
+            end = min(buffered, needed)
+            window_start = chunk_start - buffer_offset
+            stop = min(window_start + chunk_size, buffered)
+            shift = len(head)
+            window = TextWindow(
+                head + buffer[:end], buffer_offset - shift, line_offset, window_start + shift, stop + shift,
+                next_start=max(buffer_offset, chunk_start + chunk_size - lookbehind),
+                head=shift, head_start=head_start
+            )
+            yield window
+            if eof and stop >= buffered:
+                return
+
+            # 丢弃下一个窗口起点之前的文本
+            chunk_start += chunk_size
+            keep = window.next_start
+            limit = chunk_start - max_lookbehind
+            if window.keep_from is not None and window.keep_from < keep:
+                keep = window.keep_from
+                if keep < limit:
+                    keep, head, head_start = _splice(buffer, buffer_offset, keep, limit, window.next_start,
+                                                     head, head_start)
+                else:
+                    head = ''
+            else:
+                head = ''
+            drop = max(0, keep - buffer_offset)
+            line_offset += buffer.count('\n', 0, drop)
+            buffer = buffer[drop:]
+            pieces = [buffer]
+            buffered = len(buffer)
+            buffer_offset += drop
@@ -35,9 +35,10 @@ class SecurityIssue:
     line: int
     snippet: str
     confidence: float = 1.0  # 置信度 0-1
+    rule_id: Optional[str] = None  # 规则包中的规则 ID（内置规则为 None）
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data = {
             "level": self.level.value,
             "category": self.category,
             "description": self.description,
@@ -46,6 +47,59 @@ class SecurityIssue:
             "snippet": self.snippet,
             "confidence": self.confidence
         }
+        if self.rule_id is not None:
+            data["rule_id"] = self.rule_id
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SecurityIssue':
+        """由 to_dict() 的输出还原"""
+        return cls(
+            level=Severity(data["level"]),
+            category=data["category"],
+            description=data["description"],
+            file=data["file"],
+            line=data["line"],
+            snippet=data["snippet"],
+            confidence=data.get("confidence", 1.0),
+            rule_id=data.get("rule_id")
+        )
+
+
+def assess_risk(summary: Dict[str, int]) -> str:
+    """根据风险统计给出整体评估"""
+    if summary["HIGH"] > 0:
+        return "🔴 CRITICAL: High-risk issues detected. Manual review required."
+    elif summary["MEDIUM"] > 5:
+        return "🟡 WARNING: Multiple medium-risk issues found. Review recommended."
+    elif summary["MEDIUM"] > 0:
+        return "🟢 CAUTION: Some medium-risk issues found. Review suggested."
+    else:
+        return "✅ SAFE: No significant security issues found."
+
+
+@dataclass
+class FileResult:
+    """单个文件的扫描结果（流式扫描事件）"""
+    file: str
+    findings: List[SecurityIssue]
+    cached: bool = False    # 是否来自结果缓存
+    stats: Dict[str, int] = field(default_factory=dict)  # 分析统计计数（汇总到 ScanResult.stats）
+    duplicate_of: Optional[str] = None  # 内容相同、共用其结果的代表文件（去重）
+    streamed: bool = False  # 超过 MAX_FILE_SIZE，按块流式扫描（只运行正则规则）
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "type": "file",
+            "file": self.file,
+            "findings": [f.to_dict() for f in self.findings],
+            "cached": self.cached
+        }
+        if self.duplicate_of is not None:
+            data["duplicate_of"] = self.duplicate_of
+        if self.streamed:
+            data["streamed"] = True
+        return data
 
 
 @dataclass
@@ -56,6 +110,12 @@ class ScanResult:
     findings: List[SecurityIssue]
     scan_time: float
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    cache_hits: int = 0     # 命中结果缓存的文件数
+    cache_misses: int = 0   # 未命中缓存、实际分析的文件数（未启用缓存时均为 0）
+    stopped_early: bool = False  # fail-fast 模式下发现 HIGH 后提前结束
+    stats: Dict[str, int] = field(default_factory=dict)  # 分析统计计数（如 ast_parsed / ast_skipped）
+    streamed_files: List[str] = field(default_factory=list)  # 超过大小上限、以流式模式扫描的文件
+    error: Optional[str] = None  # skill 无法扫描的原因（批量扫描中压缩包损坏或超出限制等），结果不完整
     
     @property
     def risk_summary(self) -> Dict[str, int]:
@@ -66,23 +126,96 @@ class ScanResult:
     
     @property
     def security_assessment(self) -> str:
-        summary = self.risk_summary
-        if summary["HIGH"] > 0:
-            return "🔴 CRITICAL: High-risk issues detected. Manual review required."
-        elif summary["MEDIUM"] > 5:
-            return "🟡 WARNING: Multiple medium-risk issues found. Review recommended."
-        elif summary["MEDIUM"] > 0:
-            return "🟢 CAUTION: Some medium-risk issues found. Review suggested."
-        else:
-            return "✅ SAFE: No significant security issues found."
+        if self.error is not None:
+            return f"⚠️ NOT SCANNED: {self.error}"
+        return assess_risk(self.risk_summary)
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data = {
             "skill_path": self.skill_path,
             "files_scanned": self.files_scanned,
             "findings": [f.to_dict() for f in self.findings],
             "risk_summary": self.risk_summary,
             "security_assessment": self.security_assessment,
             "scan_time": self.scan_time,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "stopped_early": self.stopped_early,
+            "stats": self.stats,
+            "streamed_files": self.streamed_files
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ScanResult':
+        """由 to_dict() 的输出还原（risk_summary 等派生字段重新计算）"""
+        return cls(
+            skill_path=data["skill_path"],
+            files_scanned=data["files_scanned"],
+            findings=[SecurityIssue.from_dict(item) for item in data["findings"]],
+            scan_time=data["scan_time"],
+            timestamp=data.get("timestamp", ""),
+            cache_hits=data.get("cache_hits", 0),
+            cache_misses=data.get("cache_misses", 0),
+            stopped_early=data.get("stopped_early", False),
+            stats=data.get("stats", {}),
+            streamed_files=data.get("streamed_files", []),
+            error=data.get("error")
+        )
+
+
+@dataclass
+class FleetSummary:
+    """多个 skill 批量扫描的汇总统计"""
+    skills_scanned: int = 0
+    skills_failed: int = 0  # 无法扫描的 skill 数（ScanResult.error），不计入 skills_by_level
+    files_scanned: int = 0
+    risk_summary: Dict[str, int] = field(default_factory=lambda: {"HIGH": 0, "MEDIUM": 0, "LOW": 0, "INFO": 0})
+    # 按最高风险等级统计的 skill 数（没有任何发现的为 CLEAN）
+    skills_by_level: Dict[str, int] = field(
+        default_factory=lambda: {"HIGH": 0, "MEDIUM": 0, "LOW": 0, "INFO": 0, "CLEAN": 0}
+    )
+    scan_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    stats: Dict[str, int] = field(default_factory=dict)
+    
+    def add(self, result: ScanResult):
+        """累加一个 skill 的结果"""
+        self.skills_scanned += 1
+        self.files_scanned += result.files_scanned
+        summary = result.risk_summary
+        for level, count in summary.items():
+            self.risk_summary[level] += count
+        if result.error is not None:
+            self.skills_failed += 1
+        else:
+            highest = next((level for level in ("HIGH", "MEDIUM", "LOW", "INFO") if summary[level]), "CLEAN")
+            self.skills_by_level[highest] += 1
+        self.scan_time = max(self.scan_time, result.scan_time)
+        self.cache_hits += result.cache_hits
+        self.cache_misses += result.cache_misses
+        for name, value in result.stats.items():
+            self.stats[name] = self.stats.get(name, 0) + value
+    
+    @property
+    def dedup_ratio(self) -> float:
+        """共用其他文件分析结果（内容相同）的文件比例"""
+        return self.stats.get('dedup_hits', 0) / self.files_scanned if self.files_scanned else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "skills_scanned": self.skills_scanned,
+            "skills_failed": self.skills_failed,
+            "files_scanned": self.files_scanned,
+            "risk_summary": self.risk_summary,
+            "skills_by_level": self.skills_by_level,
+            "scan_time": self.scan_time,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "dedup_ratio": round(self.dedup_ratio, 4),
+            "stats": self.stats
         }
@@ -0,0 +1,207 @@
+"""
+目录遍历器 - 基于 os.scandir 的单遍遍历
+改进：忽略目录在进入前剪枝，所有忽略规则合并为一个预编译正则，
+文件类型和大小直接复用 DirEntry 的缓存信息；
+记录每个文件的 (设备, inode)，硬链接到同一文件的多个路径只读取和分析一次（见 dedup）；
+跟随目录符号链接时每个目录（按 inode）只进入一次，符号链接环不会导致无限遍历
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Iterable, Optional, Pattern, Set, Tuple
+
+from .rules import SCAN_EXTENSIONS, IGNORE_PATTERNS
+
+
+@dataclass
+class FileEntry:
+    """待扫描文件"""
+    path: Path
+    size: int
+    inode: Optional[Tuple[int, int]] = None  # (st_dev, st_ino)，不在磁盘上或平台不提供时为 None
+
+
+def file_identity(stat: os.stat_result) -> Optional[Tuple[int, int]]:
+    """文件的 (设备, inode) 标识；平台不提供 inode 时返回 None"""
+    if not stat.st_ino:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def compile_ignore_matcher(patterns: Iterable[str] = IGNORE_PATTERNS) -> Pattern:
+    """
+    将所有忽略规则合并为一个正则
+
+    语义与逐条 re.search 完整路径相同：任一规则在路径中出现即忽略。
+    逐段 fnmatch 的检查被完整路径搜索覆盖（规则不含通配符时，
+    路径段等于规则即意味着完整路径包含该规则），因此不再单独执行。
+    """
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+
+class FileWalker:
+    """单遍目录遍历器"""
+
+    def __init__(
+        self,
+        max_file_size: int,
+        extensions: Set[str] = SCAN_EXTENSIONS,
+        ignore_patterns: Iterable[str] = IGNORE_PATTERNS,
+        follow_symlinks: bool = False,
+        max_stream_size: int = 0
+    ):
+        """
+        初始化遍历器
+
+        Args:
+            max_file_size: 最大文件大小，超过则跳过（或流式扫描，见 max_stream_size）
+            extensions: 要扫描的文件扩展名
+            ignore_patterns: 忽略规则（正则）
+            follow_symlinks: 进入指向目录的符号链接（如链接到共享存储的安装方式）
+            max_stream_size: 超过 max_file_size、不超过该大小的文件也返回（由扫描器流式分析）；
+                0 表示不流式扫描
+        """
+        self.max_file_size = max_file_size
+        self.max_stream_size = max_stream_size
+        self.extensions = extensions
+        self.follow_symlinks = follow_symlinks
+        self._ignore = compile_ignore_matcher(ignore_patterns)
+
+    @property
+    def size_limit(self) -> int:
+        """文件大小上限（包括流式扫描的文件）"""
+        return max(self.max_file_size, self.max_stream_size)
+
+    def is_ignored(self, path: str) -> bool:
+        """检查路径是否命中忽略规则"""
+        return self._ignore.search(path) is not None
+
+    def accepts(self, path: str, size: int) -> bool:
+        """
+        不经过目录遍历的文件（压缩包成员、内存中的文件、监视模式中变化的文件）是否需要扫描
+
+        与目录遍历的过滤规则相同：扩展名、忽略规则和大小上限（超过 max_file_size 的文件流式扫描）
+        """
+        if os.path.splitext(path)[1] not in self.extensions:
+            return False
+        if self.is_ignored(path):
+            return False
+        return size <= self.size_limit
+
+    def walk(self, root: Path) -> List[FileEntry]:
+        """
+        遍历目录，返回按路径排序的待扫描文件
+
+        跟随目录符号链接时，先遍历所有真实目录，再依次进入符号链接指向的目录，
+        同一目录（按 inode）只进入一次：目录在 skill 内有真实路径时总以真实路径报告，
+        指向祖先目录的链接（符号链接环）被跳过
+
+        Args:
+            root: skill 目录
+
+        Returns:
+            文件列表（与 sorted(Path) 顺序一致）
+        """
+        entries: List[FileEntry] = []
+        root_str = str(root)
+
+        # 根路径本身命中忽略规则时，其下所有路径都会被忽略
+        if not self.is_ignored(root_str):
+            if self.follow_symlinks:
+                visited: Set[Tuple[int, int]] = set()
+                links: List[str] = []
+                try:
+                    identity = file_identity(os.stat(root_str))
+                except OSError:
+                    identity = None
+                if identity is not None:
+                    visited.add(identity)
+                self._walk_dir(root_str, entries, visited, links)
+                while links:
+                    links.sort()
+                    link_path = links.pop(0)
+                    try:
+                        identity = file_identity(os.stat(link_path))
+                    except OSError:
+                        continue
+                    if identity is not None:
+                        if identity in visited:
+                            continue
+                        visited.add(identity)
+                    self._walk_dir(link_path, entries, visited, links)
+            else:
+                self._walk_dir(root_str, entries)
+
+        # 确保包含 SKILL.md
+        skill_md = root / 'SKILL.md'
+        if not any(entry.path == skill_md for entry in entries):
+            try:
+                stat = os.stat(skill_md)
+                if stat.st_size <= self.size_limit:
+                    entries.append(FileEntry(skill_md, stat.st_size, file_identity(stat)))
+            except (OSError, IOError):
+                pass
+
+        entries.sort(key=lambda entry: entry.path)
+        return entries
+
+    def _walk_dir(
+        self,
+        dir_path: str,
+        entries: List[FileEntry],
+        visited: Optional[Set[Tuple[int, int]]] = None,
+        links: Optional[List[str]] = None
+    ):
+        """
+        遍历目录及其子目录（显式栈，嵌套深度不受递归栈限制）
+
+        visited 为 None 时不跟随目录符号链接（与 Path.rglob 一致）；
+        否则记录已进入目录的 inode，指向目录的符号链接加入 links，由 walk() 在真实目录之后处理
+        """
+        stack = [dir_path]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    dir_entries = list(it)
+            except (PermissionError, OSError):
+                # 目录无法访问，跳过
+                continue
+
+            for entry in dir_entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # 忽略目录直接剪枝，不再进入
+                        if self.is_ignored(entry.path):
+                            continue
+                        if visited is not None:
+                            identity = file_identity(entry.stat(follow_symlinks=False))
+                            if identity is not None:
+                                if identity in visited:
+                                    continue
+                                visited.add(identity)
+                        stack.append(entry.path)
+                        continue
+
+                    if links is not None and entry.is_symlink() and entry.is_dir():
+                        if not self.is_ignored(entry.path):
+                            links.append(entry.path)
+                        continue
+
+                    if not entry.is_file():
+                        continue
+
+                    # 先检查扩展名（无需系统调用），再检查忽略规则和大小
+                    if os.path.splitext(entry.name)[1] not in self.extensions:
+                        continue
+                    if self.is_ignored(entry.path):
+                        continue
+
+                    stat = entry.stat()
+                    if stat.st_size > self.size_limit:
+                        continue
+                except (OSError, IOError):
+                    continue
+
+                entries.append(FileEntry(Path(entry.path), stat.st_size, file_identity(stat)))
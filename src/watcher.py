@@ -0,0 +1,338 @@
+"""
+监视模式 - skill 目录中的文件变化后只重新分析变化的文件
+内存中保存每个文件的结果，新建或修改的文件重新分析，删除的文件移除其结果，
+然后重新汇总；扫描到反馈的延迟与修改量成正比，与 skill 大小无关。
+变化来源优先使用 Linux inotify（ctypes 调用 libc），不可用时按 mtime 轮询
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .types import ScanResult, FileResult, SecurityIssue
+from .walker import FileEntry, FileWalker, file_identity
+
+
+# inotify 事件掩码（linux/inotify.h）
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class ChangeSource(ABC):
+    """文件变化来源"""
+
+    @abstractmethod
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        """
+        等待下一批变化
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            变化的路径（文件或目录，可能已被删除）；超时时为空集合；
+            事件丢失（需要全量重新扫描）时为 None
+        """
+        pass
+
+    def close(self):
+        """释放资源"""
+
+
+class InotifySource(ChangeSource):
+    """基于 inotify 的变化来源：递归监视目录，新建的子目录自动加入监视"""
+
+    def __init__(self, root: Path, walker: FileWalker, debounce: float = 0.1):
+        """
+        Args:
+            root: skill 目录
+            walker: 提供忽略规则（忽略的目录不监视）
+            debounce: 收到事件后继续收集的静默时间（秒），合并编辑器的多次写入
+
+        Raises:
+            OSError: 当前系统不支持 inotify
+        """
+        self.root = Path(root)
+        self.walker = walker
+        self.debounce = debounce
+        libc_name = ctypes.util.find_library('c')
+        try:
+            self._libc = ctypes.CDLL(libc_name, use_errno=True)
+            init = self._libc.inotify_init1
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"inotify_init1: {os.strerror(code)}")
+        self._dirs: Dict[int, Path] = {}
+        try:
+            self._watch_tree(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path: Path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), _WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSPC:
+                # 超出 fs.inotify.max_user_watches：无法可靠地监视，由调用方改用轮询
+                raise OSError(code, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            # 目录已被删除或无权限：忽略
+            return
+        self._dirs[wd] = path
+
+    def _watch_tree(self, path: Path):
+        """监视目录及其所有未被忽略的子目录（显式栈，目录再深也不会递归溢出）"""
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            if directory != self.root and self.walker.is_ignored(str(directory)):
+                continue
+            self._add_watch(directory)
+            try:
+                with os.scandir(directory) as it:
+                    subdirs = [Path(entry.path) for entry in it if entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            # 逆序入栈，保持与原先相同的先序遍历顺序
+            stack.extend(reversed(subdirs))
+
+    def _read_events(self, changed: Set[Path]) -> bool:
+        """读取当前所有事件，返回 False 表示事件队列溢出"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return True
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return False
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # 目录已删除或被移走，监视自动失效
+                del self._dirs[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add(directory)
+                continue
+
+            path = directory / os.fsdecode(name) if name else directory
+            changed.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # 新目录：先加入监视，再由调用方扫描其中已有的文件
+                self._watch_tree(path)
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        changed: Set[Path] = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed
+        while True:
+            if not self._read_events(changed):
+                return None
+            # 静默 debounce 秒后才返回，合并连续写入
+            ready, _, _ = select.select([self.fd], [], [], self.debounce)
+            if not ready:
+                return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingSource(ChangeSource):
+    """按 mtime / 大小轮询的变化来源（inotify 不可用时使用）"""
+
+    def __init__(self, root: Path, walker: FileWalker, interval: float = 1.0):
+        """
+        Args:
+            root: skill 目录
+            walker: 遍历器（与扫描相同的过滤规则）
+            interval: 轮询间隔（秒）
+        """
+        self.root = Path(root)
+        self.walker = walker
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for entry in self.walker.walk(self.root):
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                continue
+            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            snapshot = self._take_snapshot()
+            old = self._snapshot
+            self._snapshot = snapshot
+            changed = {path for path, state in snapshot.items() if old.get(path) != state}
+            changed.update(path for path in old if path not in snapshot)
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def open_change_source(root: Path, walker: FileWalker, poll_interval: float = 1.0) -> ChangeSource:
+    """优先使用 inotify，不可用时（非 Linux、监视数超限等）退回轮询"""
+    try:
+        return InotifySource(root, walker)
+    except OSError:
+        return PollingSource(root, walker, poll_interval)
+
+
+class SkillWatcher:
+    """
+    保持 skill 目录的扫描结果随文件变化更新
+
+    initial_scan() 完整扫描一次，之后 apply(changed) 只分析变化的文件，
+    result() 按路径顺序汇总当前所有文件的结果
+    """
+
+    def __init__(self, scanner, skill_path: str):
+        """
+        Args:
+            scanner: SkillScanner（使用其分析器、缓存和过滤规则）
+            skill_path: skill 目录
+        """
+        self.scanner = scanner
+        self.root = Path(skill_path)
+        self.walker: FileWalker = scanner.walker
+        self.results: Dict[Path, FileResult] = {}
+
+    def initial_scan(self) -> ScanResult:
+        """完整扫描（可并行），建立每个文件的结果表"""
+        start_time = time.time()
+        self.results = {Path(result.file): result for result in self.scanner.scan_iter(str(self.root))}
+        return self.result(time.time() - start_time)
+
+    def _wanted(self, path: Path, size: int) -> bool:
+        """文件是否需要扫描（与目录遍历的过滤规则一致，SKILL.md 总是扫描）"""
+        if path == self.root / 'SKILL.md':
+            return size <= self.walker.size_limit
+        return self.walker.accepts(str(path), size)
+
+    def apply(self, changed: Optional[Set[Path]]) -> Tuple[List[FileResult], List[Path]]:
+        """
+        根据变化更新结果表
+
+        Args:
+            changed: ChangeSource.wait() 返回的路径；None 表示全量重新扫描
+
+        Returns:
+            (重新分析的文件结果, 被移除的文件)
+        """
+        if changed is None:
+            old = set(self.results)
+            self.initial_scan()
+            return list(self.results.values()), sorted(old - set(self.results))
+
+        entries: Dict[Path, FileEntry] = {}
+        removed: List[Path] = []
+        for path in sorted(changed):
+            if path.is_dir():
+                # 新建或移入的目录：扫描其中的文件（已在结果表中的文件会被重新分析）
+                for entry in self.walker.walk(path):
+                    if self._wanted(entry.path, entry.size):
+                        entries[entry.path] = entry
+                continue
+            try:
+                stat = path.stat() if path.is_file() else None
+            except OSError:
+                stat = None
+            if stat is not None and self._wanted(path, stat.st_size):
+                entries[path] = FileEntry(path, stat.st_size, file_identity(stat))
+                continue
+            # 已删除、变为不需要扫描的文件（如超过大小上限）或已删除的目录：移除其下的所有结果
+            if path in self.results:
+                del self.results[path]
+                removed.append(path)
+                continue
+            for known in [known for known in self.results if path in known.parents]:
+                del self.results[known]
+                removed.append(known)
+
+        # 大量文件同时变化（如切换分支）时与完整扫描一样使用进程池
+        updated = list(self.scanner.analyze_entries(sorted(entries.values(), key=lambda entry: entry.path)))
+        for result in updated:
+            self.results[Path(result.file)] = result
+        analyzed = {Path(result.file) for result in updated}
+        for path in entries:
+            # 在分析前被删除或无法读取
+            if path not in analyzed and self.results.pop(path, None) is not None:
+                removed.append(path)
+        return updated, sorted(removed)
+
+    def result(self, scan_time: float = 0.0) -> ScanResult:
+        """当前所有文件结果的汇总（按路径排序，与完整扫描的顺序一致）"""
+        findings: List[SecurityIssue] = []
+        stats: Dict[str, int] = {}
+        cache_hits = 0
+        cache_misses = 0
+        streamed_files: List[str] = []
+        for path in sorted(self.results):
+            file_result = self.results[path]
+            findings.extend(file_result.findings)
+            if file_result.streamed:
+                streamed_files.append(file_result.file)
+            for name, value in file_result.stats.items():
+                stats[name] = stats.get(name, 0) + value
+            if self.scanner.cache is not None and file_result.duplicate_of is None and not file_result.streamed:
+                if file_result.cached:
+                    cache_hits += 1
+                else:
+                    cache_misses += 1
+        return ScanResult(
+            skill_path=str(self.root),
+            files_scanned=len(self.results),
+            findings=findings,
+            scan_time=scan_time,
+            cache_hits=cache_hits,
+            cache_misses=cache_misses,
+            stats=stats,
+            streamed_files=streamed_files
+        )